@@ -0,0 +1,122 @@
+"""Times scrim_id autocomplete lookups against 10k active scrims: the in-memory
+ScrimSearchIndex behind Database.search_scrims versus the LIKE query a naive handler
+would run per keystroke. Also checks the index stays in step with joins, leaves and
+status changes. Usage: python -m benchmarks.autocomplete_lookup [scrims] [lookups]
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import List
+
+from benchmarks.fakes import FakeBot, FakeGuild, FakeInteraction
+from database.database import Database
+from utils.autocomplete import scrim_autocomplete
+
+GUILDS = 5
+WORDS = ["ranked", "casual", "eu", "na", "weekly", "cup", "practice", "finals", "open", "league"]
+
+
+def seed(conn: sqlite3.Connection, scrims: int):
+    rng = random.Random(0)
+    conn.execute("BEGIN")
+    conn.executemany("""
+        INSERT INTO scrims (guild_id, title, game_mode, max_players, scheduled_time, creator_id, player_count, status)
+        VALUES (?, ?, '5v5', 10, 0, ?, ?, ?)
+        """, [(1 + i % GUILDS, f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}", 1 + i % 50,
+               rng.randint(0, 9), rng.choice(['open', 'full', 'active'])) for i in range(scrims)])
+    conn.execute("COMMIT")
+
+
+def queries(scrims: int, lookups: int) -> List[str]:
+    rng = random.Random(1)
+    texts = []
+    for i in range(lookups):
+        kind = i % 3
+        if kind == 0:
+            texts.append(str(rng.randint(1, scrims))[:rng.randint(1, 4)])
+        elif kind == 1:
+            texts.append(rng.choice(WORDS)[:rng.randint(1, 5)])
+        else:
+            texts.append("")
+    return texts
+
+
+def percentile(samples: List[float], q: float) -> float:
+    return samples[min(int(len(samples) * q), len(samples) - 1)] if samples else 0.0
+
+
+def report(name: str, samples: List[float]):
+    samples.sort()
+    print(f"{name:>13} | {len(samples):6d} | {percentile(samples, 0.5) * 1000:8.3f} | "
+          f"{percentile(samples, 0.99) * 1000:8.3f} | {samples[-1] * 1000:8.3f}")
+
+
+async def main(scrims: int, lookups: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        await db.run(seed, scrims)
+        texts = queries(scrims, lookups)
+
+        start = time.perf_counter()
+        await db.search_scrims(1, "")
+        print(f"index load: {len(db.search)} scrims in {(time.perf_counter() - start) * 1000:.1f}ms")
+        print(f"{'lookup':>13} | {'n':>6} | {'p50 ms':>8} | {'p99 ms':>8} | {'max ms':>8}")
+
+        baseline = []
+        for i, text in enumerate(texts):
+            start = time.perf_counter()
+            await db.execute_query("""
+                SELECT id, guild_id, title, status, creator_id, player_count, max_players FROM scrims
+                WHERE guild_id = ? AND status IN ('open', 'full', 'active')
+                  AND (CAST(id AS TEXT) LIKE ? OR title LIKE ?)
+                ORDER BY id DESC LIMIT 25
+                """, (1 + i % GUILDS, f"{text}%", f"{text}%"))
+            baseline.append(time.perf_counter() - start)
+        report("SQL LIKE", baseline)
+
+        indexed = []
+        for i, text in enumerate(texts):
+            start = time.perf_counter()
+            await db.search_scrims(1 + i % GUILDS, text)
+            indexed.append(time.perf_counter() - start)
+        report("index", indexed)
+
+        guild = FakeGuild(1)
+        bot = FakeBot(db, [guild])
+        member = guild.add_member(1)
+        callbacks = {'join (open)': scrim_autocomplete(('open',)),
+                     'end (managed)': scrim_autocomplete(('active',), scope='managed')}
+        for name, callback in callbacks.items():
+            samples = []
+            for text in texts:
+                start = time.perf_counter()
+                await callback(FakeInteraction(bot, guild, member), text)
+                samples.append(time.perf_counter() - start)
+            report(name, samples)
+
+        # Consistency: writes through Database must show up in the next lookup.
+        failures = 0
+        scrim_id = await db.insert_scrim(1, "Zebra night", "5v5", 0, 2, member)
+        failures += [scrim.id for scrim in await db.search_scrims(1, "zebra")] != [scrim_id]
+        for player_id in (1, 2):
+            await db.join_scrim_atomic(scrim_id, guild.add_member(player_id), 1)
+        failures += (await db.search_scrims(1, str(scrim_id)))[0].status != 'full'
+        await db.leave_scrim_atomic(scrim_id, 2, 1)
+        failures += (await db.search_scrims(1, str(scrim_id)))[0].player_count != 1
+        await db.update_scrim_status(scrim_id, "completed")
+        failures += bool(await db.search_scrims(1, "zebra"))
+        failures += bool(await db.search_scrims(2, str(scrim_id)[:3], lambda scrim: scrim.guild_id != 2))
+        print(f"consistency checks: {'ok' if not failures else f'{failures} FAILED'}")
+
+        await db.close()
+        return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sys.exit(asyncio.run(main(int(args[0]) if len(args) > 0 else 10000,
+                              int(args[1]) if len(args) > 1 else 3000)))
@@ -0,0 +1,152 @@
+"""Measures how much a database backup disturbs live traffic. A steady mix of roster reads
+and joins runs three times:
+  - with no backup,
+  - during Database.backup (online backup API on a worker thread, pinned snapshot, small steps),
+  - during a naive backup that copies the whole file in one step on the DB thread.
+It reports query latency for each run. It then checks the online snapshot's integrity,
+rotation, and restoring it over the live database.
+
+Usage: python -m benchmarks.backup_impact [scrims] [players_per_scrim]
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Awaitable, Callable, List
+
+from benchmarks.history_export import seed
+from database import backup
+from database.database import Database
+
+OPEN_SCRIMS = 200
+
+
+def percentile(samples: List[float], q: float) -> float:
+    return samples[min(int(len(samples) * q), len(samples) - 1)] if samples else 0.0
+
+
+async def under_load(db: Database, scrim_ids: List[int], work: Callable[[], Awaitable]) -> tuple:
+    # Runs work() while a client issues a read or a join every 2ms; returns work's result,
+    # its duration and the latencies the client saw.
+    rng = random.Random(0)
+    latencies, done = [], asyncio.Event()
+
+    async def client():
+        player_id = 10 ** 18 + len(scrim_ids) * rng.randrange(10 ** 6)
+        while not done.is_set():
+            start = time.perf_counter()
+            if rng.random() < 0.2:
+                player_id += 1
+                await db.join_scrim_atomic(rng.choice(scrim_ids), SimpleNamespace(id=player_id, name="load"))
+            else:
+                await db.execute_query("SELECT player_id FROM scrim_players WHERE scrim_id = ?",
+                                       (rng.choice(scrim_ids),))
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0.002)
+
+    task = asyncio.create_task(client())
+    await asyncio.sleep(0.2)
+    start = time.perf_counter()
+    result = await work()
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.2)
+    done.set()
+    await task
+    latencies.sort()
+    return result, elapsed, latencies
+
+
+def report(name: str, elapsed: float, latencies: List[float]):
+    print(f"{name:>14} | {elapsed:7.2f} | {len(latencies):6d} | {percentile(latencies, 0.5) * 1000:7.2f} | "
+          f"{percentile(latencies, 0.99) * 1000:7.2f} | {latencies[-1] * 1000:8.1f}")
+
+
+def counts(path: str) -> tuple:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return tuple(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                     for table in ('scrims', 'scrim_players'))
+    finally:
+        conn.close()
+
+
+async def main(scrims: int, players: int) -> int:
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        await db.run(seed, scrims, players)
+        # A few hundred open scrims for the load to join; one row per player keeps them from filling.
+        scrim_ids = [await db.insert_scrim(1, f"Open {i}", "5v5", 1893456000, 10 ** 6, SimpleNamespace(id=1))
+                     for i in range(OPEN_SCRIMS)]
+        print(f"database: {os.path.getsize(db.db_path) / 2 ** 20:.1f} MiB")
+        print(f"{'backup':>14} | {'s':>7} | {'ops':>6} | {'p50 ms':>7} | {'p99 ms':>7} | {'max ms':>8}")
+
+        _, elapsed, latencies = await under_load(db, scrim_ids, lambda: asyncio.sleep(1.0))
+        report("none", elapsed, latencies)
+
+        directory = os.path.join(tmp, "backups")
+        before = counts(db.db_path)
+        stats, elapsed, latencies = await under_load(db, scrim_ids, lambda: db.backup(directory))
+        report("online", elapsed, latencies)
+        after = counts(db.db_path)
+
+        naive_path = os.path.join(tmp, "naive.db")
+
+        def naive(conn: sqlite3.Connection):
+            target = sqlite3.connect(naive_path)
+            conn.backup(target)
+            target.close()
+
+        _, elapsed, latencies = await under_load(db, scrim_ids, lambda: db.run(naive))
+        report("one step", elapsed, latencies)
+
+        snapshot = counts(stats['path'])
+        consistent = backup.check_snapshot(stats['path']) == 'ok' and before <= snapshot <= after
+        failures += not consistent
+        print(f"online snapshot: {stats['pages']} pages in {stats['steps']} steps, copy {stats['copy_elapsed']:.2f}s "
+              f"+ integrity check {stats['elapsed'] - stats['copy_elapsed']:.2f}s; rows {snapshot} "
+              f"(live {before} -> {after}): {'ok' if consistent else 'FAILED'}")
+
+        # Rotation: ten older snapshots, 1-10 days old. The newest four stay whatever their age,
+        # the rest only while younger than 7.5 days, so the 8, 9 and 10 day old ones go.
+        now = time.time()
+        for age_days in range(1, 11):
+            path = os.path.join(directory, backup.snapshot_name(now - age_days * 24 * 3600))
+            open(path, 'wb').close()
+            os.utime(path, (now - age_days * 24 * 3600,) * 2)
+        removed = backup.rotate_snapshots(directory, keep=4, retention_days=7.5, now=now)
+        left = backup.list_snapshots(directory)
+        rotated = len(left) == 8 and os.path.basename(stats['path']) in left and len(removed) == 3
+        failures += not rotated
+        print(f"rotation (keep 4, 7.5 days): removed {len(removed)}, kept {len(left)}: {'ok' if rotated else 'FAILED'}")
+
+        # A restore snapshots the current state right before it runs, possibly in the same second
+        # as the last backup; each snapshot needs its own file, newest listed first.
+        paths = [(await db.backup(directory, rotate=False))['path'] for _ in range(2)]
+        distinct = (backup.snapshot_name(now) != backup.snapshot_name(now + 0.001)
+                    and backup.list_snapshots(directory)[:2] == [os.path.basename(path) for path in reversed(paths)])
+        failures += not distinct
+        print(f"back-to-back snapshots: {', '.join(map(os.path.basename, paths))}: {'ok' if distinct else 'FAILED'}")
+
+        await db.join_scrim_atomic(scrim_ids[0], SimpleNamespace(id=42, name="after backup"))
+        pages = await db.restore(stats['path'])
+        mode = (await db.execute_query("PRAGMA journal_mode"))[0]['journal_mode']
+        restored = counts(db.db_path) == snapshot and mode == 'wal'
+        restored &= not await db.execute_query("SELECT 1 FROM scrim_players WHERE player_id = 42")
+        failures += not restored
+        print(f"restore: {pages} pages, rows {counts(db.db_path)}, journal_mode {mode}: "
+              f"{'ok' if restored else 'FAILED'}")
+        await db.close()
+
+    print("ok" if not failures else f"{failures} checks FAILED")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sys.exit(asyncio.run(main(int(args[0]) if len(args) > 0 else 50000,
+                              int(args[1]) if len(args) > 1 else 10)))
@@ -0,0 +1,51 @@
+"""Drives utils.broadcast with fake members to measure DM fan-out throughput.
+
+Each fake send takes ~SEND_LATENCY seconds; a small share of recipients have DMs closed
+(403) or hit a 429 once before succeeding. Usage: python -m benchmarks.broadcast_throughput
+"""
+import asyncio
+import random
+from types import SimpleNamespace
+
+import discord
+
+from utils.broadcast import broadcast
+
+SEND_LATENCY = 0.05
+
+
+class FakeMember:
+    def __init__(self, member_id: int, dms_closed: bool = False, rate_limited: bool = False):
+        self.id = member_id
+        self.dms_closed = dms_closed
+        self.rate_limited = rate_limited
+        self.received = 0
+
+    async def send(self, **message):
+        await asyncio.sleep(SEND_LATENCY * random.uniform(0.5, 1.5))
+        if self.dms_closed:
+            raise discord.Forbidden(SimpleNamespace(status=403, reason="Forbidden"), "Cannot send messages to this user")
+        if self.rate_limited:
+            self.rate_limited = False
+            raise discord.RateLimited(0.2)
+        self.received += 1
+
+
+async def main():
+    random.seed(0)
+    for count in (100, 250, 500, 1000):
+        members = [FakeMember(i, dms_closed=random.random() < 0.05, rate_limited=random.random() < 0.05)
+                   for i in range(count)]
+        result = await broadcast(members, content="hello")
+        print(f"{count:>5} recipients: {count / result.elapsed:7.1f} msg/s | {result.summary()}")
+
+    members = [FakeMember(i) for i in range(100)]
+    sequential = asyncio.get_running_loop().time()
+    for member in members:
+        await member.send(content="hello")
+    sequential = asyncio.get_running_loop().time() - sequential
+    print(f"  100 recipients sent one by one: {100 / sequential:7.1f} msg/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
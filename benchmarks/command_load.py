@@ -0,0 +1,215 @@
+"""Drives ScrimCommands, AdminCommands and StatsCommands handlers against a seeded database
+using the stand-ins in benchmarks.fakes, and reports per-command p50/p99 latency,
+throughput and event-loop lag. Permission checks are not run - only the handlers.
+
+Usage: python -m benchmarks.command_load [requests] [concurrency] [seed_scrims] [api_latency_ms]
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List
+
+from benchmarks.fakes import FakeBot, FakeGuild, FakeInteraction
+from cogs.admin_commands import AdminCommands
+from cogs.presence_commands import PresenceCommands
+from cogs.scrim_commands import ScrimCommands
+from cogs.stats_commands import StatsCommands
+from database.database import Database
+
+GUILDS = 5
+PLAYERS_PER_GUILD = 2000
+PLAYERS_PER_SCRIM = 10
+# Status mix of seeded scrims: most history is finished, a slice is still joinable.
+STATUS_WEIGHTS = {'completed': 70, 'cancelled': 10, 'open': 15, 'full': 5}
+
+
+def seed(conn: sqlite3.Connection, guild_ids: List[int], scrims: int):
+    rng = random.Random(0)
+    now = int(time.time())
+    statuses = rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()), k=scrims)
+    conn.execute("BEGIN")
+    for i, status in enumerate(statuses):
+        guild_id = guild_ids[i % len(guild_ids)]
+        count = PLAYERS_PER_SCRIM if status != 'open' else rng.randint(0, PLAYERS_PER_SCRIM - 1)
+        scrim_id = conn.execute("""
+            INSERT INTO scrims (guild_id, title, game_mode, max_players, scheduled_time, creator_id, player_count,
+                                status, created_at)
+            VALUES (?, ?, '5v5', ?, ?, ?, ?, ?, ?)
+            """, (guild_id, f"Seeded scrim {i}", PLAYERS_PER_SCRIM, now + rng.randint(-86400 * 20, 86400),
+                  guild_id * 10 ** 6 + 1, count, status, now - rng.randint(0, 86400 * 20))).lastrowid
+        players = rng.sample(range(1, PLAYERS_PER_GUILD + 1), count)
+        conn.executemany("""
+            INSERT INTO scrim_players (scrim_id, player_id, player_name, team) VALUES (?, ?, ?, ?)
+            """, [(scrim_id, guild_id * 10 ** 6 + p, f"player{p}", 1 + n % 2 if status == 'completed' else None)
+                  for n, p in enumerate(players)])
+    conn.execute("""
+        INSERT INTO player_stats (guild_id, player_id, scrims_joined, scrims_played, scrims_completed, last_active)
+        SELECT s.guild_id, sp.player_id, COUNT(*), SUM(sp.team IS NOT NULL), SUM(s.status = 'completed'),
+               MAX(sp.joined_at)
+        FROM scrim_players sp JOIN scrims s ON s.id = sp.scrim_id
+        GROUP BY s.guild_id, sp.player_id
+        """)
+    conn.execute("""
+        INSERT INTO player_ratings (guild_id, player_id, rating, rated_games)
+        SELECT guild_id, player_id, 1000 + (ABS(RANDOM()) % 600) - 300, scrims_completed
+        FROM player_stats WHERE scrims_completed > 0
+        """)
+    conn.execute("COMMIT")
+
+
+async def monitor_lag(stop: asyncio.Event, samples: list, interval: float = 0.001):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+def percentile(samples: List[float], q: float) -> float:
+    return samples[min(int(len(samples) * q), len(samples) - 1)] if samples else 0.0
+
+
+async def measure(name: str, requests: int, concurrency: int, call: Callable[[int], Awaitable[None]]):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, lag = [], []
+    errors = 0
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_lag(stop, lag))
+    await asyncio.sleep(0.005)
+
+    async def timed(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await call(i)
+            except Exception as e:
+                errors += 1
+                if errors == 1:
+                    print(f"  {name}: first error: {e!r}")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+
+    latencies.sort()
+    lag.sort()
+    print(f"{name:>13} | {requests:5d} | {percentile(latencies, 0.5) * 1000:8.2f} | "
+          f"{percentile(latencies, 0.99) * 1000:8.2f} | {requests / elapsed:8.0f} | "
+          f"{percentile(lag, 0.99) * 1000:7.2f} | {(lag[-1] if lag else 0) * 1000:7.2f} | {errors}")
+
+
+async def main(requests: int, concurrency: int, seed_scrims: int, api_latency: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        guilds = [FakeGuild(guild_id, api_latency) for guild_id in range(1, GUILDS + 1)]
+        start = time.perf_counter()
+        await db.run(seed, [guild.id for guild in guilds], seed_scrims)
+        print(f"seeded {seed_scrims} scrims across {GUILDS} guilds in {time.perf_counter() - start:.1f}s")
+
+        for guild in guilds:
+            await db.set_guild_config(guild.id, waiting_room_vc_id=guild.waiting_room.id)
+            for p in range(1, PLAYERS_PER_GUILD + 1):
+                guild.add_member(guild.id * 10 ** 6 + p)
+        admin = guilds[0].add_member(1, manage_guild=True)
+        bot = FakeBot(db, guilds)
+        scrim_cog, admin_cog, stats_cog = ScrimCommands(bot), AdminCommands(bot), StatsCommands(bot)
+        rng = random.Random(1)
+
+        def interaction(guild: FakeGuild, user=None) -> FakeInteraction:
+            user = user or guild.get_member(guild.id * 10 ** 6 + rng.randint(1, PLAYERS_PER_GUILD))
+            return FakeInteraction(bot, guild, user)
+
+        guild = guilds[0]
+        future = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d %H:%M")
+        print(f"{'command':>13} | {'n':>5} | {'p50 ms':>8} | {'p99 ms':>8} | {'req/s':>8} | "
+              f"{'lag p99':>7} | {'lag max':>7} | errors")
+
+        async def create(i):
+            await ScrimCommands.create_scrim.callback(scrim_cog, interaction(guild), f"Bench {i}", "5v5", future,
+                                                      PLAYERS_PER_SCRIM)
+
+        await measure("create_scrim", requests, concurrency, create)
+        created = [scrim_id for scrim_id, _ in bot.dispatched['scrim_scheduled']]
+
+        # Each new scrim gets a full roster, spread over distinct players.
+        joiners = [[guild.get_member(guild.id * 10 ** 6 + (n * PLAYERS_PER_SCRIM + k) % PLAYERS_PER_GUILD + 1)
+                    for k in range(PLAYERS_PER_SCRIM)] for n in range(len(created))]
+
+        async def join(i):
+            scrim_index, slot = divmod(i, PLAYERS_PER_SCRIM)
+            await ScrimCommands.join_scrim.callback(scrim_cog, interaction(guild, joiners[scrim_index][slot]),
+                                                    created[scrim_index])
+
+        await measure("join_scrim", len(created) * PLAYERS_PER_SCRIM, concurrency, join)
+
+        async def leave_and_rejoin(i):
+            member = joiners[i][0]
+            await ScrimCommands.leave_scrim.callback(scrim_cog, interaction(guild, member), created[i])
+            await ScrimCommands.join_scrim.callback(scrim_cog, interaction(guild, member), created[i])
+
+        await measure("leave+rejoin", len(created), concurrency, leave_and_rejoin)
+
+        async def list_scrims(i):
+            await ScrimCommands.list_scrims.callback(scrim_cog, interaction(guilds[i % GUILDS]))
+
+        await measure("list_scrims", requests, concurrency, list_scrims)
+
+        async def scrim_info(i):
+            await ScrimCommands.scrim_info.callback(scrim_cog, interaction(guild), rng.randint(1, seed_scrims))
+
+        await measure("scrim_info", requests, concurrency, scrim_info)
+
+        async def my_scrims(i):
+            await StatsCommands.my_scrims.callback(stats_cog, interaction(guilds[i % GUILDS]))
+
+        await measure("my_scrims", requests, concurrency, my_scrims)
+
+        async def leaderboard(i):
+            await StatsCommands.leaderboard.callback(stats_cog, interaction(guilds[i % GUILDS]))
+
+        await measure("leaderboard", requests, concurrency, leaderboard)
+
+        # Everyone on the new rosters heads to the waiting room before the starts; the presence
+        # index is rebuilt the way on_ready does it.
+        for roster in joiners:
+            for member in roster:
+                guild.waiting_room.join(member)
+        await PresenceCommands(bot).rebuild()
+
+        async def start_scrim(i):
+            await AdminCommands.start_scrim.callback(admin_cog, interaction(guild, admin), created[i])
+
+        await measure("start_scrim", len(created), concurrency, start_scrim)
+
+        async def end_scrim(i):
+            # No result given: end_scrim works it out from the scores.
+            await AdminCommands.end_scrim.callback(admin_cog, interaction(guild, admin), created[i], None, 13, 7)
+
+        await measure("end_scrim", len(created), concurrency, end_scrim)
+
+        open_scrims = [scrim.id for scrim in await db.get_active_scrims(guild.id) if scrim.status == 'open']
+
+        async def cancel_scrim(i):
+            await AdminCommands.cancel_scrim.callback(admin_cog, interaction(guild, admin), open_scrims[i])
+
+        await measure("cancel_scrim", min(requests, len(open_scrims)), concurrency, cancel_scrim)
+
+        cache = db.cache.stats()
+        print(f"scrim cache: {cache['hits']} hits / {cache['misses']} misses ({cache['hit_rate']:.0%})")
+        await db.close()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(int(args[0]) if len(args) > 0 else 200,
+                     int(args[1]) if len(args) > 1 else 20,
+                     int(args[2]) if len(args) > 2 else 20000,
+                     float(args[3]) / 1000 if len(args) > 3 else 0.0))
@@ -0,0 +1,236 @@
+"""Local stand-ins for the discord.py objects the cogs touch, so command handlers can be
+driven without a gateway connection. Every simulated Discord API call sleeps for
+`api_latency` seconds so handlers see realistic awaits.
+"""
+import asyncio
+import itertools
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import discord
+
+from database.database import Database
+from utils.names import NameResolver
+from utils.presence import PresenceIndex
+
+_snowflakes = itertools.count(10 ** 17)
+
+
+def snowflake() -> int:
+    return next(_snowflakes)
+
+
+class FakeMessage:
+    def __init__(self, api_latency: float, **content):
+        self.id = snowflake()
+        self.api_latency = api_latency
+        self.content = content
+
+    async def edit(self, **content):
+        await asyncio.sleep(self.api_latency)
+        self.content.update(content)
+
+
+class FakeMember:
+    def __init__(self, member_id: int, guild: "FakeGuild", manage_guild: bool = False):
+        self.id = member_id
+        self.name = f"player{member_id}"
+        self.display_name = self.name
+        self.mention = f"<@{member_id}>"
+        self.guild = guild
+        self.roles: List = []
+        self.guild_permissions = SimpleNamespace(manage_guild=manage_guild)
+        self.voice: Optional["FakeVoiceChannel"] = None
+        self.dms = 0
+
+    async def move_to(self, channel: "FakeVoiceChannel"):
+        await asyncio.sleep(self.guild.api_latency)
+        if self.voice is not None:
+            self.voice.leave(self)
+        channel.join(self)
+
+    async def send(self, **message):
+        await asyncio.sleep(self.guild.api_latency)
+        self.dms += 1
+
+
+# Subclassed so start_scrim's isinstance(..., discord.VoiceChannel) check passes; none of the
+# base class state is initialised, so only the members below may be used.
+class FakeVoiceChannel(discord.VoiceChannel):
+    def __init__(self, guild: "FakeGuild", name: str, category: Optional["FakeCategory"] = None):
+        self.id = snowflake()
+        self.name = name
+        self.fake_guild = guild
+        self.fake_category = category
+        self._fake_members: Dict[int, FakeMember] = {}
+
+    @property
+    def members(self) -> List[FakeMember]:
+        return list(self._fake_members.values())
+
+    def join(self, member: FakeMember):
+        self._fake_members[member.id] = member
+        member.voice = self
+
+    def leave(self, member: FakeMember):
+        self._fake_members.pop(member.id, None)
+        member.voice = None
+
+    async def delete(self):
+        await asyncio.sleep(self.fake_guild.api_latency)
+        self.fake_guild.channels.pop(self.id, None)
+
+
+class FakeCategory:
+    def __init__(self, guild: "FakeGuild", name: str):
+        self.id = snowflake()
+        self.name = name
+        self.guild = guild
+        self.channels: List[FakeVoiceChannel] = []
+
+    async def delete(self):
+        await asyncio.sleep(self.guild.api_latency)
+        self.guild.channels.pop(self.id, None)
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, api_latency: float = 0.0):
+        self.id = guild_id
+        self.api_latency = api_latency
+        self.channels: Dict[int, object] = {}
+        self.members: Dict[int, FakeMember] = {}
+        self.waiting_room = self.add_voice_channel("Waiting Room")
+
+    def add_voice_channel(self, name: str, category: Optional[FakeCategory] = None) -> FakeVoiceChannel:
+        channel = FakeVoiceChannel(self, name, category)
+        self.channels[channel.id] = channel
+        if category is not None:
+            category.channels.append(channel)
+        return channel
+
+    def add_member(self, member_id: int, manage_guild: bool = False) -> FakeMember:
+        member = self.members.get(member_id)
+        if member is None:
+            member = self.members[member_id] = FakeMember(member_id, self, manage_guild)
+        return member
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    def get_member(self, member_id: int) -> Optional[FakeMember]:
+        return self.members.get(member_id)
+
+    @property
+    def categories(self) -> List[FakeCategory]:
+        return [channel for channel in self.channels.values() if isinstance(channel, FakeCategory)]
+
+    async def create_category(self, name: str) -> FakeCategory:
+        await asyncio.sleep(self.api_latency)
+        category = FakeCategory(self, name)
+        self.channels[category.id] = category
+        return category
+
+    async def create_voice_channel(self, name: str, category: Optional[FakeCategory] = None) -> FakeVoiceChannel:
+        await asyncio.sleep(self.api_latency)
+        return self.add_voice_channel(name, category)
+
+
+class FakeResponse:
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _respond(self, **content):
+        if self._done:
+            raise RuntimeError("interaction already responded to")
+        self._done = True
+        await asyncio.sleep(self.interaction.guild.api_latency)
+        self.interaction.message = FakeMessage(self.interaction.guild.api_latency, **content)
+
+    async def send_message(self, content: Optional[str] = None, **kwargs):
+        await self._respond(content=content, **kwargs)
+
+    async def defer(self, **kwargs):
+        await self._respond()
+
+    async def edit_message(self, **kwargs):
+        await self._respond(**kwargs)
+
+
+class FakeFollowup:
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+        self.messages: List[FakeMessage] = []
+
+    async def send(self, content: Optional[str] = None, **kwargs) -> FakeMessage:
+        await asyncio.sleep(self.interaction.guild.api_latency)
+        message = FakeMessage(self.interaction.guild.api_latency, content=content, **kwargs)
+        self.messages.append(message)
+        return message
+
+
+class FakeInteraction:
+    def __init__(self, bot: "FakeBot", guild: FakeGuild, user: FakeMember):
+        self.client = bot
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.command = None
+        self.namespace = SimpleNamespace()
+        self.extras: Dict = {}
+        self.message: Optional[FakeMessage] = None
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    async def original_response(self) -> FakeMessage:
+        return self.message
+
+    async def edit_original_response(self, **content) -> FakeMessage:
+        await self.message.edit(**content)
+        return self.message
+
+
+class FakeBot:
+    def __init__(self, db: Database, guilds: List[FakeGuild]):
+        self.db = db
+        self.guilds = guilds
+        self.presence = PresenceIndex()
+        self.names = NameResolver(self)
+        self.rest_calls = 0
+        # Users only reachable through fetch_user, e.g. ones who left every shared guild.
+        self.remote_users: Dict[int, FakeMember] = {}
+        self.user = SimpleNamespace(id=snowflake(), name="ScrimBot")
+        self.latency = 0.0
+        self.startup_timings: Dict[str, float] = {}
+        self.dispatched: Dict[str, List[tuple]] = {}
+
+    def dispatch(self, event: str, *args):
+        self.dispatched.setdefault(event, []).append(args)
+
+    def get_guild(self, guild_id: int) -> Optional[FakeGuild]:
+        return next((guild for guild in self.guilds if guild.id == guild_id), None)
+
+    def get_user(self, user_id: int) -> Optional[FakeMember]:
+        for guild in self.guilds:
+            member = guild.get_member(user_id)
+            if member is not None:
+                return member
+        return None
+
+    async def fetch_user(self, user_id: int) -> FakeMember:
+        self.rest_calls += 1
+        await asyncio.sleep(self.guilds[0].api_latency if self.guilds else 0)
+        member = self.get_user(user_id) or self.remote_users.get(user_id)
+        if member is None:
+            raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown User")
+        return member
+
+    def get_channel(self, channel_id: int):
+        for guild in self.guilds:
+            channel = guild.get_channel(channel_id)
+            if channel is not None:
+                return channel
+        return None
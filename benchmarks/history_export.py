@@ -0,0 +1,107 @@
+"""Exports a million scrim player rows through Database.export_history in every format,
+reporting throughput and the worst event loop stall while each export runs. Both writers
+(CSV and NDJSON) are then rerun under tracemalloc, and the Python heap must stay under a
+fixed ceiling that does not grow with the table; those runs are several times slower, so
+they are kept out of the timings. Last, it runs the CLI for one guild and counts the rows.
+
+Usage: python -m benchmarks.history_export [scrims] [players_per_scrim] [ceiling_mib]
+"""
+import asyncio
+import gzip
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from database import export
+from database.database import Database
+
+GUILDS = 2
+
+
+def seed(conn: sqlite3.Connection, scrims: int, players: int):
+    conn.execute("BEGIN")
+    conn.executemany("""
+        INSERT INTO scrims (id, guild_id, title, game_mode, max_players, scheduled_time, creator_id, player_count,
+                            status)
+        VALUES (?, ?, ?, '5v5', ?, ?, 1, ?, 'completed')
+        """, ((i, 1 + i % GUILDS, f'Seeded, "quoted" scrim {i}', players, 1700000000 + i, players)
+              for i in range(1, scrims + 1)))
+    conn.executemany("""
+        INSERT INTO scrim_players (scrim_id, player_id, player_name, team) VALUES (?, ?, ?, ?)
+        """, ((i, 10 ** 17 + p, f"player {p} ✓", 1 + p % 2) for i in range(1, scrims + 1) for p in range(players)))
+    conn.execute("COMMIT")
+
+
+def count_lines(path: str) -> int:
+    with (gzip.open if path.endswith(".gz") else open)(path, 'rt', encoding='utf-8') as f:
+        return sum(1 for _ in f)
+
+
+async def timed_export(db: Database, path: str, fmt: str, compress: bool, trace: bool = False):
+    stalls, peak = [], 0
+
+    async def ticker():
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            stalls.append(time.perf_counter() - start - 0.01)
+
+    tick = asyncio.create_task(ticker())
+    if trace:
+        tracemalloc.start()
+    try:
+        stats = await db.export_history(path, None, fmt, compress)
+        if trace:
+            _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        tick.cancel()
+    return stats, peak, max(stalls, default=0.0)
+
+
+async def main(scrims: int, players: int, ceiling: float) -> int:
+    failures = 0
+    expected = scrims * players
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        start = time.perf_counter()
+        await db.run(seed, scrims, players)
+        print(f"seeded {scrims} scrims / {expected} player rows in {time.perf_counter() - start:.1f}s")
+        print(f"{'export':>10} | {'rows':>8} | {'s':>6} | {'rows/s':>9} | {'MiB out':>8} | {'loop stall ms':>13}")
+        for fmt in export.EXPORT_FORMATS:
+            for compress in (False, True):
+                path = os.path.join(tmp, "history" + export.export_extension(fmt, compress))
+                stats, _, stall = await timed_export(db, path, fmt, compress)
+                ok = stats['rows'] == expected and count_lines(path) == expected + (fmt == 'csv')
+                failures += not ok
+                print(f"{export.export_extension(fmt, compress):>10} | {stats['rows']:8d} | {stats['elapsed']:6.2f} | "
+                      f"{stats['rows'] / stats['elapsed']:9.0f} | {os.path.getsize(path) / 2 ** 20:8.1f} | "
+                      f"{stall * 1000:13.1f}{'' if ok else '  FAILED'}")
+                os.remove(path)
+
+        for fmt in export.EXPORT_FORMATS:
+            path = os.path.join(tmp, "history" + export.export_extension(fmt, True))
+            stats, peak, _ = await timed_export(db, path, fmt, True, trace=True)
+            ok = stats['rows'] == expected and peak < ceiling * 2 ** 20
+            failures += not ok
+            print(f"traced {fmt}.gz: {stats['rows']} rows, peak Python heap {peak / 2 ** 20:.2f} MiB "
+                  f"(ceiling {ceiling:g} MiB){'' if ok else '  FAILED'}")
+            os.remove(path)
+
+        await db.close()
+        path = os.path.join(tmp, "guild.ndjson.gz")
+        export.main(["--db", db.db_path, "--guild", "2", "--format", "ndjson", "--gzip", path])
+        failures += count_lines(path) != (scrims // GUILDS) * players
+
+    print("ok" if not failures else f"{failures} checks FAILED")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sys.exit(asyncio.run(main(int(args[0]) if len(args) > 0 else 100000,
+                              int(args[1]) if len(args) > 1 else 10,
+                              float(args[2]) if len(args) > 2 else 8.0)))
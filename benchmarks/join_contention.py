@@ -0,0 +1,60 @@
+"""Fires hundreds of simultaneous joins (and some leaves) at one scrim and checks that the
+roster never exceeds max_players and player_count matches the scrim_players rows.
+
+Usage: python -m benchmarks.join_contention [joins] [max_players]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+from database.database import Database
+
+
+async def main(joins: int, max_players: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        scrim_id = await db.insert_scrim(1, "contention", "5v5", 1893456000, max_players,
+                                         SimpleNamespace(id=0, name="creator"))
+        users = [SimpleNamespace(id=i, name=f"player{i}") for i in range(1, joins + 1)]
+
+        async def churn(user):
+            # Every third player leaves straight away to keep the capacity check contended.
+            outcome = await db.join_scrim_atomic(scrim_id, user)
+            if outcome['result'] == 'joined' and user.id % 3 == 0:
+                return (await db.leave_scrim_atomic(scrim_id, user.id))['result']
+            return outcome['result']
+
+        async def rejoin(user):
+            return (await db.join_scrim_atomic(scrim_id, user))['result']
+
+        start = time.perf_counter()
+        results = Counter(await asyncio.gather(*(churn(user) for user in users),
+                                               *(rejoin(user) for user in users[:50])))
+        elapsed = time.perf_counter() - start
+
+        scrim = await db.get_scrim_by_id(scrim_id)
+        rows = len(await db.get_scrim_players(scrim_id))
+
+        # Once the scrim has started its roster is frozen: leaving is refused and changes nothing.
+        await db.update_scrim_status(scrim_id, "active")
+        member = (await db.get_scrim_players(scrim_id))[0].player_id
+        late_leave = (await db.leave_scrim_atomic(scrim_id, member))['result']
+        rows_after = len(await db.get_scrim_players(scrim_id))
+        await db.close()
+
+    print(f"{joins} concurrent joins in {elapsed * 1000:.1f} ms: {dict(results)}")
+    print(f"player_count={scrim.player_count} rows={rows} max_players={max_players} status={scrim.status}")
+    assert rows <= max_players, "scrim overfilled"
+    assert scrim.player_count == rows, "player_count drifted from roster"
+    assert (scrim.status == 'full') == (rows == max_players), "status out of sync with roster"
+    print(f"leave after start: {late_leave}, rows {rows_after}")
+    assert late_leave == 'closed' and rows_after == rows, "left a started scrim"
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+                     int(sys.argv[2]) if len(sys.argv) > 2 else 10))
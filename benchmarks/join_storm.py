@@ -0,0 +1,89 @@
+"""Measures event-loop lag while a burst of concurrent /join_scrim calls hits the database.
+
+The "before" run issues the same queries the old blocking Database made (a fresh
+sqlite3.connect() per call, directly on the event loop); the "after" run goes through
+the async Database. Usage: python -m benchmarks.join_storm [joins]
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from database.database import Database
+
+
+async def monitor_lag(stop: asyncio.Event, samples: list, interval: float = 0.001):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+def blocking_join(db_path: str, scrim_id: int, user):
+    def query(sql, params=()):
+        with sqlite3.connect(db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+    def insert(sql, params=()):
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(sql, params)
+            conn.commit()
+
+    query("SELECT * FROM scrims WHERE id = ?", (scrim_id,))
+    query("SELECT * FROM scrim_players WHERE (scrim_id = ?) AND (player_id = ?)", (scrim_id, user.id))
+    insert("UPDATE scrims SET player_count = player_count + 1 WHERE id = ?", (scrim_id,))
+    insert("INSERT INTO scrim_players (scrim_id, player_id, player_name) VALUES (?, ?, ?)",
+           (scrim_id, user.id, user.name))
+    query("SELECT * FROM scrims WHERE id = ?", (scrim_id,))
+
+
+async def async_join(db: Database, scrim_id: int, user):
+    await db.join_scrim_atomic(scrim_id, user)
+
+
+async def run(label: str, joins: int, make_call):
+    samples = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_lag(stop, samples))
+    await asyncio.sleep(0.01)
+
+    async def call(i):
+        await make_call(SimpleNamespace(id=i, name=f"player{i}"))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(joins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await monitor
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99) - 1] if samples else 0.0
+    worst = samples[-1] if samples else 0.0
+    print(f"{label:>7}: {joins} joins in {elapsed * 1000:8.1f} ms | "
+          f"loop lag p99 {p99 * 1000:6.2f} ms, max {worst * 1000:6.2f} ms")
+
+
+async def main(joins: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        user = SimpleNamespace(id=0, name="creator")
+        before_id = await db.insert_scrim(1, "before", "5v5", 1893456000, joins, user)
+        after_id = await db.insert_scrim(1, "after", "5v5", 1893456000, joins, user)
+
+        async def before(player):
+            blocking_join(db.db_path, before_id, player)
+
+        async def after(player):
+            await async_join(db, after_id, player)
+
+        await run("before", joins, before)
+        await run("after", joins, after)
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
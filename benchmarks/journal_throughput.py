@@ -0,0 +1,134 @@
+"""Joins per second with and without group commit, and checks the scrim_events journal
+agrees with the tables it sits next to: each scrim's roster replayed from joined/left events
+must equal its scrim_players rows, and replay_player_stats must rebuild player_stats exactly -
+including a pre-upgrade scrim merged in by adopt_unscoped_rows, and again after the retention
+job has purged half the scrims along with their journal rows. Joins still queued when the
+database closes must be committed.
+
+Usage: python -m benchmarks.journal_throughput [scrims] [players_per_scrim] [synchronous]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Dict, Set, Tuple
+
+from database.database import Database
+
+GUILD_ID = 1
+
+
+async def churn(db: Database, scrims: int, players: int) -> Tuple[int, float]:
+    scrim_ids = [await db.insert_scrim(GUILD_ID, f"Journal {i}", "5v5", 1893456000, players, SimpleNamespace(id=0))
+                 for i in range(scrims)]
+    users = [SimpleNamespace(id=i, name=f"player{i}") for i in range(1, players + 1)]
+
+    async def join(scrim_id, user):
+        # Every fifth player leaves again, so the journal has to net joins against leaves.
+        outcome = await db.join_scrim_atomic(scrim_id, user, GUILD_ID)
+        if outcome['result'] == 'joined' and user.id % 5 == 0:
+            await db.leave_scrim_atomic(scrim_id, user.id, GUILD_ID)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(join(scrim_id, user) for scrim_id in scrim_ids for user in users))
+    elapsed = time.perf_counter() - start
+
+    # Finish the scrims a few different ways so replay covers team, ended and cancelled events.
+    for i, scrim_id in enumerate(scrim_ids):
+        roster = await db.get_scrim_players(scrim_id)
+        await db.update_player_teams(scrim_id, {player.player_id: 1 + j % 2 for j, player in enumerate(roster)})
+        if i % 3 == 0:
+            await db.update_scrim_status(scrim_id, "cancelled")
+        elif i % 3 == 1:
+            await db.update_scrim_status(scrim_id, "active")
+            await db.update_scrim_status(scrim_id, "completed")
+
+    # A scrim from before multi-guild support, claimed by the guild. Player 1 already has stats
+    # in the guild, so adoption has to merge the two rows.
+    legacy_id = await db.insert_scrim(0, "Legacy", "5v5", 1893456000, players, SimpleNamespace(id=0))
+    for player_id in (1, players + 1, players + 2):
+        await db.join_scrim_atomic(legacy_id, SimpleNamespace(id=player_id, name=f"legacy{player_id}"))
+    await db.adopt_unscoped_rows(GUILD_ID)
+    return scrims * players, elapsed
+
+
+async def check(db: Database) -> int:
+    failures = 0
+    journal: Dict[int, Set[int]] = {}
+    for event in await db.execute_query("""
+        SELECT scrim_id, event, player_id FROM scrim_events
+        WHERE event IN ('joined', 'left') ORDER BY id
+        """):
+        roster = journal.setdefault(event['scrim_id'], set())
+        if event['event'] == 'joined':
+            roster.add(event['player_id'])
+        else:
+            roster.discard(event['player_id'])
+    rosters: Dict[int, Set[int]] = {}
+    for row in await db.execute_query("SELECT scrim_id, player_id FROM scrim_players"):
+        rosters.setdefault(row['scrim_id'], set()).add(row['player_id'])
+    drifted = sum(journal.get(scrim_id, set()) != roster for scrim_id, roster in rosters.items())
+    failures += drifted
+    print(f"rosters replayed from journal: {len(rosters) - drifted}/{len(rosters)} match scrim_players")
+
+    # Finished scrims keep their status; cancelling a completed one would count its players twice.
+    completed = await db.execute_query("SELECT id FROM scrims WHERE status = 'completed' LIMIT 1")
+    flipped = await db.update_scrim_status(completed[0]['id'], "cancelled")
+    events = await db.execute_query("SELECT event FROM scrim_events WHERE scrim_id = ? AND event = 'cancelled'",
+                                    (completed[0]['id'],))
+    failures += flipped or bool(events)
+    print(f"cancelling a completed scrim refused: {not flipped and not events}")
+
+    query = "SELECT * FROM player_stats WHERE guild_id = ? ORDER BY player_id"
+    live = await db.execute_query(query, (GUILD_ID,))
+    replayed_players = await db.replay_player_stats(GUILD_ID)
+    replayed = await db.execute_query(query, (GUILD_ID,))
+    failures += live != replayed
+    print(f"replay_player_stats: {replayed_players} players, matches live stats: {live == replayed}")
+
+    await db.run(lambda conn: conn.execute("UPDATE scrims SET created_at = 0 WHERE id % 2 = 0"))
+    purged = await db.delete_old_scrims()
+    replayed_players = await db.replay_player_stats(GUILD_ID)
+    replayed = await db.execute_query(query, (GUILD_ID,))
+    failures += live != replayed or not purged['scrims']
+    print(f"after purging {purged['scrims']} scrims: {replayed_players} players, "
+          f"matches live stats: {live == replayed}")
+    return failures
+
+
+async def main(scrims: int, players: int, synchronous: str) -> int:
+    failures = 0
+    print(f"{'group commit':>12} | {'joins':>6} | {'joins/s':>9} | {'avg group':>9}")
+    for group_commit in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(os.path.join(tmp, "bench.db"), group_commit=group_commit)
+            await db.run(lambda conn: conn.execute(f"PRAGMA synchronous = {synchronous}"))
+            joins, elapsed = await churn(db, scrims, players)
+            groups = db.write_groups
+            print(f"{'on' if group_commit else 'off':>12} | {joins:6d} | {joins / elapsed:9.0f} | "
+                  f"{groups['writes'] / groups['groups'] if groups['groups'] else 1:9.1f}")
+            failures += await check(db)
+
+            # Joins still queued when the bot shuts down are committed by close(), not dropped.
+            late_id = await db.insert_scrim(GUILD_ID, "Late", "5v5", 1893456000, players, SimpleNamespace(id=0))
+            late = [asyncio.ensure_future(db.join_scrim_atomic(late_id, SimpleNamespace(id=i, name=f"late{i}"),
+                                                               GUILD_ID))
+                    for i in range(1, players + 1)]
+            await asyncio.sleep(0)
+            await db.close()
+            db = Database(os.path.join(tmp, "bench.db"))
+            kept = len(await db.get_scrim_players(late_id))
+            await db.close()
+            failures += kept != players or not all(join.done() for join in late)
+            print(f"joins queued at close: {kept}/{players} committed")
+    print("ok" if not failures else f"{failures} checks FAILED")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sys.exit(asyncio.run(main(int(args[0]) if len(args) > 0 else 50,
+                              int(args[1]) if len(args) > 1 else 20,
+                              args[2].upper() if len(args) > 2 else "NORMAL")))
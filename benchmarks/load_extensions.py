@@ -0,0 +1,46 @@
+"""Loads every cog in main.EXTENSIONS into a real ScrimBot against a scratch database, the way
+setup_hook does, and fails if any extension doesn't load or registers no commands or listeners.
+No gateway connection is made.
+
+Usage: python -m benchmarks.load_extensions
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+from discord.ext import commands
+
+import main
+from database.database import Database
+
+
+async def run() -> int:
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        bot = main.ScrimBot()
+        bot.db = Database(os.path.join(tmp, "bench.db"))
+        # The context manager initialises the client without logging in, so task loops wait
+        # for a ready event that never comes; closing it unloads nothing, so unload first.
+        async with bot:
+            try:
+                await asyncio.gather(bot.open_database(), bot.load_extensions())
+            except commands.ExtensionError as e:
+                print(f"FAILED: {e} ({e.__cause__!r})")
+                failures += 1
+            for extension in main.EXTENSIONS:
+                cogs = [cog for cog in bot.cogs.values() if cog.__module__ == extension]
+                app_commands = sum(len(cog.get_app_commands()) for cog in cogs)
+                listeners = sum(len(cog.get_listeners()) for cog in cogs)
+                ok = extension in bot.extensions and bool(cogs) and app_commands + listeners > 0
+                failures += not ok
+                print(f"{extension:>28}: {len(cogs)} cog, {app_commands} commands, {listeners} listeners"
+                      f"{'' if ok else '  FAILED'}")
+            for extension in list(bot.extensions):
+                await bot.unload_extension(extension)
+    print("ok" if not failures else f"{failures} checks FAILED")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run()))
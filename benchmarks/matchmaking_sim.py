@@ -0,0 +1,139 @@
+"""Simulates /queue matchmaking. First times MatchQueue.match() on thousands of queued players,
+first-come and within a rating band. Then replays a steady arrival stream on a fake clock,
+ticking once a second, and reports time-to-match and throughput. Last, it runs queued players
+through QueueCommands end to end: it checks that every lobby becomes one full scrim in a single
+bulk write and that every player gets a DM.
+
+Usage: python -m benchmarks.matchmaking_sim [queued] [arrivals_per_second] [seconds] [band]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import List
+
+from benchmarks.fakes import FakeBot, FakeGuild, FakeInteraction
+from cogs.queue_commands import QueueCommands
+from database.database import Database
+from utils.matchmaking import Lobby, MatchQueue, QueueEntry
+
+MODES = (("5v5", 10), ("3v3", 6), ("1v1", 2))
+
+
+def percentile(samples: List[float], q: float) -> float:
+    return samples[min(int(len(samples) * q), len(samples) - 1)] if samples else 0.0
+
+
+def fill(queue: MatchQueue, rng: random.Random, players: int, now: float, first_id: int = 0, max_age: float = 30):
+    for player_id in range(first_id, first_id + players):
+        game_mode, size = MODES[player_id % len(MODES)]
+        queue.enqueue((1, game_mode, size), QueueEntry(player_id, f"player{player_id}",
+                                                       rng.gauss(1000, 200), now - rng.uniform(0, max_age)))
+
+
+def check_lobbies(queue: MatchQueue, lobbies: List[Lobby], now: float) -> int:
+    failures, seen = 0, set()
+    for lobby in lobbies:
+        ids = {entry.player_id for entry in lobby.players}
+        failures += len(ids) != lobby.key[2] or bool(ids & seen)
+        seen |= ids
+        if queue.band is not None:
+            spread = max(e.rating for e in lobby.players) - min(e.rating for e in lobby.players)
+            waited = now - min(e.enqueued_at for e in lobby.players)
+            failures += spread > queue.band + queue.band_growth * waited + 1e-9
+    return failures
+
+
+def tick_cost(queued: int, band) -> int:
+    rng = random.Random(0)
+    queue = MatchQueue(band=band)
+    now = 1_000_000.0
+    fill(queue, rng, queued, now)
+    start = time.perf_counter()
+    lobbies = queue.match(now)
+    elapsed = time.perf_counter() - start
+    print(f"{'off' if band is None else band:>6} | {queued:7d} | {len(lobbies):7d} | {queue.matched:7d} | "
+          f"{len(queue):7d} | {elapsed * 1000:8.2f}")
+    return check_lobbies(queue, lobbies, now)
+
+
+def arrivals(rate: int, seconds: int, band) -> int:
+    rng = random.Random(1)
+    queue = MatchQueue(band=band)
+    now, waits, spreads, tick_times, failures = 1_000_000.0, [], [], [], 0
+    for second in range(seconds):
+        # This second's arrivals, spread across it; the matcher ticks at its end.
+        now += 1
+        fill(queue, rng, rate, now, second * rate, max_age=1)
+        start = time.perf_counter()
+        lobbies = queue.match(now)
+        tick_times.append(time.perf_counter() - start)
+        failures += check_lobbies(queue, lobbies, now)
+        for lobby in lobbies:
+            waits.extend(now - entry.enqueued_at for entry in lobby.players)
+            spreads.append(max(e.rating for e in lobby.players) - min(e.rating for e in lobby.players))
+    waits.sort()
+    tick_times.sort()
+    print(f"band {'off' if band is None else band}: {queue.matched}/{rate * seconds} matched, "
+          f"{queue.matched / sum(tick_times):,.0f} players/s of matcher CPU, "
+          f"tick p50 {percentile(tick_times, 0.5) * 1000:.2f}ms p99 {percentile(tick_times, 0.99) * 1000:.2f}ms; "
+          f"wait p50 {percentile(waits, 0.5):.1f}s p99 {percentile(waits, 0.99):.1f}s; "
+          f"mean lobby spread {sum(spreads) / len(spreads):.0f}")
+    return failures
+
+
+async def end_to_end(players: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        guild = FakeGuild(1)
+        bot = FakeBot(db, [guild])
+        cog = QueueCommands(bot)
+        for player_id in range(1, players + 1):
+            member = guild.add_member(player_id)
+            await QueueCommands.queue_command.callback(cog, FakeInteraction(bot, guild, member), "5v5", 10)
+
+        writes = db.write_groups['groups']
+        start = time.perf_counter()
+        scrims = await cog.form_lobbies()
+        elapsed = time.perf_counter() - start
+        await asyncio.gather(*cog._notifications)
+
+        rows = await db.execute_query("""
+            SELECT s.id, s.status, s.player_count, COUNT(sp.player_id) AS players
+            FROM scrims s JOIN scrim_players sp ON sp.scrim_id = s.id
+            GROUP BY s.id
+            """)
+        rostered = await db.execute_query("SELECT COUNT(DISTINCT player_id) AS players FROM scrim_players")
+        failures = len(scrims) != players // 10
+        failures += any(row['status'] != 'full' or row['player_count'] != 10 or row['players'] != 10 for row in rows)
+        failures += rostered[0]['players'] != len(scrims) * 10
+        failures += db.write_groups['groups'] - writes != 1
+        failures += sum(member.dms for member in guild.members.values()) != len(scrims) * 10
+        failures += len(bot.dispatched.get('scrim_joined', [])) != len(scrims) * 10
+        print(f"end to end: {players} queued -> {len(scrims)} scrims created in {elapsed * 1000:.1f}ms "
+              f"({db.write_groups['groups'] - writes} write), {len(cog.queue)} left waiting, "
+              f"{sum(member.dms for member in guild.members.values())} DMs")
+        await db.close()
+        return failures
+
+
+async def main(queued: int, rate: int, seconds: int, band: float) -> int:
+    failures = 0
+    print(f"{'band':>6} | {'queued':>7} | {'lobbies':>7} | {'matched':>7} | {'waiting':>7} | {'tick ms':>8}")
+    for tick_band in (None, band):
+        failures += tick_cost(queued, tick_band)
+    for arrival_band in (None, band):
+        failures += arrivals(rate, seconds, arrival_band)
+    failures += await end_to_end(1005)
+    print("ok" if not failures else f"{failures} checks FAILED")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sys.exit(asyncio.run(main(int(args[0]) if len(args) > 0 else 10000,
+                              int(args[1]) if len(args) > 1 else 60,
+                              int(args[2]) if len(args) > 2 else 300,
+                              float(args[3]) if len(args) > 3 else 150.0)))
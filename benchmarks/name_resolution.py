@@ -0,0 +1,112 @@
+"""Counts fetch_user REST calls behind repeated /scrim_info views and /end_scrim rosters.
+
+Half the scrims are created by users who have left the guild, so only REST knows their
+name. The old handler fetched the creator on every view; with NameResolver the first view
+of each creator may fetch, every repeat must not. /end_scrim must show players' current
+display names and write them back to the stored rosters in the background.
+
+Usage: python -m benchmarks.name_resolution [scrims] [views_per_scrim] [api_latency_ms]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+from discord import app_commands
+
+from benchmarks.fakes import FakeBot, FakeGuild, FakeInteraction, FakeMember
+from cogs.admin_commands import AdminCommands
+from cogs.scrim_commands import ScrimCommands
+from database.database import Database
+
+
+def percentile(samples: List[float], q: float) -> float:
+    return samples[min(int(len(samples) * q), len(samples) - 1)] if samples else 0.0
+
+
+async def main(scrims: int, views: int, api_latency: float) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        guild = FakeGuild(1, api_latency)
+        bot = FakeBot(db, [guild])
+        viewer = guild.add_member(1, manage_guild=True)
+        cog, admin_cog = ScrimCommands(bot), AdminCommands(bot)
+
+        scrim_ids = []
+        for i in range(scrims):
+            creator_id = 1000 + i
+            if i % 2:
+                creator = bot.remote_users[creator_id] = FakeMember(creator_id, guild)
+            else:
+                creator = guild.add_member(creator_id)
+            scrim_ids.append(await db.insert_scrim(guild.id, f"Scrim {i}", "5v5", int(time.time()) + 3600, 10,
+                                                   creator))
+        departed = scrims // 2
+        failures = 0
+
+        # Before: one fetch_user per view, as scrim_info used to do.
+        start = time.perf_counter()
+        for _ in range(views):
+            for scrim_id in scrim_ids:
+                scrim = await db.get_scrim_by_id(scrim_id, guild.id)
+                try:
+                    await bot.fetch_user(scrim.creator_id)
+                except Exception:
+                    pass
+        print(f"fetch per view: {bot.rest_calls} REST calls for {views * scrims} views "
+              f"in {time.perf_counter() - start:.2f}s")
+
+        for view in range(views):
+            bot.rest_calls = 0
+            latencies = []
+            for scrim_id in scrim_ids:
+                start = time.perf_counter()
+                await ScrimCommands.scrim_info.callback(cog, FakeInteraction(bot, guild, viewer), scrim_id)
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            expected = departed if view == 0 else 0
+            failures += bot.rest_calls != expected
+            print(f"scrim_info pass {view + 1}: {bot.rest_calls} REST calls (expected {expected}), "
+                  f"p50 {percentile(latencies, 0.5) * 1000:.2f}ms, p99 {percentile(latencies, 0.99) * 1000:.2f}ms")
+
+        # Players rename themselves after joining; the results embed and stored roster must follow.
+        # One more player has since left and can't be fetched; the name stored at join time stands.
+        scrim_id = scrim_ids[0]
+        players = [guild.add_member(2000 + i) for i in range(4)]
+        for player in players:
+            await db.join_scrim_atomic(scrim_id, player, guild.id)
+            player.display_name = f"Renamed {player.id}"
+        departed_player = FakeMember(3000, guild)
+        await db.join_scrim_atomic(scrim_id, departed_player, guild.id)
+        await db.update_player_teams(scrim_id, {player.id: 1 + i % 2
+                                                for i, player in enumerate(players + [departed_player])})
+        await db.update_scrim_status(scrim_id, "active")
+        interaction = FakeInteraction(bot, guild, viewer)
+        await AdminCommands.end_scrim.callback(admin_cog, interaction, scrim_id,
+                                               app_commands.Choice(name="Team 1 won", value=1), 13, 7)
+        shown = "".join(field.value for field in interaction.followup.messages[-1].content['embed'].fields[:2])
+        failures += not all(f"Renamed {player.id}" in shown for player in players)
+        failures += f"• {departed_player.name}" not in shown
+        await asyncio.gather(*bot.names._refreshes)
+        stored = await db.execute_query("SELECT player_name FROM scrim_players WHERE scrim_id = ?", (scrim_id,))
+        expected_names = sorted([f"Renamed {p.id}" for p in players] + [departed_player.name])
+        failures += sorted(row['player_name'] for row in stored) != expected_names
+        print(f"end_scrim shows current names: {all(f'Renamed {p.id}' in shown for p in players)}; "
+              f"departed player shown by stored name: {f'• {departed_player.name}' in shown}; "
+              f"stored names refreshed: {sorted(row['player_name'] for row in stored)}")
+
+        stats = bot.names.stats()
+        print(f"name lookups: {stats['total']} • member {stats['member']} • user {stats['user']} • "
+              f"cache {stats['cache']} • REST {stats['rest']} • {stats['hit_rate']:.1%} without REST")
+        print("ok" if not failures else f"{failures} checks FAILED")
+        await db.close()
+        return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sys.exit(asyncio.run(main(int(args[0]) if len(args) > 0 else 200,
+                              int(args[1]) if len(args) > 1 else 3,
+                              float(args[2]) / 1000 if len(args) > 2 else 20.0 / 1000)))
@@ -0,0 +1,140 @@
+"""Fails if any hot query falls back to a full table scan on the current schema.
+
+Rather than keeping copies of the SQL, it calls the Database methods behind the hot commands
+against a small seeded database, records every statement they issue through the connection's
+trace callback, and checks the EXPLAIN QUERY PLAN of each. Caches are emptied before every
+call so the lookups reach SQLite; a method that issues no SQL at all also fails. Scanning a
+partial index is allowed: it only holds the rows the query wants (e.g. scrims with channels).
+
+Usage: python -m benchmarks.query_plans
+"""
+import asyncio
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Awaitable, Callable, Dict, List
+
+from database.cache import ScrimSearchIndex
+from database.database import Database
+
+GUILD_ID = 1
+# Transaction control and pragmas have no plan worth checking.
+PLANNED = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+INDEX_SCAN = re.compile(r"^SCAN \w+ USING (?:COVERING )?INDEX (\w+)")
+
+
+async def seed(db: Database) -> SimpleNamespace:
+    users = [SimpleNamespace(id=i, name=f"player{i}") for i in range(1, 11)]
+    later = int(time.time()) + 3600
+    played = await db.insert_scrim(GUILD_ID, "Played", "5v5", later, 10, users[0])
+    for user in users:
+        await db.join_scrim_atomic(played, user, GUILD_ID)
+    await db.update_player_teams(played, {user.id: 1 + i % 2 for i, user in enumerate(users)})
+    await db.update_scrim_channels(played, 1, 2, 3)
+    await db.update_scrim_status(played, "active")
+    open_id = await db.insert_scrim(GUILD_ID, "Open", "5v5", later, 10, users[0])
+    # One expired scrim here and one in another guild, which only the unscoped purge reaches.
+    for guild_id in (GUILD_ID, GUILD_ID + 1):
+        expired = await db.insert_scrim(guild_id, "Expired", "5v5", later, 10, users[0])
+        await db.join_scrim_atomic(expired, users[1], guild_id)
+        await db.run(lambda conn: conn.execute("UPDATE scrims SET created_at = 0 WHERE id = ?", (expired,)))
+    await db.set_guild_config(GUILD_ID, waiting_room_vc_id=4)
+    return SimpleNamespace(played=played, open=open_id, users=users)
+
+
+def hot_calls(seeded: SimpleNamespace) -> Dict[str, Callable[[Database], Awaitable]]:
+    # In the order they run; the write paths come last, ending with the scrims they finish.
+    player = seeded.users[0]
+    return {
+        "get_scrim_by_id": lambda db: db.get_scrim_by_id(seeded.played, GUILD_ID),
+        "get_scrim_players": lambda db: db.get_scrim_players(seeded.played),
+        "is_user_in_scrim": lambda db: db.is_user_in_scrim(seeded.played, player.id),
+        "get_active_scrims": lambda db: db.get_active_scrims(GUILD_ID),
+        "get_active_scrims_page": lambda db: db.get_active_scrims_page(GUILD_ID),
+        "get_active_scrims_page (back)": lambda db: db.get_active_scrims_page(GUILD_ID, before_id=seeded.open + 1),
+        "get_player_history": lambda db: db.get_player_history(GUILD_ID, player.id),
+        "get_player_stats": lambda db: db.get_player_stats(GUILD_ID, player.id),
+        "get_player_ratings": lambda db: db.get_player_ratings(GUILD_ID, [user.id for user in seeded.users]),
+        "get_leaderboard": lambda db: db.get_leaderboard(GUILD_ID),
+        "search_scrims": lambda db: db.search_scrims(GUILD_ID, "Open"),
+        "get_guild_config": lambda db: db.get_guild_config(GUILD_ID),
+        "get_upcoming_scrims": lambda db: db.get_upcoming_scrims(int(time.time())),
+        "get_joinable_rosters": lambda db: db.get_joinable_rosters(),
+        "get_channel_scrims": lambda db: db.get_channel_scrims(),
+        "join_scrim_atomic": lambda db: db.join_scrim_atomic(seeded.open, player, GUILD_ID),
+        "leave_scrim_atomic": lambda db: db.leave_scrim_atomic(seeded.open, player.id, GUILD_ID),
+        "update_player_names": lambda db: db.update_player_names({player.id: "renamed"}, seeded.played),
+        "update_player_teams": lambda db: db.update_player_teams(seeded.played, {player.id: 1}),
+        "update_scrim_status": lambda db: db.update_scrim_status(seeded.played, "completed"),
+        "record_scrim_result": lambda db: db.record_scrim_result(seeded.played, 1, player.id),
+        "clear_scrim_channels": lambda db: db.clear_scrim_channels([seeded.played]),
+        "replay_player_stats": lambda db: db.replay_player_stats(GUILD_ID),
+        "delete_old_scrims (guild)": lambda db: db.delete_old_scrims(guild_id=GUILD_ID),
+        "delete_old_scrims": lambda db: db.delete_old_scrims(),
+    }
+
+
+def reset_caches(db: Database):
+    db.cache.clear()
+    db.pages.clear()
+    db.ranks.clear()
+    db.guild_configs.clear()
+    db.search = ScrimSearchIndex()
+
+
+async def main() -> int:
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "plans.db"))
+        seeded = await seed(db)
+
+        issued: List[str] = []
+        await db.run(lambda conn: conn.set_trace_callback(issued.append))
+        statements: Dict[str, List[str]] = {}
+        for name, call in hot_calls(seeded).items():
+            reset_caches(db)
+            start = len(issued)
+            await call(db)
+            statements[name] = [sql for sql in issued[start:] if sql.lstrip().upper().startswith(PLANNED)]
+        await db.run(lambda conn: conn.set_trace_callback(None))
+
+        def explain(conn: sqlite3.Connection, sql: str) -> List[str]:
+            return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+        partial_indexes = {row['name'] for row in await db.execute_query("""
+            SELECT il.name FROM sqlite_master m, pragma_index_list(m.name) il
+            WHERE m.type = 'table' AND il.partial
+            """)}
+
+        def full_scan(step: str) -> bool:
+            index = INDEX_SCAN.match(step)
+            return step.startswith("SCAN") and not (index and index.group(1) in partial_indexes)
+
+        for name, issued_sql in statements.items():
+            if not issued_sql:
+                print(f"FAIL  {name}: issued no SQL")
+                failures += 1
+            # executemany traces one statement per row; report each distinct plan once.
+            plans: Dict[str, str] = {}
+            for sql in issued_sql:
+                plans.setdefault("; ".join(await db.run(explain, sql)), sql)
+            for plan, sql in plans.items():
+                if not plan and len(plans) > 1:
+                    continue
+                scans = [step for step in plan.split("; ") if full_scan(step)]
+                failures += bool(scans)
+                print(f"{'FAIL' if scans else 'ok':>4}  {name}: {plan or 'no table access'}")
+                if scans:
+                    print(f"      {' '.join(sql.split())}")
+        await db.close()
+
+    print("ok" if not failures else f"{failures} checks FAILED")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
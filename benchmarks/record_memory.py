@@ -0,0 +1,77 @@
+"""Peak memory and allocated blocks for reading a large scrim table three ways: a list of
+dicts (execute_query's default), a list of slotted Scrim records, and streaming records
+through iter_query in fetchmany batches.
+
+Usage: python -m benchmarks.record_memory [scrims]
+"""
+import asyncio
+import gc
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Awaitable, Callable
+
+from database.database import Database
+from database.records import SCRIM_COLUMNS, Scrim
+
+QUERY = f"SELECT {SCRIM_COLUMNS} FROM scrims WHERE guild_id = ? ORDER BY id"
+
+
+def seed(conn: sqlite3.Connection, scrims: int):
+    conn.execute("BEGIN")
+    conn.executemany("""
+        INSERT INTO scrims (guild_id, title, game_mode, max_players, scheduled_time, creator_id, player_count, status)
+        VALUES (1, ?, '5v5', 10, ?, ?, 10, 'completed')
+        """, [(f"Seeded scrim {i}", 1700000000 + i, 10 ** 17 + i) for i in range(scrims)])
+    conn.execute("COMMIT")
+
+
+async def measure(name: str, scrims: int, read: Callable[[], Awaitable[int]]):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = await read()
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+    assert rows == scrims, f"{name} read {rows} rows"
+    print(f"{name:>16} | {peak / 2 ** 20:8.1f} | {retained / 2 ** 20:8.1f} | {retained / rows:9.0f} | {blocks:9d} | "
+          f"{elapsed * 1000:8.1f}")
+
+
+async def main(scrims: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        await db.run(seed, scrims)
+        print(f"{'read':>16} | {'peak MiB':>8} | {'held MiB':>8} | {'B/row':>9} | {'blocks':>9} | {'ms':>8}")
+
+        held = []
+
+        async def dicts() -> int:
+            held[:] = await db.execute_query(QUERY, (1,))
+            return len(held)
+
+        async def records() -> int:
+            held[:] = await db.execute_query(QUERY, (1,), Scrim.from_row)
+            return len(held)
+
+        async def streamed() -> int:
+            held.clear()
+            count = 0
+            async for scrim in db.iter_scrims(1):
+                count += scrim.player_count > 0
+            return count
+
+        # Results are kept alive until after the snapshot, like a caller that holds the list.
+        await measure("list of dicts", scrims, dicts)
+        await measure("list of Scrim", scrims, records)
+        await measure("iter_scrims", scrims, streamed)
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000))
@@ -0,0 +1,79 @@
+"""Drives utils.scheduler.ScrimScheduler with a fake clock and thousands of pending scrims.
+
+Shows scheduling cost, CPU used while idle (nothing due), and that every reminder fires
+exactly once for scrims that were not cancelled. Usage: python -m benchmarks.scheduler_load [scrims]
+"""
+import asyncio
+import heapq
+import itertools
+import random
+import sys
+import time
+
+from utils.scheduler import EVENT_OFFSETS, ScrimScheduler
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+        self._sleepers = []
+        self._counter = itertools.count()
+
+    def time(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self.now + delay, next(self._counter), future))
+        await future
+
+    async def advance(self, seconds: float):
+        self.now += seconds
+        while self._sleepers and self._sleepers[0][0] <= self.now:
+            _, _, future = heapq.heappop(self._sleepers)
+            if not future.done():
+                future.set_result(None)
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+
+async def main(count: int):
+    random.seed(0)
+    clock = FakeClock(1_000_000.0)
+    fired = {}
+
+    async def handler(scrim_id: int, offset: int):
+        fired[(scrim_id, offset)] = fired.get((scrim_id, offset), 0) + 1
+
+    scheduler = ScrimScheduler(handler, clock=clock.time, sleep=clock.sleep)
+    scheduler.start()
+
+    start = time.perf_counter()
+    for scrim_id in range(count):
+        scheduler.schedule(scrim_id, clock.now + random.randint(20 * 60, 24 * 60 * 60))
+    print(f"scheduled {count} scrims ({count * len(EVENT_OFFSETS)} events) in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+    cancelled = set(random.sample(range(count), count // 10))
+    for scrim_id in cancelled:
+        scheduler.unschedule(scrim_id)
+
+    cpu = time.process_time()
+    await asyncio.sleep(1.0)
+    print(f"idle for 1s of wall time with {len(scheduler)} pending: {(time.process_time() - cpu) * 1000:.2f} ms CPU")
+
+    cpu = time.process_time()
+    for _ in range(25 * 60):
+        await clock.advance(60)
+    print(f"advanced 25 fake hours in {(time.process_time() - cpu) * 1000:.1f} ms CPU, "
+          f"fired {scheduler.fired} events")
+
+    expected = {(scrim_id, offset) for scrim_id in range(count) if scrim_id not in cancelled
+                for offset in EVENT_OFFSETS}
+    assert set(fired) == expected, "missing or unexpected events"
+    assert all(times == 1 for times in fired.values()), "an event fired more than once"
+    scheduler.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,44 @@
+"""Compares utils.teams.balance_teams with the old shuffle-and-split on random lobbies.
+
+Reports mean solve time and mean rating-total difference between teams for each lobby size.
+Usage: python -m benchmarks.team_balance [trials]
+"""
+import random
+import statistics
+import sys
+import time
+
+from utils.teams import balance_teams
+
+
+def random_split(ratings):
+    players = list(ratings)
+    random.shuffle(players)
+    mid = len(players) // 2
+    return players[:mid], players[mid:]
+
+
+def measure(split, ratings):
+    start = time.perf_counter()
+    team1, team2 = split(ratings)
+    elapsed = time.perf_counter() - start
+    assert abs(len(team1) - len(team2)) <= 1 and len(team1) + len(team2) == len(ratings)
+    return elapsed, abs(sum(ratings[p] for p in team1) - sum(ratings[p] for p in team2))
+
+
+def main(trials: int):
+    random.seed(0)
+    print(f"{'players':>7} | {'balanced ms':>11} {'diff':>8} | {'random ms':>9} {'diff':>8}")
+    for size in (10, 12, 14, 16, 20, 30, 50, 100):
+        balanced, shuffled = [], []
+        for _ in range(trials):
+            ratings = {i: random.gauss(1000, 200) for i in range(size)}
+            balanced.append(measure(balance_teams, ratings))
+            shuffled.append(measure(random_split, ratings))
+        print(f"{size:>7} | {statistics.mean(t for t, _ in balanced) * 1000:>11.3f} "
+              f"{statistics.mean(d for _, d in balanced):>8.2f} | "
+              f"{statistics.mean(t for t, _ in shuffled) * 1000:>9.3f} {statistics.mean(d for _, d in shuffled):>8.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
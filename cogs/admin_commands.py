@@ -1,21 +1,46 @@
+import asyncio
+import os
 import random
+import time
+from typing import Optional
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+from cogs.maintenance_commands import RETENTION_DAYS
+from database.database import FINISHED_STATUSES
+from database.export import export_extension
+from database.records import Scrim
 from main import ScrimBot
-
-SCRIM_ADMIN_ROLE_ID = 1387887017882554499
+from utils.autocomplete import is_scrim_admin, scrim_autocomplete
+from utils.broadcast import broadcast
+from utils.channels import delete_channels, scrim_channels
+from utils.metrics import metrics
+from utils.teams import balance_teams
+from utils.voice import move_members
+
+RESULT_CHOICES = [
+    app_commands.Choice(name="Team 1 won", value=1),
+    app_commands.Choice(name="Team 2 won", value=2),
+    app_commands.Choice(name="Draw", value=0),
+]
+# Exports too big to upload to Discord are left here for the bot's operator.
+EXPORT_DIR = os.getenv("SCRIM_EXPORT_DIR", "exports")
+# The waiting room and admin role the bot was hardcoded to before /scrim_config. The guild
+# that adopts a pre-upgrade database keeps them until an admin changes them.
+LEGACY_GUILD_CONFIG = {'waiting_room_vc_id': 1162960960907137038, 'admin_role_id': 1387887017882554499}
 
 
 def has_scrim_permissions():
     async def predicate(interaction: discord.Interaction):
-        if discord.utils.get(interaction.user.roles, id=SCRIM_ADMIN_ROLE_ID):
+        if interaction.guild is None:
+            return False
+        if await is_scrim_admin(interaction):
             return True
 
-        scrim = interaction.client.db.get_scrim_by_id(interaction.namespace.scrim_id)
-        if scrim and scrim['creator_id'] == interaction.user.id:
+        scrim = await interaction.client.db.get_scrim_by_id(interaction.namespace.scrim_id, interaction.guild_id)
+        if scrim and scrim.creator_id == interaction.user.id:
             return True
         return False
 
@@ -26,99 +51,126 @@ class AdminCommands(commands.Cog):
     def __init__(self, bot: ScrimBot):
         self.bot = bot
 
+    async def teardown_channels(self, guild: discord.Guild, scrim: Scrim):
+        channels = scrim_channels(guild, scrim)
+        if await delete_channels(channels) == len(channels):
+            await self.bot.db.clear_scrim_channels([scrim.id])
+
     @app_commands.command(name="start_scrim", description="Starts a scrim")
+    @app_commands.guild_only()
+    @app_commands.autocomplete(scrim_id=scrim_autocomplete(('open', 'full'), scope='managed'))
     @has_scrim_permissions()
     async def start_scrim(self,
                           interaction: discord.Interaction,
                           scrim_id: int):
-        scrim = self.bot.db.get_scrim_by_id(scrim_id)
+        scrim = await self.bot.db.get_scrim_by_id(scrim_id, interaction.guild_id)
         if not scrim:
             await interaction.response.send_message("Scrim not found. Please check the ID and try again.",
                                                     ephemeral=True)
             return
 
-        if scrim['status'] not in ['open', 'full']:
-            await interaction.response.send_message(f"Cannot start scrim - status is '{scrim['status']}'.",
+        if scrim.status not in ['open', 'full']:
+            await interaction.response.send_message(f"Cannot start scrim - status is '{scrim.status}'.",
                                                     ephemeral=True)
             return
 
-        waiting_room_vc = interaction.guild.get_channel(self.bot.waiting_room_vc_id)
+        config = await self.bot.db.get_guild_config(interaction.guild_id)
+        if not config['waiting_room_vc_id']:
+            await interaction.response.send_message(
+                "No waiting room is configured for this server - an admin can set one with /scrim_config.",
+                ephemeral=True)
+            return
 
-        players = []
-        for member in waiting_room_vc.members:
-            if self.bot.db.is_user_in_scrim(scrim_id, member.id):
-                players.append(member)
+        # Registered players currently in the waiting room, straight from the presence index.
+        ready = [interaction.guild.get_member(player_id) for player_id in self.bot.presence.ready(scrim_id)]
+        players = [member for member in ready if member]
 
         if len(players) < 2:
             await interaction.response.send_message(
                 "Can't start scrim - need at least 2 players in the waiting room voice channel.", ephemeral=True)
             return
 
+        await interaction.response.defer(thinking=True)
+
         try:
             guild = interaction.guild
-            category = await guild.create_category(f"Scrim {scrim_id}")
-            team1_vc = await guild.create_voice_channel("Team 1 🔴", category=category)
-            team2_vc = await guild.create_voice_channel("Team 2 🔵", category=category)
+            with metrics.timer('api', 'create_category'):
+                category = await guild.create_category(f"Scrim {scrim_id}")
+
+            async def create_voice_channel(name: str) -> discord.VoiceChannel:
+                with metrics.timer('api', 'create_voice_channel'):
+                    return await guild.create_voice_channel(name, category=category)
 
-            self.bot.db.update_scrim_channels(scrim_id, category.id, team1_vc.id, team2_vc.id)
+            team1_vc, team2_vc = await asyncio.gather(create_voice_channel("Team 1 🔴"),
+                                                      create_voice_channel("Team 2 🔵"))
+
+            await self.bot.db.update_scrim_channels(scrim_id, category.id, team1_vc.id, team2_vc.id)
         except discord.Forbidden:
-            await interaction.response.send_message("Bot lacks permissions to create voice channels.", ephemeral=True)
+            await interaction.followup.send("Bot lacks permissions to create voice channels.", ephemeral=True)
             return
         except discord.HTTPException:
-            await interaction.response.send_message("Failed to create voice channels. Please try again.",
-                                                    ephemeral=True)
+            await interaction.followup.send("Failed to create voice channels. Please try again.", ephemeral=True)
             return
 
+        # Shuffle first so equally rated lobbies (e.g. all new players) still get varied teams.
         random.shuffle(players)
-        mid = len(players) // 2
-        team1 = players[:mid]
-        team2 = players[mid:]
+        ratings = await self.bot.db.get_player_ratings(interaction.guild_id, [player.id for player in players])
+        team1_ids, team2_ids = balance_teams(ratings)
+        members = {player.id: player for player in players}
+        team1 = [members[player_id] for player_id in team1_ids]
+        team2 = [members[player_id] for player_id in team2_ids]
 
         if random.choice([True, False]):
             team1, team2 = team2, team1
 
-        for player in team1:
-            self.bot.db.update_player_team(scrim_id, player.id, 1)
-            try:
-                await player.move_to(team1_vc)
-            except (discord.Forbidden, discord.HTTPException):
-                pass
-        for player in team2:
-            self.bot.db.update_player_team(scrim_id, player.id, 2)
-            try:
-                await player.move_to(team2_vc)
-            except (discord.Forbidden, discord.HTTPException):
-                pass
-
-        self.bot.db.update_scrim_status(scrim_id, "active")
+        teams = {player.id: 1 for player in team1}
+        teams.update({player.id: 2 for player in team2})
+        await self.bot.db.update_player_teams(scrim_id, teams)
+
+        failed_moves = await move_members([(player, team1_vc) for player in team1] +
+                                          [(player, team2_vc) for player in team2])
+
+        await self.bot.db.update_scrim_status(scrim_id, "active")
+        self.bot.dispatch("scrim_closed", scrim_id)
 
         embed = discord.Embed(title=f"Scrim #{scrim_id} Started!",
                               description="Teams have been created and players moved to their channels. Good luck!",
                               color=0x00ff00)
         embed.add_field(name="🔴 Team 1", value="\n".join([f"• {player.display_name}" for player in team1]), inline=True)
         embed.add_field(name="🔵 Team 2", value="\n".join([f"• {player.display_name}" for player in team2]), inline=True)
+        if failed_moves:
+            embed.add_field(name="⚠️ Couldn't move",
+                            value="\n".join([f"• {player.display_name}" for player in failed_moves]),
+                            inline=False)
         embed.set_footer(text=f"Started by {interaction.user.display_name}")
 
-        await interaction.response.send_message(embed=embed)
+        await interaction.followup.send(embed=embed)
 
     @app_commands.command(name="cancel_scrim", description="Cancels an upcoming scrim")
+    @app_commands.guild_only()
+    @app_commands.autocomplete(scrim_id=scrim_autocomplete(scope='managed'))
     @has_scrim_permissions()
     async def cancel_scrim(self,
                            interaction: discord.Interaction,
                            scrim_id: int):
-        scrim = self.bot.db.get_scrim_by_id(scrim_id)
+        scrim = await self.bot.db.get_scrim_by_id(scrim_id, interaction.guild_id)
         if not scrim:
             await interaction.response.send_message("Scrim not found. Please check the ID and try again.",
                                                     ephemeral=True)
             return
 
-        category_id = scrim["category_id"]
-        if category_id:
-            category = interaction.guild.get_channel(category_id)
-            if category:
-                await category.delete()
+        if scrim.status in FINISHED_STATUSES:
+            await interaction.response.send_message(f"Cannot cancel scrim - status is '{scrim.status}'.",
+                                                    ephemeral=True)
+            return
 
-        self.bot.db.update_scrim_status(scrim_id, "cancelled")
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        await self.teardown_channels(interaction.guild, scrim)
+
+        players = await self.bot.db.get_scrim_players(scrim_id)
+        await self.bot.db.update_scrim_status(scrim_id, "cancelled")
+        self.bot.dispatch("scrim_closed", scrim_id)
 
         embed = discord.Embed(
             title="Scrim Cancelled",
@@ -126,78 +178,97 @@ class AdminCommands(commands.Cog):
             color=0xff0000)
         embed.set_footer(text="You've been automatically removed from this scrim.")
 
-        players = self.bot.db.get_scrim_players(scrim_id)
-        for player in players:
-            try:
-                member = interaction.guild.get_member(player['player_id'])
-                if member:
-                    await member.send(embed=embed)
-            except (discord.Forbidden, discord.HTTPException):
-                pass
+        members = [interaction.guild.get_member(player.player_id) for player in players]
+        result = await broadcast([member for member in members if member], embed=embed)
 
-        await interaction.response.send_message(
-            f"Scrim #{scrim_id} has been cancelled and all players have been notified.", ephemeral=True)
+        await interaction.edit_original_response(
+            content=f"Scrim #{scrim_id} has been cancelled. {result.summary()}")
 
     @app_commands.command(name="end_scrim", description="Ends a scrim")
+    @app_commands.guild_only()
+    @app_commands.describe(result="Which team won (taken from the scores if omitted; leave all empty for no result)")
+    @app_commands.choices(result=RESULT_CHOICES)
+    @app_commands.autocomplete(scrim_id=scrim_autocomplete(('active',), scope='managed'))
     @has_scrim_permissions()
     async def end_scrim(self,
                         interaction: discord.Interaction,
-                        scrim_id: int):
-        scrim = self.bot.db.get_scrim_by_id(scrim_id)
+                        scrim_id: int,
+                        result: Optional[app_commands.Choice[int]] = None,
+                        team1_score: Optional[int] = None,
+                        team2_score: Optional[int] = None):
+        scrim = await self.bot.db.get_scrim_by_id(scrim_id, interaction.guild_id)
         if not scrim:
             await interaction.response.send_message("Scrim not found. Please check the ID and try again.",
                                                     ephemeral=True)
             return
 
-        category_id = scrim["category_id"]
-        team1_channel_id = scrim["team1_vc_id"]
-        team2_channel_id = scrim["team2_vc_id"]
-        if category_id:
-            category = interaction.guild.get_channel(category_id)
-            if category:
-                await category.delete()
-        if team1_channel_id:
-            team1_channel = interaction.guild.get_channel(team1_channel_id)
-            if team1_channel:
-                await team1_channel.delete()
-        if team2_channel_id:
-            team2_channel = interaction.guild.get_channel(team2_channel_id)
-            if team2_channel:
-                await team2_channel.delete()
-
-        self.bot.db.update_scrim_status(scrim_id, "completed")
-
-        players = self.bot.db.get_scrim_players(scrim_id)
+        if scrim.status in FINISHED_STATUSES:
+            await interaction.response.send_message(f"Cannot end scrim - status is '{scrim.status}'.", ephemeral=True)
+            return
+
+        if team1_score is not None or team2_score is not None:
+            if team1_score is None or team2_score is None:
+                await interaction.response.send_message("Give both teams' scores, or neither.", ephemeral=True)
+                return
+            winner = 1 if team1_score > team2_score else 2 if team2_score > team1_score else 0
+            if result is not None and result.value != winner:
+                await interaction.response.send_message(
+                    f"The score {team1_score}-{team2_score} doesn't match '{result.name}'.", ephemeral=True)
+                return
+            result = next(choice for choice in RESULT_CHOICES if choice.value == winner)
+
+        await interaction.response.defer(thinking=True)
+
+        await self.teardown_channels(interaction.guild, scrim)
+        await self.bot.db.update_scrim_status(scrim_id, "completed")
+        self.bot.dispatch("scrim_closed", scrim_id)
+
+        rating_changes = None
+        if result is not None:
+            rating_changes = await self.bot.db.record_scrim_result(scrim_id, result.value, interaction.user.id,
+                                                                   team1_score, team2_score)
+
+        players = await self.bot.db.get_scrim_players(scrim_id)
+        names = await self.bot.names.resolve_players(interaction.guild, players)
         embed = discord.Embed(title="Scrim Completed",
                               description=f"Scrim #{scrim_id} has ended. Thanks for playing!",
                               color=0x0099ff)
         embed.add_field(name="🔴 Team 1",
-                        value="\n".join([f"• {player['player_name']}" for player in players if player['team'] == 1]),
+                        value="\n".join([f"• {names[player.player_id]}" for player in players if player.team == 1]),
                         inline=True)
         embed.add_field(name="🔵 Team 2",
-                        value="\n".join([f"• {player['player_name']}" for player in players if player['team'] == 2]),
+                        value="\n".join([f"• {names[player.player_id]}" for player in players if player.team == 2]),
                         inline=True)
+        if rating_changes is not None:
+            score = f" ({team1_score}-{team2_score})" if team1_score is not None and team2_score is not None else ""
+            change = max(abs(delta) for delta in rating_changes.values())
+            embed.add_field(name="Result", value=f"{result.name}{score} • ratings ±{change:.0f}", inline=False)
+        elif result is not None:
+            embed.add_field(name="Result", value="Not recorded - teams were never assigned or a result already exists.",
+                            inline=False)
         embed.set_footer(text="GG everyone!")
 
-        await interaction.response.send_message(embed=embed)
+        await interaction.followup.send(embed=embed)
 
     @app_commands.command(name="message_scrim", description="Send a custom message to all players in a scrim")
+    @app_commands.guild_only()
+    @app_commands.autocomplete(scrim_id=scrim_autocomplete(scope='owned'))
     async def message_scrim(self,
                             interaction: discord.Interaction,
                             scrim_id: int,
                             message: str):
-        scrim = self.bot.db.get_scrim_by_id(scrim_id)
+        scrim = await self.bot.db.get_scrim_by_id(scrim_id, interaction.guild_id)
         if not scrim:
             await interaction.response.send_message("Scrim not found. Please check the ID and try again.",
                                                     ephemeral=True)
             return
 
-        if scrim['creator_id'] != interaction.user.id:
+        if scrim.creator_id != interaction.user.id:
             await interaction.response.send_message("Only the scrim creator can send messages to participants.",
                                                     ephemeral=True)
             return
 
-        players = self.bot.db.get_scrim_players(scrim_id)
+        players = await self.bot.db.get_scrim_players(scrim_id)
         if not players:
             await interaction.response.send_message("No players found in this scrim.", ephemeral=True)
             return
@@ -209,34 +280,99 @@ class AdminCommands(commands.Cog):
         )
         embed.set_footer(text=f"From: {interaction.user.display_name}")
 
-        sent_count = 0
-        for player in players:
-            try:
-                member = interaction.guild.get_member(player['player_id'])
-                if member:
-                    await member.send(embed=embed)
-                    sent_count += 1
-            except discord.Forbidden:
-                continue
-
-        await interaction.response.send_message(
-            f"Message sent to {sent_count}/{len(players)} players in Scrim #{scrim_id}.",
-            ephemeral=True
-        )
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        members = [interaction.guild.get_member(player.player_id) for player in players]
+        result = await broadcast([member for member in members if member], embed=embed)
+
+        await interaction.edit_original_response(
+            content=f"Message sent to players in Scrim #{scrim_id}. {result.summary()}")
 
     @app_commands.command(name="purge_old_scrims", description="Clean up old completed scrims (admin only)")
+    @app_commands.guild_only()
     @has_scrim_permissions()
     async def purge_old_scrims(self,
                                interaction: discord.Interaction):
-        deleted_count = self.bot.db.delete_old_scrims()
-
-        await interaction.response.send_message(
-            f"Purged {deleted_count} old scrims and cleaned up player records.",
-            ephemeral=True
-        )
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        stats = await self.bot.db.delete_old_scrims(RETENTION_DAYS, guild_id=interaction.guild_id)
+
+        await interaction.edit_original_response(
+            content=f"Purged {stats['scrims']} old scrims and {stats['players']} player records "
+                    f"in {stats['elapsed']:.2f}s.")
+
+    @app_commands.command(name="export_history", description="Export this server's scrim history (admin only)")
+    @app_commands.describe(file_format="CSV for spreadsheets, NDJSON for scripts", compress="gzip the file")
+    @app_commands.rename(file_format="format")
+    @app_commands.choices(file_format=[app_commands.Choice(name="CSV", value="csv"),
+                                       app_commands.Choice(name="NDJSON", value="ndjson")])
+    @app_commands.guild_only()
+    @has_scrim_permissions()
+    async def export_history(self,
+                             interaction: discord.Interaction,
+                             file_format: Optional[app_commands.Choice[str]] = None,
+                             compress: bool = True):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        fmt = file_format.value if file_format else 'csv'
+        filename = f"scrim_history_{interaction.guild_id}_{int(time.time())}{export_extension(fmt, compress)}"
+        path = os.path.join(EXPORT_DIR, filename)
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+
+        stats = await self.bot.db.export_history(path, interaction.guild_id, fmt, compress)
+        summary = f"Exported {stats['rows']} rows in {stats['elapsed']:.1f}s."
+        if os.path.getsize(path) > interaction.guild.filesize_limit:
+            await interaction.edit_original_response(
+                content=f"{summary} The file is over this server's {interaction.guild.filesize_limit // 2 ** 20} MiB "
+                        f"upload limit, so it was saved on the bot host as `{path}`.")
+            return
+        try:
+            with metrics.timer('api', 'upload_export'):
+                await interaction.edit_original_response(content=summary,
+                                                         attachments=[discord.File(path, filename=filename)])
+        except discord.HTTPException:
+            await interaction.edit_original_response(
+                content=f"{summary} Uploading it failed, so it was saved on the bot host as `{path}`.")
+            return
+        os.remove(path)
+
+    @app_commands.command(name="scrim_config", description="View or change this server's scrim settings")
+    @app_commands.describe(waiting_room="Voice channel players wait in before a scrim starts",
+                           admin_role="Role allowed to manage every scrim in this server")
+    @app_commands.default_permissions(manage_guild=True)
+    @app_commands.guild_only()
+    async def scrim_config(self,
+                           interaction: discord.Interaction,
+                           waiting_room: Optional[discord.VoiceChannel] = None,
+                           admin_role: Optional[discord.Role] = None):
+        fields = {}
+        if waiting_room is not None:
+            fields['waiting_room_vc_id'] = waiting_room.id
+        if admin_role is not None:
+            fields['admin_role_id'] = admin_role.id
+
+        if fields:
+            config = await self.bot.db.set_guild_config(interaction.guild_id, **fields)
+            self.bot.dispatch("guild_config_updated", interaction.guild_id)
+        else:
+            config = await self.bot.db.get_guild_config(interaction.guild_id)
+
+        embed = discord.Embed(title="Scrim Settings" + (" Updated" if fields else ""), color=0x0099ff)
+        embed.add_field(name="Waiting Room",
+                        value=f"<#{config['waiting_room_vc_id']}>" if config['waiting_room_vc_id'] else "Not set",
+                        inline=True)
+        embed.add_field(name="Admin Role",
+                        value=f"<@&{config['admin_role_id']}>" if config['admin_role_id'] else "Not set",
+                        inline=True)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
     @commands.Cog.listener()
     async def on_ready(self):
+        # Scrims from before multi-guild support belong to whichever guild a single-guild
+        # deployment is in; with several guilds they stay unassigned rather than leak across.
+        if len(self.bot.guilds) == 1:
+            adopted = await self.bot.db.adopt_unscoped_rows(self.bot.guilds[0].id, **LEGACY_GUILD_CONFIG)
+            if adopted:
+                print(f"Assigned {adopted} pre-existing scrims to guild {self.bot.guilds[0].id}")
+                self.bot.dispatch("scrims_adopted", self.bot.guilds[0].id)
         print(f"{self.__class__.__name__} cog loaded")
 
 
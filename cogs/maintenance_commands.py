@@ -0,0 +1,184 @@
+import asyncio
+import os
+import re
+from datetime import timedelta
+from typing import Dict, List
+
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+
+from database.backup import BACKUP_DIR, list_snapshots
+from main import ScrimBot
+from utils.channels import delete_channels, scrim_channels
+from utils.metrics import metrics
+
+SCRIM_CATEGORY_PATTERN = re.compile(r"^Scrim \d+$")
+# start_scrim creates the category before it stores its id, and stores the ids before it marks
+# the scrim active, so leave fresh channels alone whether or not the database knows them yet.
+ORPHAN_GRACE_PERIOD = timedelta(minutes=15)
+RECONCILE_BATCH_SIZE = 10
+RECONCILE_BATCH_DELAY = 2.0
+RETENTION_DAYS = int(os.getenv("SCRIM_RETENTION_DAYS", 30))
+BACKUP_INTERVAL_HOURS = float(os.getenv("SCRIM_BACKUP_INTERVAL_HOURS", 6))
+# Latency families compared before and during each backup.
+BACKUP_LATENCY_FAMILIES = ('command', 'query')
+
+
+def is_bot_owner():
+    # One database serves every guild, so replacing it is for the bot's owner, not guild admins.
+    async def predicate(interaction: discord.Interaction):
+        return await interaction.client.is_owner(interaction.user)
+
+    return app_commands.check(predicate)
+
+
+async def snapshot_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    return [app_commands.Choice(name=name, value=name) for name in list_snapshots() if current in name][:25]
+
+
+class MaintenanceCommands(commands.Cog):
+    def __init__(self, bot: ScrimBot):
+        self.bot = bot
+        self.reconcile_channels.start()
+        self.enforce_retention.start()
+        self.backup_database.start()
+
+    def cog_unload(self):
+        self.reconcile_channels.cancel()
+        self.enforce_retention.cancel()
+        self.backup_database.cancel()
+
+    async def find_stale_channels(self):
+        live_channel_ids = set()
+        stale_scrim_ids = []
+        stale_channels = {}
+        cutoff = discord.utils.utcnow() - ORPHAN_GRACE_PERIOD
+
+        for scrim in await self.bot.db.get_channel_scrims():
+            channel_ids = [channel_id for channel_id in (scrim.category_id, scrim.team1_vc_id, scrim.team2_vc_id)
+                           if channel_id]
+            # A channel's creation time is in its snowflake, so this needs no API call.
+            if scrim.status == 'active' or max(map(discord.utils.snowflake_time, channel_ids)) > cutoff:
+                live_channel_ids.update(channel_ids)
+                continue
+            stale_scrim_ids.append(scrim.id)
+            stale_channels.update((channel.id, channel) for channel in scrim_channels(self.bot, scrim))
+
+        for guild in self.bot.guilds:
+            for category in guild.categories:
+                if (category.id in live_channel_ids or category.created_at > cutoff
+                        or not SCRIM_CATEGORY_PATTERN.match(category.name)):
+                    continue
+                stale_channels[category.id] = category
+                stale_channels.update((channel.id, channel) for channel in category.channels
+                                      if channel.id not in live_channel_ids)
+
+        return stale_scrim_ids, list(stale_channels.values())
+
+    @tasks.loop(minutes=10)
+    async def reconcile_channels(self):
+        stale_scrim_ids, stale_channels = await self.find_stale_channels()
+        if not stale_scrim_ids and not stale_channels:
+            return
+
+        deleted = 0
+        for start in range(0, len(stale_channels), RECONCILE_BATCH_SIZE):
+            if start:
+                await asyncio.sleep(RECONCILE_BATCH_DELAY)
+            deleted += await delete_channels(stale_channels[start:start + RECONCILE_BATCH_SIZE])
+
+        if stale_scrim_ids:
+            await self.bot.db.clear_scrim_channels(stale_scrim_ids)
+        print(f"Channel reconciler removed {deleted}/{len(stale_channels)} stale channels "
+              f"and released {len(stale_scrim_ids)} scrims")
+
+    @reconcile_channels.before_loop
+    async def before_reconcile_channels(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(hours=6)
+    async def enforce_retention(self):
+        purge = await self.bot.db.delete_old_scrims(RETENTION_DAYS)
+        vacuum = await self.bot.db.optimize()
+        print(f"Retention: purged {purge['scrims']} scrims and {purge['players']} player records older than "
+              f"{RETENTION_DAYS} days in {purge['chunks']} chunks ({purge['elapsed']:.2f}s, longest lock "
+              f"{purge['longest_lock'] * 1000:.1f}ms); reclaimed {vacuum['pages_reclaimed']} pages "
+              f"in {vacuum['elapsed']:.2f}s")
+
+    @enforce_retention.before_loop
+    async def before_enforce_retention(self):
+        await self.bot.wait_until_ready()
+
+    async def run_backup(self, rotate: bool = True) -> Dict:
+        # Takes a snapshot and reports how long it took and how command and query latency while
+        # it ran compared with everything observed before it started.
+        before = {family: metrics.merged(family) for family in BACKUP_LATENCY_FAMILIES}
+        stats = await self.bot.db.backup(rotate=rotate)
+        summary = (f"Backup {os.path.basename(stats['path'])} ({stats['bytes'] / 2 ** 20:.1f} MiB, "
+                   f"{stats['steps']} steps) took {stats['elapsed']:.2f}s")
+        for family, earlier in before.items():
+            during = metrics.merged(family).since(earlier)
+            if during.count:
+                summary += (f"; {family} p99 {during.quantile(0.99) * 1000:.1f}ms during "
+                            f"vs {earlier.quantile(0.99) * 1000:.1f}ms before ({during.count} observed)")
+        if stats['rotated']:
+            summary += f"; rotated out {len(stats['rotated'])} old snapshots"
+        print(summary)
+        stats['summary'] = summary
+        return stats
+
+    @tasks.loop(hours=BACKUP_INTERVAL_HOURS)
+    async def backup_database(self):
+        try:
+            await self.run_backup()
+        except Exception as e:
+            # Keep the loop alive; the next run takes a fresh snapshot.
+            print(f"Backup failed: {e}")
+
+    @backup_database.before_loop
+    async def before_backup_database(self):
+        await self.bot.wait_until_ready()
+
+    @app_commands.command(name="backup_now", description="Snapshot the database now (bot owner only)")
+    @is_bot_owner()
+    async def backup_now(self,
+                         interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            stats = await self.run_backup()
+        except Exception as e:
+            await interaction.edit_original_response(content=f"Backup failed: {e}")
+            return
+        await interaction.edit_original_response(content=stats['summary'])
+
+    @app_commands.command(name="restore_backup", description="Replace the database with a snapshot (bot owner only)")
+    @app_commands.autocomplete(snapshot=snapshot_autocomplete)
+    @is_bot_owner()
+    async def restore_backup(self,
+                             interaction: discord.Interaction,
+                             snapshot: str):
+        if snapshot not in list_snapshots():
+            await interaction.response.send_message("Snapshot not found. Pick one from the list.", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            # Snapshot the current state first (without rotating, which could drop the one being
+            # restored) so the restore itself can be undone.
+            undo = await self.run_backup(rotate=False)
+            pages = await self.bot.db.restore(os.path.join(BACKUP_DIR, snapshot))
+        except Exception as e:
+            await interaction.edit_original_response(content=f"Restore failed, nothing was changed: {e}")
+            return
+        self.bot.dispatch("database_restored")
+        await interaction.edit_original_response(
+            content=f"Restored {snapshot} ({pages} pages). {os.path.basename(undo['path'])} holds the previous state.")
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        print(f"{self.__class__.__name__} cog loaded")
+
+
+async def setup(bot):
+    await bot.add_cog(MaintenanceCommands(bot))
@@ -0,0 +1,125 @@
+import logging
+import os
+import time
+from typing import List, Optional, Tuple
+
+import discord
+from aiohttp import web
+from discord import app_commands
+from discord.ext import commands
+
+from main import ScrimBot
+from utils.metrics import RateLimitLogHandler, metrics
+
+# Prometheus scrape endpoint; bound to localhost by default, SCRIM_METRICS_PORT=0 disables it.
+METRICS_HOST = os.getenv("SCRIM_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("SCRIM_METRICS_PORT", 9108))
+BOT_STATS_ROWS = 5
+
+
+def format_latency_rows(rows: List[Tuple[str, int, float, float]]) -> str:
+    if not rows:
+        return "No data yet"
+    return "\n".join([f"`{name}` ×{count} • p50 {p50 * 1000:.1f}ms • p99 {p99 * 1000:.1f}ms"
+                      for name, count, p50, p99 in rows[:BOT_STATS_ROWS]])
+
+
+class MetricsCommands(commands.Cog):
+    def __init__(self, bot: ScrimBot):
+        self.bot = bot
+        self.runner: Optional[web.AppRunner] = None
+        self.log_handler = RateLimitLogHandler()
+
+    async def cog_load(self):
+        logging.getLogger('discord.http').addHandler(self.log_handler)
+        metrics.gauges.update(
+            guilds=lambda: len(self.bot.guilds),
+            gateway_latency_seconds=lambda: self.bot.latency,
+            scrim_cache_size=lambda: len(self.bot.db.cache),
+            scrim_cache_hit_rate=lambda: self.bot.db.cache.stats()['hit_rate'],
+            name_cache_size=lambda: len(self.bot.names.cache),
+            name_lookup_hit_rate=lambda: self.bot.names.stats()['hit_rate'],
+            name_rest_lookups=lambda: self.bot.names.stats()['rest'],
+            write_group_size=lambda: (self.bot.db.write_groups['writes'] / self.bot.db.write_groups['groups']
+                                      if self.bot.db.write_groups['groups'] else 0.0),
+        )
+        if not METRICS_PORT:
+            return
+
+        app = web.Application()
+        app.router.add_get('/metrics', self.serve_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        try:
+            await web.TCPSite(self.runner, METRICS_HOST, METRICS_PORT).start()
+            print(f"Metrics endpoint listening on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            print(f"Metrics endpoint disabled - couldn't bind {METRICS_HOST}:{METRICS_PORT}: {e}")
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def cog_unload(self):
+        logging.getLogger('discord.http').removeHandler(self.log_handler)
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def serve_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=metrics.render().encode(),
+                            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction: discord.Interaction, command: app_commands.Command):
+        started_at = interaction.extras.get('started_at')
+        if started_at is not None:
+            metrics.observe('command', command.qualified_name, time.perf_counter() - started_at)
+
+    @app_commands.command(name="bot_stats", description="Latency, failure and cache statistics (admin only)")
+    @app_commands.default_permissions(manage_guild=True)
+    @app_commands.guild_only()
+    async def show_bot_stats(self,
+                             interaction: discord.Interaction):
+        uptime = int(time.time() - metrics.started_at)
+        embed = discord.Embed(
+            title="Bot Stats",
+            description=f"Up {uptime // 3600}h {uptime % 3600 // 60}m • {len(self.bot.guilds)} guilds • "
+                        f"gateway {self.bot.latency * 1000:.0f}ms",
+            color=0x0099ff
+        )
+        embed.add_field(name="Commands", value=format_latency_rows(metrics.summary('command')), inline=False)
+        embed.add_field(name="Queries", value=format_latency_rows(metrics.summary('query')), inline=False)
+        embed.add_field(name="Discord API", value=format_latency_rows(metrics.summary('api')), inline=False)
+
+        failures = sorted(metrics.failures.items(), key=lambda item: item[1], reverse=True)
+        embed.add_field(name="Failures",
+                        value="\n".join([f"`{family}:{name}` ×{count}"
+                                         for (family, name), count in failures[:BOT_STATS_ROWS]]) or "None",
+                        inline=True)
+        embed.add_field(name="Rate Limits",
+                        value="\n".join([f"`{source}` ×{count}"
+                                         for source, count in metrics.rate_limits.items()]) or "None",
+                        inline=True)
+
+        cache = self.bot.db.cache.stats()
+        embed.add_field(name="Scrim Cache",
+                        value=f"{cache['size']}/{cache['max_size']} • {cache['hit_rate']:.0%} hits "
+                              f"({cache['hits']}/{cache['hits'] + cache['misses']})",
+                        inline=False)
+        names = self.bot.names.stats()
+        embed.add_field(name="Name Lookups",
+                        value=f"{names['hit_rate']:.0%} without REST ({names['total']}) • member {names['member']} • "
+                              f"user {names['user']} • cache {names['cache']} • REST {names['rest']}",
+                        inline=False)
+        if self.bot.startup_timings:
+            embed.set_footer(text="Startup: " + ", ".join([f"{phase} {seconds * 1000:.0f}ms"
+                                                           for phase, seconds in self.bot.startup_timings.items()]))
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        print(f"{self.__class__.__name__} cog loaded")
+
+
+async def setup(bot):
+    await bot.add_cog(MetricsCommands(bot))
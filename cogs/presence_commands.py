@@ -0,0 +1,79 @@
+import time
+from typing import List
+
+import discord
+from discord.ext import commands
+
+from main import ScrimBot
+
+
+# Keeps bot.presence (utils.presence.PresenceIndex) current: voice state updates move members
+# in and out of each guild's waiting room, and the custom scrim_joined / scrim_left /
+# scrim_closed events keep rosters in step with the database (database_restored and
+# scrims_adopted rebuild it).
+class PresenceCommands(commands.Cog):
+    def __init__(self, bot: ScrimBot):
+        self.bot = bot
+
+    async def waiting_room_members(self, guild: discord.Guild) -> List[int]:
+        config = await self.bot.db.get_guild_config(guild.id)
+        channel = guild.get_channel(config['waiting_room_vc_id'] or 0)
+        return [member.id for member in channel.members] if channel else []
+
+    async def rebuild(self):
+        start = time.perf_counter()
+        waiting = {guild.id: await self.waiting_room_members(guild) for guild in self.bot.guilds}
+        rosters = await self.bot.db.get_joinable_rosters()
+        self.bot.presence.load(waiting, [(row['scrim_id'], row['guild_id'], row['player_id']) for row in rosters])
+        print(f"Presence index rebuilt: {sum(len(members) for members in waiting.values())} waiting, "
+              f"{len(rosters)} roster entries in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState,
+                                    after: discord.VoiceState):
+        if before.channel == after.channel:
+            return
+        waiting_room_vc_id = (await self.bot.db.get_guild_config(member.guild.id))['waiting_room_vc_id']
+        if not waiting_room_vc_id:
+            return
+        if before.channel is not None and before.channel.id == waiting_room_vc_id:
+            self.bot.presence.leave(member.guild.id, member.id)
+        if after.channel is not None and after.channel.id == waiting_room_vc_id:
+            self.bot.presence.enter(member.guild.id, member.id)
+
+    @commands.Cog.listener()
+    async def on_scrim_joined(self, scrim_id: int, guild_id: int, player_id: int):
+        self.bot.presence.add_player(scrim_id, guild_id, player_id)
+
+    @commands.Cog.listener()
+    async def on_scrim_left(self, scrim_id: int, player_id: int):
+        self.bot.presence.remove_player(scrim_id, player_id)
+
+    @commands.Cog.listener()
+    async def on_scrim_closed(self, scrim_id: int):
+        self.bot.presence.drop_scrim(scrim_id)
+
+    @commands.Cog.listener()
+    async def on_guild_config_updated(self, guild_id: int):
+        guild = self.bot.get_guild(guild_id)
+        if guild is not None:
+            self.bot.presence.set_waiting(guild_id, await self.waiting_room_members(guild))
+
+    @commands.Cog.listener()
+    async def on_database_restored(self):
+        await self.rebuild()
+
+    @commands.Cog.listener()
+    async def on_scrims_adopted(self, guild_id: int):
+        # The on_ready rebuild runs alongside adoption and may have read those rosters while
+        # they still belonged to guild 0, where no waiting room could mark them ready.
+        await self.rebuild()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        await self.rebuild()
+        print(f"{self.__class__.__name__} cog loaded")
+
+
+async def setup(bot):
+    await bot.add_cog(PresenceCommands(bot))
@@ -0,0 +1,156 @@
+import asyncio
+import time
+from typing import List, Optional, Set
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from database.records import Scrim
+from main import ScrimBot
+from utils.broadcast import broadcast
+from utils.matchmaking import Lobby, MatchQueue, QueueEntry
+
+# How often the matcher re-checks queues that have enough players but no lobby inside the
+# rating band yet; joins wake it immediately.
+QUEUE_TICK = 1.0
+# Matched scrims are scheduled this far ahead so players have time to reach the waiting room;
+# the scheduler's T-5 reminder and start notice fire as for any other scrim.
+QUEUE_START_DELAY = 10 * 60
+
+
+def queue_name(key) -> str:
+    return f"{key[1]} ({key[2]} players)"
+
+
+# /queue: players wait per game mode and lobby size, and a single matcher task turns every
+# group of max_players (optionally within a rating band, see utils.matchmaking) into a full
+# scrim. Queues live in memory only - a restart empties them and players queue again.
+class QueueCommands(commands.Cog):
+    def __init__(self, bot: ScrimBot):
+        self.bot = bot
+        self.queue = MatchQueue()
+        self._wakeup = asyncio.Event()
+        self._matcher: Optional[asyncio.Task] = None
+        self._notifications: Set[asyncio.Task] = set()
+
+    async def cog_load(self):
+        self._matcher = asyncio.create_task(self.run_matcher())
+
+    async def cog_unload(self):
+        self._matcher.cancel()
+
+    async def run_matcher(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), QUEUE_TICK)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self.queue.ready():
+                try:
+                    await self.form_lobbies()
+                except Exception as e:
+                    print(f"Queue matching failed: {e}")
+
+    async def form_lobbies(self) -> List[Scrim]:
+        now = time.time()
+        lobbies = self.queue.match(now)
+        if not lobbies:
+            return []
+
+        creator_id = self.bot.user.id if self.bot.user else 0
+        matches = [{'guild_id': lobby.key[0],
+                    'title': f"{lobby.key[1]} queue match",
+                    'game_mode': lobby.key[1],
+                    'scheduled_time': int(now) + QUEUE_START_DELAY,
+                    'creator_id': creator_id,
+                    'players': [(entry.player_id, entry.player_name) for entry in lobby.players]}
+                   for lobby in lobbies]
+        try:
+            scrims = await self.bot.db.insert_matched_scrims(matches)
+        except Exception:
+            for lobby in lobbies:
+                self.queue.requeue(lobby)
+            raise
+
+        for scrim, lobby in zip(scrims, lobbies):
+            self.bot.dispatch("scrim_scheduled", scrim.id, scrim.scheduled_time)
+            for entry in lobby.players:
+                self.bot.dispatch("scrim_joined", scrim.id, scrim.guild_id, entry.player_id)
+            task = asyncio.create_task(self.notify_lobby(scrim, lobby))
+            self._notifications.add(task)
+            task.add_done_callback(self._notifications.discard)
+        return scrims
+
+    async def notify_lobby(self, scrim: Scrim, lobby: Lobby):
+        embed = discord.Embed(
+            title="Match found!",
+            description=f"You've been placed in Scrim #{scrim.id} - **{scrim.title}**.\n"
+                        f"It starts <t:{scrim.scheduled_time}:R>; head to the waiting room so you're ready.",
+            color=0x00ff00)
+        embed.add_field(name="Players", value=f"{scrim.player_count}/{scrim.max_players}", inline=True)
+        users = [self.bot.get_user(entry.player_id) for entry in lobby.players]
+        await broadcast([user for user in users if user], embed=embed)
+
+    @app_commands.command(name="queue", description="Queue for a game mode and get matched automatically")
+    @app_commands.guild_only()
+    async def queue_command(self,
+                            interaction: discord.Interaction,
+                            game_mode: str,
+                            max_players: int):
+        if max_players < 2 or max_players % 2 != 0:
+            await interaction.response.send_message("Max players must be at least 2 and an even number.",
+                                                    ephemeral=True)
+            return
+
+        ratings = await self.bot.db.get_player_ratings(interaction.guild_id, [interaction.user.id])
+        entry = QueueEntry(interaction.user.id, interaction.user.name, ratings[interaction.user.id], time.time())
+        key = (interaction.guild_id, game_mode, max_players)
+        current = self.queue.enqueue(key, entry)
+        if current is not None:
+            await interaction.response.send_message(
+                f"You're already queued for {queue_name(current)}. Use /leave_queue first to switch.",
+                ephemeral=True)
+            return
+
+        self._wakeup.set()
+        queued = self.queue.sizes(interaction.guild_id)[key]
+        await interaction.response.send_message(
+            f"Queued for {queue_name(key)} - {queued} waiting. You'll get a DM as soon as a lobby forms!",
+            ephemeral=True)
+
+    @app_commands.command(name="leave_queue", description="Leave the matchmaking queue")
+    @app_commands.guild_only()
+    async def leave_queue(self,
+                          interaction: discord.Interaction):
+        key = self.queue.dequeue(interaction.guild_id, interaction.user.id)
+        if key is None:
+            await interaction.response.send_message("You're not in a queue.", ephemeral=True)
+            return
+        await interaction.response.send_message(f"Left the {queue_name(key)} queue.", ephemeral=True)
+
+    @app_commands.command(name="queue_status", description="Show matchmaking queues")
+    @app_commands.guild_only()
+    async def queue_status(self,
+                           interaction: discord.Interaction):
+        sizes = self.queue.sizes(interaction.guild_id)
+        embed = discord.Embed(
+            title="Matchmaking Queues",
+            description="\n".join(f"• {queue_name(key)}: {queued} waiting" for key, queued in sizes.items())
+                        or "Nobody is queued. Use /queue to start one!",
+            color=0x0099ff
+        )
+        position = self.queue.position(interaction.guild_id, interaction.user.id)
+        if position:
+            key, place, queued = position
+            embed.set_footer(text=f"You're #{place} of {queued} in {queue_name(key)}")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        print(f"{self.__class__.__name__} cog loaded")
+
+
+async def setup(bot):
+    await bot.add_cog(QueueCommands(bot))
@@ -0,0 +1,89 @@
+import os
+import time
+
+import discord
+from discord.ext import commands
+
+from main import ScrimBot
+from utils.broadcast import broadcast
+from utils.scheduler import ScrimScheduler
+
+AUTO_CANCEL_UNDERFILLED = os.getenv("SCRIM_AUTO_CANCEL_UNDERFILLED", "false").lower() in ("1", "true", "yes")
+
+
+# Fires T-15/T-5 reminders and the start-time notice for every upcoming scrim. Other cogs
+# keep it current by dispatching the custom `scrim_scheduled` / `scrim_closed` events.
+class SchedulerCommands(commands.Cog):
+    def __init__(self, bot: ScrimBot):
+        self.bot = bot
+        self.scheduler = ScrimScheduler(self.on_scheduled_event)
+
+    async def load_upcoming(self):
+        for scrim in await self.bot.db.get_upcoming_scrims(int(time.time())):
+            self.scheduler.schedule(scrim['id'], scrim['scheduled_time'])
+        print(f"Scheduler loaded {len(self.scheduler)} upcoming scrims")
+
+    async def cog_load(self):
+        await self.load_upcoming()
+        self.scheduler.start()
+
+    async def cog_unload(self):
+        self.scheduler.stop()
+
+    async def notify_players(self, scrim_id: int, embed: discord.Embed):
+        players = await self.bot.db.get_scrim_players(scrim_id)
+        users = [self.bot.get_user(player.player_id) for player in players]
+        await broadcast([user for user in users if user], embed=embed)
+
+    async def on_scheduled_event(self, scrim_id: int, offset: int):
+        await self.bot.wait_until_ready()
+        scrim = await self.bot.db.get_scrim_by_id(scrim_id)
+        if not scrim or scrim.status not in ('open', 'full'):
+            return
+
+        if offset:
+            embed = discord.Embed(
+                title=f"Scrim #{scrim_id} starts in {offset // 60} minutes",
+                description=f"**{scrim.title}** - {scrim.game_mode}\nHead to the waiting room so you're ready!",
+                color=0xffaa00)
+            embed.add_field(name="Players", value=f"{scrim.player_count}/{scrim.max_players}", inline=True)
+            await self.notify_players(scrim_id, embed)
+            return
+
+        if AUTO_CANCEL_UNDERFILLED and scrim.player_count < scrim.max_players:
+            await self.bot.db.update_scrim_status(scrim_id, "cancelled")
+            self.bot.dispatch("scrim_closed", scrim_id)
+            embed = discord.Embed(
+                title="Scrim Cancelled",
+                description=f"Scrim #{scrim_id} didn't fill up in time "
+                            f"({scrim.player_count}/{scrim.max_players} players) and has been cancelled.",
+                color=0xff0000)
+            await self.notify_players(scrim_id, embed)
+            return
+
+        embed = discord.Embed(
+            title=f"Scrim #{scrim_id} is starting!",
+            description=f"**{scrim.title}** - {scrim.game_mode}\nJoin the waiting room now.",
+            color=0x00ff00)
+        await self.notify_players(scrim_id, embed)
+
+    @commands.Cog.listener()
+    async def on_scrim_scheduled(self, scrim_id: int, scheduled_time: int):
+        self.scheduler.schedule(scrim_id, scheduled_time)
+
+    @commands.Cog.listener()
+    async def on_scrim_closed(self, scrim_id: int):
+        self.scheduler.unschedule(scrim_id)
+
+    @commands.Cog.listener()
+    async def on_database_restored(self):
+        self.scheduler.clear()
+        await self.load_upcoming()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        print(f"{self.__class__.__name__} cog loaded")
+
+
+async def setup(bot):
+    await bot.add_cog(SchedulerCommands(bot))
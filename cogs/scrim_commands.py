@@ -1,10 +1,17 @@
 from datetime import datetime
+from typing import List, Optional
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+from database.database import Database
+from database.records import Scrim
 from main import ScrimBot
+from utils.autocomplete import scrim_autocomplete
+from utils.presence import PresenceIndex
+
+LIST_SCRIMS_TIMEOUT = 180
 
 
 def is_valid_datetime_format(time_str: str) -> bool:
@@ -15,11 +22,90 @@ def is_valid_datetime_format(time_str: str) -> bool:
         return False
 
 
+def ready_text(presence: PresenceIndex, scrim: Scrim) -> str:
+    if scrim.status not in ('open', 'full'):
+        return ""
+    return f" • {presence.ready_count(scrim.id)} ready"
+
+
+def active_scrims_embed(scrims: List[Scrim], page: int, presence: PresenceIndex) -> discord.Embed:
+    embed = discord.Embed(
+        title="Active Scrims",
+        color=0x0099ff
+    )
+    for scrim in scrims:
+        status_emoji = {
+            'open': '🟢',
+            'full': '🔴',
+            'active': '🔵'
+        }.get(scrim.status, '⚪')
+
+        embed.add_field(
+            name=f"{status_emoji} Scrim #{scrim.id} - {scrim.title}",
+            value=f"**Mode:** {scrim.game_mode}\n**Players:** {scrim.player_count}/{scrim.max_players}"
+                  f"{ready_text(presence, scrim)}\n**Status:** {scrim.status.title()}",
+            inline=False
+        )
+    embed.set_footer(text=f"Page {page + 1} • Use /scrim_info [id] for details")
+    return embed
+
+
+# Holds only the keyset cursor (first/last id on screen); each click fetches its page lazily
+# from Database.get_active_scrims_page, which shares a short-TTL page cache across users.
+class ActiveScrimsView(discord.ui.View):
+    def __init__(self, db: Database, presence: PresenceIndex, guild_id: int, scrims: List[Scrim], has_next: bool):
+        super().__init__(timeout=LIST_SCRIMS_TIMEOUT)
+        self.db = db
+        self.presence = presence
+        self.guild_id = guild_id
+        self.scrims = scrims
+        self.page = 0
+        self.message: Optional[discord.Message] = None
+        self.update_buttons(has_previous=False, has_next=has_next)
+
+    def build_embed(self) -> discord.Embed:
+        return active_scrims_embed(self.scrims, self.page, self.presence)
+
+    def update_buttons(self, has_previous: bool, has_next: bool):
+        self.prev_button.disabled = not has_previous
+        self.next_button.disabled = not has_next
+
+    @discord.ui.button(label="Previous")
+    async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        scrims, has_previous = await self.db.get_active_scrims_page(self.guild_id, before_id=self.scrims[0].id)
+        if scrims:
+            self.scrims = scrims
+            self.page = max(self.page - 1, 0)
+            self.next_button.disabled = False
+        self.prev_button.disabled = not (scrims and has_previous)
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    @discord.ui.button(label="Next")
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        scrims, has_next = await self.db.get_active_scrims_page(self.guild_id, after_id=self.scrims[-1].id)
+        if scrims:
+            self.scrims = scrims
+            self.page += 1
+            self.prev_button.disabled = False
+        self.next_button.disabled = not (scrims and has_next)
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+
 class ScrimCommands(commands.Cog):
     def __init__(self, bot: ScrimBot):
         self.bot = bot
 
     @app_commands.command(name="create_scrim", description="Create new scrim")
+    @app_commands.guild_only()
     async def create_scrim(self,
                            interaction: discord.Interaction,
                            title: str,
@@ -41,7 +127,9 @@ class ScrimCommands(commands.Cog):
                                                     ephemeral=True)
             return
 
-        scrim_id = self.bot.db.insert_scrim(title, game_mode, time, max_players, interaction.user)
+        scrim_id = await self.bot.db.insert_scrim(interaction.guild_id, title, game_mode, int(time_obj.timestamp()),
+                                                  max_players, interaction.user)
+        self.bot.dispatch("scrim_scheduled", scrim_id, int(time_obj.timestamp()))
 
         embed = discord.Embed(
             title="Scrim Created Successfully!",
@@ -55,66 +143,67 @@ class ScrimCommands(commands.Cog):
         await interaction.response.send_message(embed=embed)
 
     @app_commands.command(name="join_scrim", description="Join existing scrim")
+    @app_commands.guild_only()
+    @app_commands.autocomplete(scrim_id=scrim_autocomplete(('open',)))
     async def join_scrim(self,
                          interaction: discord.Interaction,
                          scrim_id: int):
-        scrim = self.bot.db.get_scrim_by_id(scrim_id)
-        if not scrim:
+        outcome = await self.bot.db.join_scrim_atomic(scrim_id, interaction.user, interaction.guild_id)
+        if outcome['result'] == 'not_found':
             await interaction.response.send_message("Scrim not found. Please check the ID and try again.",
                                                     ephemeral=True)
             return
-        if scrim['status'] in ['completed', 'active', 'cancelled']:
+        if outcome['result'] == 'closed':
             await interaction.response.send_message("This scrim is no longer accepting players.", ephemeral=True)
             return
-        if self.bot.db.is_user_in_scrim(scrim_id, interaction.user.id):
+        if outcome['result'] == 'already_joined':
             await interaction.response.send_message("You're already registered for this scrim.", ephemeral=True)
             return
-        if scrim['status'] == 'full':
+        if outcome['result'] == 'full':
             await interaction.response.send_message("This scrim is full! Try joining another one.", ephemeral=True)
             return
 
-        self.bot.db.insert_scrim_player(scrim_id, interaction.user)
-
-        current_count = self.bot.db.get_scrim_player_count(scrim_id)
-        if current_count == scrim['max_players']:
-            self.bot.db.update_scrim_status(scrim_id, "full")
+        self.bot.dispatch("scrim_joined", scrim_id, interaction.guild_id, interaction.user.id)
+        current_count = outcome['player_count']
 
         embed = discord.Embed(
             title="Successfully Joined!",
             description=f"You've been added to Scrim #{scrim_id}",
             color=0x00ff00
         )
-        embed.add_field(name="Players", value=f"{current_count}/{scrim['max_players']}", inline=True)
+        embed.add_field(name="Players", value=f"{current_count}/{outcome['max_players']}", inline=True)
         embed.set_footer(text="You'll be notified when the scrim starts!")
 
         await interaction.response.send_message(embed=embed)
 
     @app_commands.command(name="leave_scrim", description="Leave a scrim")
+    @app_commands.guild_only()
+    @app_commands.autocomplete(scrim_id=scrim_autocomplete(('open', 'full'), scope='joined'))
     async def leave_scrim(self,
                           interaction: discord.Interaction,
                           scrim_id: int):
-        scrim = self.bot.db.get_scrim_by_id(scrim_id)
-        if not scrim:
+        outcome = await self.bot.db.leave_scrim_atomic(scrim_id, interaction.user.id, interaction.guild_id)
+        if outcome['result'] == 'not_found':
             await interaction.response.send_message("Scrim not found. Please check the ID and try again.",
                                                     ephemeral=True)
             return
-
-        user = interaction.user
-        if not self.bot.db.is_user_in_scrim(scrim_id, user.id):
+        if outcome['result'] == 'closed':
+            await interaction.response.send_message("This scrim has already started or ended - you can't leave it now.",
+                                                    ephemeral=True)
+            return
+        if outcome['result'] == 'not_joined':
             await interaction.response.send_message("You're not registered for this scrim.", ephemeral=True)
             return
 
-        self.bot.db.delete_scrim_player(scrim_id, user.id)
-        if scrim['status'] == 'full':
-            self.bot.db.update_scrim_status(scrim_id, "open")
-
+        self.bot.dispatch("scrim_left", scrim_id, interaction.user.id)
         await interaction.response.send_message(
             f"Successfully left Scrim #{scrim_id}. You can rejoin anytime before it starts!", ephemeral=True)
 
     @app_commands.command(name="list_scrims", description="View all active scrims")
+    @app_commands.guild_only()
     async def list_scrims(self,
                           interaction: discord.Interaction):
-        scrims = self.bot.db.get_active_scrims()
+        scrims, has_next = await self.bot.db.get_active_scrims_page(interaction.guild_id)
 
         if not scrims:
             embed = discord.Embed(
@@ -125,50 +214,17 @@ class ScrimCommands(commands.Cog):
             await interaction.response.send_message(embed=embed)
             return
 
-        per_page = 5
-        pages = [scrims[i:i + per_page] for i in range(0, len(scrims), per_page)]
-        current_page = 0
-
-        def get_page_content(page_num):
-            embed = discord.Embed(
-                title="Active Scrims",
-                color=0x0099ff
-            )
-            for i, scrim in enumerate(pages[page_num]):
-                status_emoji = {
-                    'open': '🟢',
-                    'full': '🔴',
-                    'active': '🔵'
-                }.get(scrim['status'], '⚪')
-
-                embed.add_field(
-                    name=f"{status_emoji} Scrim #{scrim['id']} - {scrim['title']}",
-                    value=f"**Mode:** {scrim['game_mode']}\n**Players:** {scrim['player_count']}/{scrim['max_players']}\n**Status:** {scrim['status'].title()}",
-                    inline=False
-                )
-            embed.set_footer(text=f"Page {page_num + 1}/{len(pages)} • Use /scrim_info [id] for details")
-            return embed
-
-        class PaginationView(discord.ui.View):
-            @discord.ui.button(label="Previous")
-            async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-                nonlocal current_page
-                current_page = (current_page - 1) % len(pages)
-                await interaction.response.edit_message(embed=get_page_content(current_page), view=self)
-
-            @discord.ui.button(label="Next")
-            async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-                nonlocal current_page
-                current_page = (current_page + 1) % len(pages)
-                await interaction.response.edit_message(embed=get_page_content(current_page), view=self)
-
-        await interaction.response.send_message(embed=get_page_content(0), view=PaginationView())
+        view = ActiveScrimsView(self.bot.db, self.bot.presence, interaction.guild_id, scrims, has_next)
+        await interaction.response.send_message(embed=view.build_embed(), view=view)
+        view.message = await interaction.original_response()
 
     @app_commands.command(name="scrim_info", description="Detailed scrim information")
+    @app_commands.guild_only()
+    @app_commands.autocomplete(scrim_id=scrim_autocomplete())
     async def scrim_info(self,
                          interaction: discord.Interaction,
                          scrim_id: int):
-        scrim = self.bot.db.get_scrim_by_id(scrim_id)
+        scrim = await self.bot.db.get_scrim_by_id(scrim_id, interaction.guild_id)
         if not scrim:
             await interaction.response.send_message("Scrim not found. Please check the ID and try again.",
                                                     ephemeral=True)
@@ -176,22 +232,18 @@ class ScrimCommands(commands.Cog):
 
         embed = discord.Embed(
             title=f"Scrim #{scrim_id} Details",
-            description=scrim['title'],
+            description=scrim.title,
             color=0x0099ff
         )
-        embed.add_field(name="Game Mode", value=scrim['game_mode'], inline=True)
-        embed.add_field(name="Players", value=f"{scrim['player_count']}/{scrim['max_players']}", inline=True)
-        embed.add_field(name="Status", value=scrim['status'].title(), inline=True)
+        embed.add_field(name="Game Mode", value=scrim.game_mode, inline=True)
+        embed.add_field(name="Players", value=f"{scrim.player_count}/{scrim.max_players}"
+                                              f"{ready_text(self.bot.presence, scrim)}", inline=True)
+        embed.add_field(name="Status", value=scrim.status.title(), inline=True)
         embed.add_field(name="Scheduled",
-                        value=f"<t:{int(datetime.strptime(scrim['scheduled_time'], '%Y-%m-%d %H:%M').timestamp())}:F>",
+                        value=f"<t:{scrim.scheduled_time}:F>",
                         inline=False)
 
-        try:
-            creator = await self.bot.fetch_user(scrim['creator_id'])
-            creator_name = creator.display_name
-        except:
-            creator_name = f"User {scrim['creator_id']}"
-
+        creator_name = await self.bot.names.resolve_one(interaction.guild, scrim.creator_id)
         embed.set_footer(text=f"Created by {creator_name} • ID: {scrim_id}")
 
         await interaction.response.send_message(embed=embed)
@@ -1,3 +1,5 @@
+from typing import Dict
+
 import discord
 from discord import app_commands
 from discord.ext import commands
@@ -5,15 +7,22 @@ from discord.ext import commands
 from main import ScrimBot
 
 
+def format_history_entry(scrim: Dict) -> str:
+    title = scrim['title'] if len(scrim['title']) <= 40 else scrim['title'][:39] + "…"
+    team = f" • Team {scrim['team']}" if scrim['team'] else ""
+    return f"• #{scrim['scrim_id']} {title} ({scrim['status'].title()}{team})"
+
+
 class StatsCommands(commands.Cog):
     def __init__(self, bot: ScrimBot):
         self.bot = bot
 
     @app_commands.command(name="my_scrims", description="Personal scrim history")
+    @app_commands.guild_only()
     async def my_scrims(self,
                         interaction: discord.Interaction):
-        scrims = self.bot.db.get_scrims_by_user(interaction.user.id)
-        if not scrims:
+        stats = await self.bot.db.get_player_stats(interaction.guild_id, interaction.user.id)
+        if not stats:
             embed = discord.Embed(
                 title=f"{interaction.user.display_name}'s Scrim History",
                 description="You haven't joined any scrims yet.",
@@ -22,11 +31,50 @@ class StatsCommands(commands.Cog):
         else:
             embed = discord.Embed(
                 title=f"{interaction.user.display_name}'s Scrim History",
-                description=f"Total scrims played: {len(scrims)}",
+                description=f"Total scrims played: {stats['scrims_played']}",
                 color=0x0099ff
             )
-            scrim_list = "\n".join([f"• Scrim #{scrim['scrim_id']}" for scrim in scrims])
-            embed.add_field(name="Your Scrims", value=scrim_list, inline=False)
+            embed.add_field(name="Joined", value=str(stats['scrims_joined']), inline=True)
+            embed.add_field(name="Completed", value=str(stats['scrims_completed']), inline=True)
+            embed.add_field(name="Cancelled", value=str(stats['scrims_cancelled']), inline=True)
+            embed.add_field(name="Team Split", value=f"🔴 {stats['team1_count']} / 🔵 {stats['team2_count']}",
+                            inline=True)
+            if stats['last_active']:
+                embed.add_field(name="Last Active", value=f"<t:{stats['last_active']}:R>", inline=True)
+
+            history = await self.bot.db.get_player_history(interaction.guild_id, interaction.user.id)
+            if history:
+                embed.add_field(name="Recent Scrims", value="\n".join([format_history_entry(scrim) for scrim in history]),
+                                inline=False)
+
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="leaderboard", description="Top rated players")
+    @app_commands.guild_only()
+    async def leaderboard(self,
+                          interaction: discord.Interaction):
+        top = await self.bot.db.get_leaderboard(interaction.guild_id)
+        if not top:
+            embed = discord.Embed(
+                title="Leaderboard",
+                description="No rated scrims yet - record a result with /end_scrim.",
+                color=0x99ccff
+            )
+            await interaction.response.send_message(embed=embed)
+            return
+
+        embed = discord.Embed(
+            title="Leaderboard",
+            description="\n".join([f"**{position}.** <@{player_id}> - {rating:.0f}"
+                                   for position, (player_id, rating) in enumerate(top, start=1)]),
+            color=0x0099ff
+        )
+        own_rank = await self.bot.db.get_player_rank(interaction.guild_id, interaction.user.id)
+        if own_rank:
+            rank, rating = own_rank
+            embed.set_footer(text=f"Your rank: #{rank} ({rating:.0f})")
+        else:
+            embed.set_footer(text="Play a rated scrim to get ranked!")
 
         await interaction.response.send_message(embed=embed)
 
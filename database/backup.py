@@ -0,0 +1,155 @@
+"""Online snapshots of the scrim database: create, check, rotate, list and restore.
+
+Usage: python -m database.backup [--db scrim_bot.db] [--dir backups] create|list|restore [SNAPSHOT]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+BACKUP_DIR = os.getenv("SCRIM_BACKUP_DIR", "backups")
+# Newest snapshots kept regardless of age, and how long older ones survive.
+BACKUP_KEEP = int(os.getenv("SCRIM_BACKUP_KEEP", 8))
+BACKUP_RETENTION_DAYS = float(os.getenv("SCRIM_BACKUP_RETENTION_DAYS", 7))
+# Pages copied per backup step (4 KiB each) and the pause between steps.
+BACKUP_STEP_PAGES = 256
+BACKUP_STEP_PAUSE = 0.005
+SNAPSHOT_PREFIX = "scrim_bot-"
+SNAPSHOT_SUFFIX = ".db"
+
+
+def snapshot_name(now: float) -> str:
+    # Microseconds keep back-to-back snapshots (a restore's undo copy right after a backup) apart.
+    return f"{SNAPSHOT_PREFIX}{datetime.fromtimestamp(now, timezone.utc):%Y%m%d-%H%M%S-%f}{SNAPSHOT_SUFFIX}"
+
+
+def list_snapshots(directory: str = BACKUP_DIR) -> List[str]:
+    # Newest first; the UTC timestamp in the name sorts chronologically.
+    if not os.path.isdir(directory):
+        return []
+    return sorted((name for name in os.listdir(directory)
+                   if name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX)), reverse=True)
+
+
+def check_snapshot(path: str) -> str:
+    # 'ok', or the first problem PRAGMA integrity_check found.
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA integrity_check").fetchone()[0]
+    except sqlite3.DatabaseError as e:
+        return str(e)
+    finally:
+        conn.close()
+
+
+def create_snapshot(db_path: str, directory: str = BACKUP_DIR, pages: int = BACKUP_STEP_PAGES,
+                    pause: float = BACKUP_STEP_PAUSE) -> Dict:
+    # Blocking: run it on a worker thread (Database.backup) or from the CLI. Copies the live
+    # database with SQLite's online backup API a few pages per step, sleeping between steps.
+    # The source connection pins one read snapshot for the whole copy: in WAL mode writers carry
+    # on untouched, and their commits can't restart the backup the way they would if each step
+    # began a fresh read. The copy is written under a temporary name, switched out of WAL so
+    # it's a single self-contained file, integrity checked, and only then renamed into place.
+    os.makedirs(directory, exist_ok=True)
+    now = time.time()
+    path = os.path.join(directory, snapshot_name(now))
+    partial = path + ".partial"
+    steps = 0
+
+    def step_done(status: int, remaining: int, total: int):
+        nonlocal steps
+        steps += 1
+        if remaining:
+            time.sleep(pause)
+
+    start = time.perf_counter()
+    source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, isolation_level=None)
+    target = sqlite3.connect(partial, isolation_level=None)
+    try:
+        source.execute("BEGIN")
+        source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        source.backup(target, pages=pages, progress=step_done)
+        source.execute("COMMIT")
+        total_pages = target.execute("PRAGMA page_count").fetchone()[0]
+        target.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        source.close()
+        target.close()
+    copied = time.perf_counter() - start
+
+    integrity = check_snapshot(partial)
+    if integrity != 'ok':
+        os.remove(partial)
+        raise sqlite3.DatabaseError(f"Snapshot failed integrity check: {integrity}")
+    if os.path.exists(path):
+        # Never replace an existing snapshot: it may be the only copy of that state.
+        os.remove(partial)
+        raise FileExistsError(f"Snapshot {path} already exists")
+    os.replace(partial, path)
+    return {'path': path, 'pages': total_pages, 'steps': steps, 'bytes': os.path.getsize(path),
+            'copy_elapsed': copied, 'elapsed': time.perf_counter() - start}
+
+
+def rotate_snapshots(directory: str = BACKUP_DIR, keep: int = BACKUP_KEEP,
+                     retention_days: float = BACKUP_RETENTION_DAYS, now: Optional[float] = None) -> List[str]:
+    # Keeps the newest `keep` snapshots plus any younger than the retention period; removes the rest.
+    cutoff = (now if now is not None else time.time()) - retention_days * 24 * 60 * 60
+    removed = []
+    for name in list_snapshots(directory)[keep:]:
+        path = os.path.join(directory, name)
+        if os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            removed.append(name)
+    return removed
+
+
+def restore_snapshot(path: str, conn: sqlite3.Connection) -> int:
+    # Copies the snapshot over conn's database in one step, so the switch is a single write
+    # transaction: readers see the old database or the new one, never a mix. Returns pages copied.
+    source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        source.backup(conn)
+        return source.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        source.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m database.backup", description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="scrim_bot.db", help="database file (default: scrim_bot.db)")
+    parser.add_argument("--dir", default=BACKUP_DIR, help=f"snapshot directory (default: {BACKUP_DIR})")
+    parser.add_argument("action", choices=("create", "list", "restore"))
+    parser.add_argument("snapshot", nargs="?", help="snapshot file name or path to restore")
+    args = parser.parse_args(argv)
+
+    if args.action == "create":
+        stats = create_snapshot(args.db, args.dir)
+        removed = rotate_snapshots(args.dir)
+        print(f"Wrote {stats['path']} ({stats['bytes'] / 2 ** 20:.1f} MiB, {stats['steps']} steps) "
+              f"in {stats['elapsed']:.2f}s; rotated out {len(removed)}")
+    elif args.action == "list":
+        for name in list_snapshots(args.dir):
+            print(f"{name}  {os.path.getsize(os.path.join(args.dir, name)) / 2 ** 20:8.1f} MiB")
+    else:
+        if not args.snapshot:
+            parser.error("restore needs a SNAPSHOT")
+        path = args.snapshot if os.path.exists(args.snapshot) else os.path.join(args.dir, args.snapshot)
+        integrity = check_snapshot(path)
+        if integrity != 'ok':
+            print(f"Refusing to restore {path}: {integrity}", file=sys.stderr)
+            return 1
+        # Stop the bot first; it keeps its own connection and caches open.
+        conn = sqlite3.connect(args.db, isolation_level=None)
+        try:
+            pages = restore_snapshot(path, conn)
+        finally:
+            conn.close()
+        print(f"Restored {args.db} from {path} ({pages} pages)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+import bisect
+import itertools
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from database.records import Scrim, ScrimPlayer
+
+ACTIVE_STATUSES = ('open', 'full', 'active')
+
+
+# LRU cache of active scrim rows and their rosters, kept coherent by Database writes.
+# A scrim is evicted as soon as it is completed or cancelled. Callers always get copies,
+# so cached rows only ever change through the write-through hooks below.
+class ScrimCache:
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._scrims: "OrderedDict[int, Scrim]" = OrderedDict()
+        self._rosters: Dict[int, List[ScrimPlayer]] = {}
+
+    def __len__(self) -> int:
+        return len(self._scrims)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._scrims),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    # LOOKUPS
+    def get_scrim(self, scrim_id: int) -> Optional[Scrim]:
+        scrim = self._scrims.get(scrim_id)
+        if scrim is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._scrims.move_to_end(scrim_id)
+        return scrim.copy()
+
+    def get_roster(self, scrim_id: int) -> Optional[List[ScrimPlayer]]:
+        players = self._rosters.get(scrim_id)
+        if players is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._scrims.move_to_end(scrim_id)
+        return [player.copy() for player in players]
+
+    # FILLS
+    def put_scrim(self, scrim: Scrim, players: Optional[List[ScrimPlayer]] = None):
+        scrim_id = scrim.id
+        if scrim.status not in ACTIVE_STATUSES:
+            self.invalidate(scrim_id)
+            return
+
+        self._scrims[scrim_id] = scrim.copy()
+        self._scrims.move_to_end(scrim_id)
+        if players is not None:
+            self._rosters[scrim_id] = [player.copy() for player in players]
+
+        while len(self._scrims) > self.max_size:
+            evicted_id, _ = self._scrims.popitem(last=False)
+            self._rosters.pop(evicted_id, None)
+
+    # WRITE-THROUGH HOOKS
+    def update_scrim(self, scrim_id: int, **fields):
+        scrim = self._scrims.get(scrim_id)
+        if scrim is None:
+            return
+        for name, value in fields.items():
+            setattr(scrim, name, value)
+        if scrim.status not in ACTIVE_STATUSES:
+            self.invalidate(scrim_id)
+
+    def add_player(self, scrim_id: int, player: ScrimPlayer):
+        players = self._rosters.get(scrim_id)
+        if players is not None:
+            players.append(player.copy())
+
+    def remove_player(self, scrim_id: int, player_id: int):
+        players = self._rosters.get(scrim_id)
+        if players is not None:
+            self._rosters[scrim_id] = [p for p in players if p.player_id != player_id]
+
+    def rename_players(self, names: Dict[int, str]):
+        for players in self._rosters.values():
+            for player in players:
+                if player.player_id in names:
+                    player.player_name = names[player.player_id]
+
+    def set_teams(self, scrim_id: int, teams: Dict[int, int]):
+        for player in self._rosters.get(scrim_id, ()):
+            if player.player_id in teams:
+                player.team = teams[player.player_id]
+
+    def invalidate(self, scrim_id: int):
+        self._scrims.pop(scrim_id, None)
+        self._rosters.pop(scrim_id, None)
+
+    def clear(self):
+        self._scrims.clear()
+        self._rosters.clear()
+
+
+# Small TTL cache for read-mostly results (e.g. /list_scrims pages, resolved user names).
+# Entries simply expire, and the least recently used go first once it is full; callers
+# clear it on writes that would make an entry obviously wrong.
+class TTLCache:
+    def __init__(self, ttl: float = 10.0, max_size: int = 256):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+# Order-statistics view of player_ratings: a sorted list of (-rating, player_id) so the top N
+# is a slice and a player's rank is one bisect. Loaded once, then updated on every rating change.
+class RankIndex:
+    def __init__(self):
+        self.loaded = False
+        self._keys: List[Tuple[float, int]] = []
+        self._ratings: Dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self, ratings: Iterable[Tuple[int, float]]):
+        self._ratings = dict(ratings)
+        self._keys = sorted((-rating, player_id) for player_id, rating in self._ratings.items())
+        self.loaded = True
+
+    def update(self, player_id: int, rating: float):
+        old = self._ratings.get(player_id)
+        if old is not None:
+            del self._keys[bisect.bisect_left(self._keys, (-old, player_id))]
+        self._ratings[player_id] = rating
+        bisect.insort(self._keys, (-rating, player_id))
+
+    def rating(self, player_id: int) -> Optional[float]:
+        return self._ratings.get(player_id)
+
+    def rank(self, player_id: int) -> Optional[int]:
+        rating = self._ratings.get(player_id)
+        if rating is None:
+            return None
+        # Players tied on rating share the best rank among them.
+        return bisect.bisect_left(self._keys, (-rating, -1)) + 1
+
+    def top(self, limit: int, offset: int = 0) -> List[Tuple[int, float]]:
+        return [(player_id, -key) for key, player_id in self._keys[offset:offset + limit]]
+
+
+# Every scrim that is still open, full or active, keyed for autocomplete: per guild, sorted
+# (id string, id) and (lowercased title, id) lists make a prefix match one bisect plus a short
+# walk. Loaded once, then kept current by the Database write paths like RankIndex.
+class ScrimSearchIndex:
+    def __init__(self):
+        self.loaded = False
+        self._scrims: Dict[int, Scrim] = {}
+        self._by_guild: Dict[int, Dict[int, Scrim]] = {}
+        self._ids: Dict[int, List[Tuple[str, int]]] = {}
+        self._titles: Dict[int, List[Tuple[str, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._scrims)
+
+    def load(self, scrims: Iterable[Scrim]):
+        self._scrims, self._by_guild, self._ids, self._titles = {}, {}, {}, {}
+        for scrim in sorted(scrims, key=lambda s: s.id):
+            self._scrims[scrim.id] = scrim
+            self._by_guild.setdefault(scrim.guild_id, {})[scrim.id] = scrim
+            self._ids.setdefault(scrim.guild_id, []).append((str(scrim.id), scrim.id))
+            self._titles.setdefault(scrim.guild_id, []).append((scrim.title.lower(), scrim.id))
+        for keys in (*self._ids.values(), *self._titles.values()):
+            keys.sort()
+        self.loaded = True
+
+    def add(self, scrim: Scrim):
+        if not self.loaded or scrim.status not in ACTIVE_STATUSES:
+            return
+        self.remove(scrim.id)
+        entry = scrim.copy()
+        self._scrims[entry.id] = entry
+        self._by_guild.setdefault(entry.guild_id, {})[entry.id] = entry
+        bisect.insort(self._ids.setdefault(entry.guild_id, []), (str(entry.id), entry.id))
+        bisect.insort(self._titles.setdefault(entry.guild_id, []), (entry.title.lower(), entry.id))
+
+    def update(self, scrim_id: int, **fields):
+        entry = self._scrims.get(scrim_id)
+        if entry is None:
+            return
+        for name, value in fields.items():
+            setattr(entry, name, value)
+        if entry.status not in ACTIVE_STATUSES:
+            self.remove(scrim_id)
+
+    def remove(self, scrim_id: int):
+        entry = self._scrims.pop(scrim_id, None)
+        if entry is None:
+            return
+        guild_id = entry.guild_id
+        del self._by_guild[guild_id][scrim_id]
+        for keys, key in ((self._ids[guild_id], (str(scrim_id), scrim_id)),
+                          (self._titles[guild_id], (entry.title.lower(), scrim_id))):
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+
+    def _prefixed(self, keys: List[Tuple[str, int]], prefix: str) -> Iterable[int]:
+        for i in range(bisect.bisect_left(keys, (prefix,)), len(keys)):
+            if not keys[i][0].startswith(prefix):
+                break
+            yield keys[i][1]
+
+    def search(self, guild_id: int, text: str, predicate: Callable[[Scrim], bool] = lambda scrim: True,
+               limit: int = 25) -> List[Scrim]:
+        # Empty text lists the newest scrims; otherwise id-prefix matches come before title-prefix ones.
+        scrims = self._by_guild.get(guild_id, {})
+        text = text.strip().lstrip('#').lower()
+        if not text:
+            candidates = (scrims[scrim_id] for scrim_id in reversed(scrims))
+        else:
+            ids = self._prefixed(self._ids.get(guild_id, []), text) if text.isdigit() else ()
+            titles = self._prefixed(self._titles.get(guild_id, []), text)
+            candidates = (scrims[scrim_id] for scrim_id in itertools.chain(ids, titles))
+
+        results, seen = [], set()
+        for scrim in candidates:
+            if scrim.id in seen or not predicate(scrim):
+                continue
+            seen.add(scrim.id)
+            results.append(scrim.copy())
+            if len(results) >= limit:
+                break
+        return results
@@ -1,161 +1,1035 @@
+import asyncio
+import os
+import re
 import sqlite3
-from typing import Dict, List, Optional
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 import discord
 
+from utils.metrics import SLOW_QUERY_THRESHOLD, metrics
+from utils.teams import DEFAULT_RATING, elo_deltas
+
+from database.backup import BACKUP_DIR, check_snapshot, create_snapshot, restore_snapshot, rotate_snapshots
+from database.cache import RankIndex, ScrimCache, ScrimSearchIndex, TTLCache
+from database.export import stream_history
+from database.migrations import migrate
+from database.records import SCRIM_COLUMNS, SCRIM_PLAYER_COLUMNS, Scrim, ScrimPlayer
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",
+    "PRAGMA mmap_size = 67108864",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA foreign_keys = ON",
+)
+
+RETENTION_DAYS = 30
+PURGE_CHUNK_SIZE = 100
+PURGE_CHUNK_PAUSE = 0.05
+VACUUM_CHUNK_PAGES = 256
+SCRIMS_PER_PAGE = 5
+PAGE_CACHE_TTL = 10.0
+HISTORY_PAGE_SIZE = 10
+LEADERBOARD_SIZE = 10
+# Discord shows at most 25 autocomplete choices.
+AUTOCOMPLETE_LIMIT = 25
+STREAM_BATCH_SIZE = 500
+# Roster writes queued while a transaction is committing share the next one (group commit).
+GROUP_COMMIT = os.getenv("SCRIM_GROUP_COMMIT", "true").lower() in ("1", "true", "yes")
+GROUP_COMMIT_MAX = 256
+SQL_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+# Which player_stats counter a scrim's players bump when it moves into that status.
+STATUS_STATS_COLUMNS = {'completed': 'scrims_completed', 'cancelled': 'scrims_cancelled'}
+# A scrim in one of these never changes status again.
+FINISHED_STATUSES = ('completed', 'cancelled')
+# Journal event recorded when a scrim moves into that status.
+STATUS_EVENTS = {'active': 'started', 'completed': 'ended', 'cancelled': 'cancelled'}
+# player_stats counters the journal can rebuild; last_active is carried alongside them.
+PLAYER_STATS_COLUMNS = ('scrims_joined', 'scrims_played', 'scrims_completed', 'scrims_cancelled',
+                        'team1_count', 'team2_count')
+
 
 class Database:
-    def __init__(self, db_path: str = "scrim_bot.db"):
+    def __init__(self, db_path: str = "scrim_bot.db", group_commit: bool = GROUP_COMMIT):
         self.db_path = db_path
-        self.init_db()
+        self.group_commit = group_commit
+        # All SQLite work happens on this one thread against one persistent connection,
+        # so the event loop never blocks on disk I/O and writes are naturally serialised.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scrim-db")
+        self._conn: Optional[sqlite3.Connection] = None
+        # Read-only second connection for iter_query, so a long scan reads one WAL snapshot and
+        # never leaves a statement open on the writer between batches.
+        self._reader: Optional[sqlite3.Connection] = None
+        self.cache = ScrimCache()
+        self.pages = TTLCache(ttl=PAGE_CACHE_TTL)
+        self.ranks: Dict[int, RankIndex] = {}
+        self.search = ScrimSearchIndex()
+        self.guild_configs: Dict[int, Dict] = {}
+        self._pending_writes: List[Tuple[Callable[..., Any], tuple, asyncio.Future]] = []
+        self._committer: Optional[asyncio.Task] = None
+        self.write_groups = {'groups': 0, 'writes': 0}
+        # Opening (connect + migrations) is deferred to the first open()/run() so constructing
+        # the bot doesn't block on disk; the executor is FIFO, so queued work always sees it done.
+        self._opened: Optional[Future] = None
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            self._conn.execute(pragma)
 
     def init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.executescript("""
-                CREATE TABLE IF NOT EXISTS scrims (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    game_mode TEXT NOT NULL,
-                    max_players INTEGER NOT NULL,
-                    scheduled_time TEXT NOT NULL,
-                    creator_id INTEGER NOT NULL,
-                    player_count INTEGER DEFAULT 0,
-                    team1_vc_id INTEGER,
-                    team2_vc_id INTEGER,
-                    category_id INTEGER,
-                    status TEXT DEFAULT 'open',
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                );
-
-                CREATE TABLE IF NOT EXISTS scrim_players (
-                    scrim_id INTEGER,
-                    player_id INTEGER,
-                    player_name TEXT,
-                    team INTEGER,
-                    joined_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (scrim_id, player_id)
-                );
-            """)
+        migrate(self._conn)
+
+    def _open(self):
+        self._connect()
+        try:
+            self.init_db()
+        except BaseException:
+            self._conn.close()
+            self._conn = None
+            raise
+
+    async def open(self):
+        if self._opened is None or (self._opened.done() and self._opened.exception()):
+            self._opened = self._executor.submit(self._open)
+        await asyncio.wrap_future(self._opened)
+
+    @staticmethod
+    def _query_label(func: Callable[..., Any], args: tuple) -> str:
+        # Low-cardinality metric label: verb_table for ad-hoc SQL, else the Database method name.
+        if args and isinstance(args[0], str):
+            verb = args[0].split(None, 1)[0].lower()
+            table = SQL_TABLE.search(args[0])
+            return f"{verb}_{table.group(1)}" if table else verb
+        return func.__qualname__.split('.<locals>')[0].rsplit('.', 1)[-1].lstrip('_')
+
+    @classmethod
+    def _timed(cls, func: Callable[..., Any], conn: sqlite3.Connection, *args) -> Any:
+        # Runs on the DB thread, so the histogram measures SQLite time rather than executor queueing.
+        label = cls._query_label(func, args)
+        start = time.perf_counter()
+        try:
+            return func(conn, *args)
+        except Exception:
+            metrics.failure('query', label)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe('query', label, elapsed)
+            if elapsed >= SLOW_QUERY_THRESHOLD:
+                sql = " ".join(args[0].split())[:200] if args and isinstance(args[0], str) else ""
+                print(f"Slow query {label} took {elapsed * 1000:.1f}ms {sql}".rstrip())
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        if self._conn is None:
+            await self.open()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._timed, func, self._conn, *args)
+
+    async def close(self):
+        # Writes still queued for group commit have callers waiting on them; commit them first.
+        while self._committer is not None:
+            await self._committer
+        if self._reader is not None:
+            await self.run(lambda conn: self._reader.close())
+        if self._conn is not None:
+            await self.run(lambda conn: conn.close())
+        self._executor.shutdown(wait=True)
+
+    @staticmethod
+    @contextmanager
+    def _transaction(conn: sqlite3.Connection):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    @classmethod
+    def _commit_group(cls, conn: sqlite3.Connection, writes: List[Tuple[Callable[..., Any], tuple]]) -> List:
+        # One transaction for the whole group; each write gets a savepoint, so one that raises
+        # is rolled back alone and the rest still commit. Returns (ok, result or exception) per write.
+        results = []
+        with cls._transaction(conn):
+            for func, args in writes:
+                conn.execute("SAVEPOINT write")
+                try:
+                    results.append((True, func(conn, *args)))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write")
+                    results.append((False, e))
+                conn.execute("RELEASE write")
+        return results
+
+    async def _commit_pending(self):
+        try:
+            while self._pending_writes:
+                group = self._pending_writes[:GROUP_COMMIT_MAX]
+                del self._pending_writes[:GROUP_COMMIT_MAX]
+                try:
+                    results = await self.run(self._commit_group, [(func, args) for func, args, _ in group])
+                except Exception as e:
+                    results = [(False, e)] * len(group)
+                self.write_groups['groups'] += 1
+                self.write_groups['writes'] += len(group)
+                for (_, _, future), (ok, value) in zip(group, results):
+                    if future.done():
+                        continue
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+        finally:
+            self._committer = None
+
+    async def write(self, func: Callable[..., Any], *args) -> Any:
+        # Runs func(conn, *args) inside a write transaction. With group commit on, writes that
+        # arrive while one group is on the DB thread queue up and commit together as the next
+        # group, so a burst of joins pays for a handful of commits instead of one each.
+        if not self.group_commit:
+            ok, value = (await self.run(self._commit_group, [(func, args)]))[0]
+            if not ok:
+                raise value
+            return value
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending_writes.append((func, args, future))
+        if self._committer is None:
+            self._committer = asyncio.create_task(self._commit_pending())
+        return await future
+
+    @staticmethod
+    def _append_events(conn: sqlite3.Connection, scrim_id: int, guild_id: int, event: str,
+                       players: Iterable[Tuple[Optional[int], Optional[int]]] = ((None, None),)):
+        # Journal rows for one event: (player_id, team) per player, or a single scrim-level row.
+        # Must run inside the caller's transaction, next to the roster change it records.
+        conn.executemany("""
+            INSERT INTO scrim_events (scrim_id, guild_id, event, player_id, team) VALUES (?, ?, ?, ?, ?)
+            """, [(scrim_id, guild_id, event, player_id, team) for player_id, team in players])
+
+    @staticmethod
+    def _scrim_guild(conn: sqlite3.Connection, scrim_id: int) -> int:
+        row = conn.execute("SELECT guild_id FROM scrims WHERE id = ?", (scrim_id,)).fetchone()
+        return row['guild_id'] if row else 0
+
+    @staticmethod
+    def _in_guild(scrim_guild_id: Optional[int], guild_id: Optional[int]) -> bool:
+        # scrim_guild_id None means the scrim doesn't exist. guild_id None is an unscoped lookup
+        # (background tasks); commands always pass their guild.
+        return scrim_guild_id is not None and (guild_id is None or scrim_guild_id == guild_id)
+
+    @staticmethod
+    def _record_player_stats(conn: sqlite3.Connection, guild_id: int, player_ids: Iterable[int], **deltas: int):
+        # Must run inside the caller's transaction so aggregates move together with the roster.
+        assignments = ", ".join(f"{column} = {column} + ?" for column in deltas)
+        player_ids = list(player_ids)
+        now = int(time.time())
+        conn.executemany("INSERT OR IGNORE INTO player_stats (guild_id, player_id) VALUES (?, ?)",
+                         [(guild_id, player_id) for player_id in player_ids])
+        conn.executemany(f"""
+            UPDATE player_stats
+            SET {assignments},
+                last_active = ?
+            WHERE guild_id = ? AND player_id = ?
+            """, [(*deltas.values(), now, guild_id, player_id) for player_id in player_ids])
+
+    @staticmethod
+    def _query(conn: sqlite3.Connection, query: str, params: tuple, factory: Callable[[sqlite3.Row], Any]) -> List:
+        # Iterating the cursor converts row by row instead of holding every sqlite3.Row at once.
+        return [factory(row) for row in conn.execute(query, params)]
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, query: str, params: tuple) -> int:
+        with conn:
+            return conn.execute(query, params).lastrowid
+
+    async def execute_query(self, query: str, params: tuple = (),
+                            factory: Callable[[sqlite3.Row], Any] = dict) -> List:
+        # factory turns each row into the returned object: dict by default, or a record's from_row.
+        return await self.run(self._query, query, params, factory)
+
+    async def iter_query(self, query: str, params: tuple = (), factory: Callable[[sqlite3.Row], Any] = dict,
+                         batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator:
+        # Streams a large result set in fetchmany batches instead of materialising it, so memory
+        # stays flat however many rows match. Holds a read snapshot until the iterator finishes
+        # or is closed, which delays WAL checkpoints - meant for exports and scans, not commands.
+        def start(conn: sqlite3.Connection) -> sqlite3.Cursor:
+            if self._reader is None:
+                self._reader = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+                self._reader.row_factory = sqlite3.Row
+            return self._reader.execute(query, params)
+
+        def fetch(conn: sqlite3.Connection, cursor: sqlite3.Cursor) -> List:
+            return [factory(row) for row in cursor.fetchmany(batch_size)]
 
-    def execute_query(self, query: str, params: tuple = ()) -> List[Dict]:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute(query, params)
-            return [dict(row) for row in cursor.fetchall()]
+        cursor = await self.run(start)
+        try:
+            while True:
+                batch = await self.run(fetch, cursor)
+                for item in batch:
+                    yield item
+                if len(batch) < batch_size:
+                    break
+        finally:
+            await self.run(lambda conn: cursor.close())
 
-    def execute_insert(self, query: str, params: tuple = ()) -> int:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute(query, params)
-            conn.commit()
-            return cursor.lastrowid
+    async def export_history(self, path: str, guild_id: Optional[int] = None, fmt: str = 'csv',
+                             compress: bool = False) -> Dict:
+        # Streams scrims and rosters to path (see database.export) on a worker thread with its own
+        # read-only connection: off the event loop, and not on the DB thread either, where a long
+        # export would hold up every other query. Returns {'rows', 'elapsed'}.
+        if self._conn is None:
+            await self.open()
+        with metrics.timer('query', 'export_history'):
+            return await asyncio.to_thread(stream_history, self.db_path, path, guild_id, fmt, compress)
+
+    async def backup(self, directory: str = BACKUP_DIR, rotate: bool = True) -> Dict:
+        # Online snapshot plus rotation on a worker thread (see database.backup); the DB thread
+        # keeps serving reads and writes the whole time. Returns create_snapshot's stats and the
+        # snapshots rotated out.
+        if self._conn is None:
+            await self.open()
+        stats = await asyncio.to_thread(create_snapshot, self.db_path, directory)
+        stats['rotated'] = await asyncio.to_thread(rotate_snapshots, directory) if rotate else []
+        return stats
+
+    async def restore(self, path: str) -> int:
+        # Replaces the live database with a snapshot in one write on the DB thread, then brings
+        # it up to the current schema. Returns the pages restored.
+        integrity = await asyncio.to_thread(check_snapshot, path)
+        if integrity != 'ok':
+            raise sqlite3.DatabaseError(f"Snapshot failed integrity check: {integrity}")
+
+        def restore(conn: sqlite3.Connection) -> int:
+            pages = restore_snapshot(path, conn)
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            migrate(conn)
+            return pages
+
+        pages = await self.run(restore)
+        # Everything held in memory described the old database.
+        self.cache.clear()
+        self.pages.clear()
+        self.ranks.clear()
+        self.search = ScrimSearchIndex()
+        self.guild_configs.clear()
+        return pages
+
+    async def execute_insert(self, query: str, params: tuple = ()) -> int:
+        return await self.run(self._insert, query, params)
 
     # Inserters
-    def insert_scrim(self,
-                     title: str,
-                     game_mode: str,
-                     time: str,
-                     max_players: int,
-                     user: discord.User
-                     ) -> int:
-        return self.execute_insert("""
-            INSERT INTO scrims (title, game_mode, max_players, scheduled_time, creator_id)
-            VALUES (?, ?, ?, ?, ?)
-            """, (title, game_mode, max_players, time, user.id))
-
-    def insert_scrim_player(self,
-                            scrim_id: int,
-                            player: discord.User
-                            ) -> bool:
-        self.update_scrim_player_count(scrim_id, 1)
-        return bool(self.execute_insert("""
-            INSERT INTO scrim_players (scrim_id, player_id, player_name)
-            VALUES (?, ?, ?)
-            """, (scrim_id, player.id, player.name)))
+    async def insert_scrim(self,
+                           guild_id: int,
+                           title: str,
+                           game_mode: str,
+                           scheduled_time: int,
+                           max_players: int,
+                           user: discord.User
+                           ) -> int:
+        def insert(conn: sqlite3.Connection) -> Scrim:
+            return Scrim.from_row(conn.execute(f"""
+                INSERT INTO scrims (guild_id, title, game_mode, max_players, scheduled_time, creator_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+                RETURNING {SCRIM_COLUMNS}
+                """, (guild_id, title, game_mode, max_players, scheduled_time, user.id)).fetchall()[0])
+
+        scrim = await self.run(insert)
+        self.pages.clear()
+        self.search.add(scrim)
+        return scrim.id
+
+    @classmethod
+    def _insert_matched_scrims(cls, conn: sqlite3.Connection, matches: List[Dict]) -> List[Scrim]:
+        scrims = []
+        for match in matches:
+            players = match['players']
+            scrim = Scrim.from_row(conn.execute(f"""
+                INSERT INTO scrims (guild_id, title, game_mode, max_players, scheduled_time, creator_id,
+                                    player_count, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'full')
+                RETURNING {SCRIM_COLUMNS}
+                """, (match['guild_id'], match['title'], match['game_mode'], len(players), match['scheduled_time'],
+                      match['creator_id'], len(players))).fetchall()[0])
+            conn.executemany("""
+                INSERT INTO scrim_players (scrim_id, player_id, player_name)
+                VALUES (?, ?, ?)
+                """, [(scrim.id, player_id, player_name) for player_id, player_name in players])
+            cls._record_player_stats(conn, scrim.guild_id, [player_id for player_id, _ in players], scrims_joined=1)
+            cls._append_events(conn, scrim.id, scrim.guild_id, 'joined',
+                               [(player_id, None) for player_id, _ in players])
+            scrims.append(scrim)
+        return scrims
+
+    async def insert_matched_scrims(self, matches: List[Dict]) -> List[Scrim]:
+        # Creates full scrims for matchmaking lobbies in one write: each match is a dict with
+        # guild_id, title, game_mode, scheduled_time, creator_id and players, a list of
+        # (player_id, player_name). Teams are left to start_scrim, as for any other scrim.
+        # Returns the new scrims in the same order.
+        scrims = await self.write(self._insert_matched_scrims, matches)
+        self.pages.clear()
+        for scrim in scrims:
+            self.search.add(scrim)
+        return scrims
 
     # UPDATERS
-    def update_scrim_status(self, scrim_id: int, status: str) -> bool:
-        return bool(self.execute_insert("""
-            UPDATE scrims
-            SET status = ?
-            WHERE id = ?
-            """, (status, scrim_id)))
+    async def update_scrim_status(self, scrim_id: int, status: str) -> bool:
+        # False if the scrim is already in that status or finished: a completed scrim can't be
+        # cancelled (or the reverse), which would count its players under both.
+        def update(conn: sqlite3.Connection) -> bool:
+            with self._transaction(conn):
+                changed = conn.execute(f"""
+                    UPDATE scrims
+                    SET status = ?
+                    WHERE id = ? AND status != ? AND status NOT IN ({", ".join("?" * len(FINISHED_STATUSES))})
+                    """, (status, scrim_id, status, *FINISHED_STATUSES)).rowcount
+                if changed and status in STATUS_EVENTS:
+                    guild_id = self._scrim_guild(conn, scrim_id)
+                    self._append_events(conn, scrim_id, guild_id, STATUS_EVENTS[status])
+                    if status in STATUS_STATS_COLUMNS:
+                        players = conn.execute("""
+                            SELECT player_id FROM scrim_players WHERE (scrim_id = ?)
+                            """, (scrim_id,)).fetchall()
+                        self._record_player_stats(conn, guild_id, [row['player_id'] for row in players],
+                                                  **{STATUS_STATS_COLUMNS[status]: 1})
+                return bool(changed)
 
-    def update_scrim_player_count(self, scrim_id: int, delta: int) -> bool:
-        return bool(self.execute_insert("""
-            UPDATE scrims
-            SET player_count = player_count + ?
-            WHERE id = ?
-            """, (delta, scrim_id)))
+        result = await self.run(update)
+        if result:
+            self.cache.update_scrim(scrim_id, status=status)
+            self.search.update(scrim_id, status=status)
+            self.pages.clear()
+        return result
 
-    def update_scrim_channels(self, scrim_id: int, category_id: int, team1_vc_id: int, team2_vc_id: int) -> bool:
-        return bool(self.execute_insert("""
+    async def update_scrim_channels(self, scrim_id: int, category_id: int, team1_vc_id: int, team2_vc_id: int) -> bool:
+        result = bool(await self.execute_insert("""
             UPDATE scrims
             SET category_id = ?,
                 team1_vc_id = ?,
                 team2_vc_id = ?
             WHERE id = ?
             """, (category_id, team1_vc_id, team2_vc_id, scrim_id)))
+        self.cache.update_scrim(scrim_id, category_id=category_id, team1_vc_id=team1_vc_id, team2_vc_id=team2_vc_id)
+        return result
+
+    async def update_player_teams(self, scrim_id: int, teams: Dict[int, int]) -> bool:
+        def update(conn: sqlite3.Connection) -> bool:
+            with self._transaction(conn):
+                guild_id = self._scrim_guild(conn, scrim_id)
+                updated = bool(conn.executemany("""
+                    UPDATE scrim_players
+                    SET team = ?
+                    WHERE (scrim_id = ?) AND (player_id = ?)
+                    """, [(team, scrim_id, player_id) for player_id, team in teams.items()]).rowcount)
+                for team, column in ((1, 'team1_count'), (2, 'team2_count')):
+                    self._record_player_stats(conn, guild_id, [p for p, t in teams.items() if t == team],
+                                              scrims_played=1, **{column: 1})
+                self._append_events(conn, scrim_id, guild_id, 'team_assigned', teams.items())
+                return updated
+
+        result = await self.run(update)
+        self.cache.set_teams(scrim_id, teams)
+        return result
+
+    async def clear_scrim_channels(self, scrim_ids: List[int]) -> bool:
+        def clear(conn: sqlite3.Connection) -> bool:
+            with self._transaction(conn):
+                return bool(conn.executemany("""
+                    UPDATE scrims
+                    SET category_id = NULL,
+                        team1_vc_id = NULL,
+                        team2_vc_id = NULL
+                    WHERE id = ?
+                    """, [(scrim_id,) for scrim_id in scrim_ids]).rowcount)
+
+        result = await self.run(clear)
+        for scrim_id in scrim_ids:
+            self.cache.update_scrim(scrim_id, category_id=None, team1_vc_id=None, team2_vc_id=None)
+        return result
+
+    async def update_player_names(self, names: Dict[int, str], scrim_id: Optional[int] = None) -> int:
+        # Refreshes the stored player_name on rosters that are still in play, plus scrim_id's
+        # (e.g. one that just ended); other finished scrims keep the name the player had then.
+        def update(conn: sqlite3.Connection) -> int:
+            with self._transaction(conn):
+                return conn.executemany("""
+                    UPDATE scrim_players
+                    SET player_name = ?
+                    WHERE player_id = ? AND player_name IS NOT ?
+                      AND (scrim_id = ?
+                           OR (SELECT status FROM scrims WHERE id = scrim_id) IN ('open', 'full', 'active'))
+                    """, [(name, player_id, name, scrim_id) for player_id, name in names.items()]).rowcount
+
+        updated = await self.run(update)
+        self.cache.rename_players(names)
+        return updated
+
+    async def set_guild_config(self, guild_id: int, **fields: Optional[int]) -> Dict:
+        # fields are guild_config columns (waiting_room_vc_id, admin_role_id); omitted ones keep their value.
+        def upsert(conn: sqlite3.Connection) -> Dict:
+            with self._transaction(conn):
+                conn.execute("INSERT OR IGNORE INTO guild_config (guild_id) VALUES (?)", (guild_id,))
+                if fields:
+                    assignments = ", ".join(f"{column} = ?" for column in fields)
+                    conn.execute(f"""
+                        UPDATE guild_config
+                        SET {assignments},
+                            updated_at = ?
+                        WHERE guild_id = ?
+                        """, (*fields.values(), int(time.time()), guild_id))
+                return dict(conn.execute("SELECT * FROM guild_config WHERE guild_id = ?", (guild_id,)).fetchone())
+
+        config = await self.run(upsert)
+        self.guild_configs[guild_id] = config
+        return dict(config)
+
+    async def set_state(self, key: str, value: str):
+        await self.execute_insert("""
+            INSERT INTO bot_state (key, value) VALUES (?, ?)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+            """, (key, value))
+
+    async def adopt_unscoped_rows(self, guild_id: int, **config: Optional[int]) -> int:
+        # Hands scrims, their journal, stats and ratings created before multi-guild support
+        # (guild 0) to guild_id. Only safe when the bot has a single guild, which is every
+        # pre-upgrade deployment. config (guild_config columns, as for set_guild_config) is
+        # what that deployment ran with; the guild starts with it unless it is already set up.
+        def adopt(conn: sqlite3.Connection) -> int:
+            with self._transaction(conn):
+                adopted = conn.execute("UPDATE scrims SET guild_id = ? WHERE guild_id = 0", (guild_id,)).rowcount
+                if adopted and config:
+                    conn.execute(f"""
+                        INSERT OR IGNORE INTO guild_config (guild_id, {", ".join(config)})
+                        VALUES (?, {", ".join("?" * len(config))})
+                        """, (guild_id, *config.values()))
+                conn.execute("UPDATE scrim_events SET guild_id = ? WHERE guild_id = 0", (guild_id,))
+                # A player may already have rows in the guild; their counters are added together.
+                columns = ", ".join(PLAYER_STATS_COLUMNS)
+                totals = ", ".join(f"{column} = {column} + excluded.{column}" for column in PLAYER_STATS_COLUMNS)
+                for table in ('player_stats', 'player_stats_archive'):
+                    conn.execute(f"""
+                        INSERT INTO {table} (guild_id, player_id, {columns}, last_active)
+                        SELECT ?, player_id, {columns}, last_active FROM {table} WHERE guild_id = 0
+                        ON CONFLICT (guild_id, player_id) DO UPDATE
+                        SET {totals},
+                            last_active = COALESCE(MAX(last_active, excluded.last_active), last_active,
+                                                   excluded.last_active)
+                        """, (guild_id,))
+                    conn.execute(f"DELETE FROM {table} WHERE guild_id = 0")
+                # Two ratings can't be combined, so the one backed by more rated games is kept.
+                conn.execute("""
+                    INSERT INTO player_ratings (guild_id, player_id, rating, rated_games, updated_at)
+                    SELECT ?, player_id, rating, rated_games, updated_at FROM player_ratings WHERE guild_id = 0
+                    ON CONFLICT (guild_id, player_id) DO UPDATE
+                    SET rating = excluded.rating,
+                        rated_games = excluded.rated_games,
+                        updated_at = excluded.updated_at
+                    WHERE excluded.rated_games > rated_games
+                    """, (guild_id,))
+                conn.execute("DELETE FROM player_ratings WHERE guild_id = 0")
+                return adopted
+
+        adopted = await self.run(adopt)
+        if adopted:
+            self.guild_configs.pop(guild_id, None)
+            self.cache.clear()
+            self.pages.clear()
+            self.ranks.clear()
+            self.search = ScrimSearchIndex()
+        return adopted
+
+    @staticmethod
+    def _apply_rating_deltas(conn: sqlite3.Connection, guild_id: int, deltas: Dict[int, float]) -> Dict[int, float]:
+        # Must run inside the caller's transaction; returns each player's new rating.
+        now = int(time.time())
+        conn.executemany("INSERT OR IGNORE INTO player_ratings (guild_id, player_id, rating) VALUES (?, ?, ?)",
+                         [(guild_id, player_id, DEFAULT_RATING) for player_id in deltas])
+        conn.executemany("""
+            UPDATE player_ratings
+            SET rating = rating + ?,
+                rated_games = rated_games + 1,
+                updated_at = ?
+            WHERE guild_id = ? AND player_id = ?
+            """, [(delta, now, guild_id, player_id) for player_id, delta in deltas.items()])
+        rows = conn.execute(f"""
+            SELECT player_id, rating FROM player_ratings
+            WHERE guild_id = ? AND player_id IN ({", ".join("?" * len(deltas))})
+            """, (guild_id, *deltas)).fetchall()
+        return {row['player_id']: row['rating'] for row in rows}
 
-    def update_player_team(self, scrim_id: int, player_id: int, team: int) -> bool:
-        return bool(self.execute_insert("""
-            UPDATE scrim_players
-            SET team = ?
-            WHERE (scrim_id = ?) AND (player_id = ?)
-            """, (team, scrim_id, player_id,)))
+    def _update_rank_index(self, guild_id: int, ratings: Dict[int, float]):
+        ranks = self.ranks.get(guild_id)
+        if ranks is not None and ranks.loaded:
+            for player_id, rating in ratings.items():
+                ranks.update(player_id, rating)
+
+    async def record_scrim_result(self,
+                                  scrim_id: int,
+                                  winning_team: int,
+                                  recorded_by: int,
+                                  team1_score: Optional[int] = None,
+                                  team2_score: Optional[int] = None
+                                  ) -> Optional[Dict[int, float]]:
+        # Stores the result and applies the Elo update in one transaction. winning_team 0 is a draw.
+        # Returns each player's rating change, or None if a result already exists or teams were never set.
+        def record(conn: sqlite3.Connection):
+            with self._transaction(conn):
+                if conn.execute("SELECT 1 FROM scrim_results WHERE scrim_id = ?", (scrim_id,)).fetchone():
+                    return None
+                guild_id = self._scrim_guild(conn, scrim_id)
+                rows = conn.execute("""
+                    SELECT sp.player_id, sp.team, COALESCE(pr.rating, ?) AS rating
+                    FROM scrim_players sp
+                    LEFT JOIN player_ratings pr ON pr.guild_id = ? AND pr.player_id = sp.player_id
+                    WHERE sp.scrim_id = ? AND sp.team IN (1, 2)
+                    """, (DEFAULT_RATING, guild_id, scrim_id)).fetchall()
+                team1 = {row['player_id']: row['rating'] for row in rows if row['team'] == 1}
+                team2 = {row['player_id']: row['rating'] for row in rows if row['team'] == 2}
+                if not team1 or not team2:
+                    return None
+
+                conn.execute("""
+                    INSERT INTO scrim_results (scrim_id, winning_team, team1_score, team2_score, recorded_by)
+                    VALUES (?, ?, ?, ?, ?)
+                    """, (scrim_id, winning_team, team1_score, team2_score, recorded_by))
+                deltas = elo_deltas(team1, team2, winning_team)
+                return guild_id, deltas, self._apply_rating_deltas(conn, guild_id, deltas)
+
+        recorded = await self.run(record)
+        if recorded is None:
+            return None
+        guild_id, deltas, ratings = recorded
+        self._update_rank_index(guild_id, ratings)
+        return deltas
 
     # DELETERS
-    def delete_scrim_player(self, scrim_id: int, player_id: int) -> bool:
-        self.update_scrim_player_count(scrim_id, -1)
-        return bool(self.execute_insert("""
-            DELETE FROM scrim_players 
-            WHERE scrim_id = ? AND player_id = ?
-            """, (scrim_id, player_id)))
+    async def delete_old_scrims(self, retention_days: int = RETENTION_DAYS, chunk_size: int = PURGE_CHUNK_SIZE,
+                                guild_id: Optional[int] = None) -> Dict:
+        # Deletes in short chunked transactions so queued joins get the writer between chunks.
+        # scrim_players and scrim_events rows go with their scrim through ON DELETE CASCADE;
+        # the journal rows are first folded into player_stats_archive so replay keeps counting them.
+        # Every guild's scrims unless guild_id is given.
+        cutoff = int(time.time()) - retention_days * 24 * 60 * 60
+        in_guild = "AND guild_id = ?" if guild_id is not None else ""
+        params = (cutoff, guild_id) if guild_id is not None else (cutoff,)
 
-    def delete_old_scrims(self) -> int:
-        count_result = self.execute_query("""
-            SELECT COUNT(*) as count FROM scrims
-            WHERE datetime(created_at) < datetime('now', '-30 days')
-            """)
+        def delete_chunk(conn: sqlite3.Connection):
+            start = time.perf_counter()
+            with self._transaction(conn):
+                # Counted up front: the cascade also removes results and journal rows.
+                scrim_ids = [row['id'] for row in conn.execute(f"""
+                    SELECT id FROM scrims WHERE created_at < ? {in_guild} LIMIT ?
+                    """, (*params, chunk_size))]
+                marks = ", ".join("?" * len(scrim_ids))
+                players = conn.execute(f"SELECT COUNT(*) FROM scrim_players WHERE scrim_id IN ({marks})",
+                                       scrim_ids).fetchone()[0]
+                self._archive_events(conn, scrim_ids)
+                scrims = conn.execute(f"DELETE FROM scrims WHERE id IN ({marks})", scrim_ids).rowcount
+            return scrims, players, time.perf_counter() - start
+
+        stats = {'scrims': 0, 'players': 0, 'chunks': 0, 'longest_lock': 0.0}
+        start = time.perf_counter()
+        while True:
+            scrims, players, held = await self.run(delete_chunk)
+            stats['scrims'] += scrims
+            stats['players'] += players
+            stats['chunks'] += 1
+            stats['longest_lock'] = max(stats['longest_lock'], held)
+            if scrims < chunk_size:
+                break
+            await asyncio.sleep(PURGE_CHUNK_PAUSE)
+        stats['elapsed'] = time.perf_counter() - start
+
+        if stats['scrims']:
+            self.cache.clear()
+            self.pages.clear()
+            self.search = ScrimSearchIndex()
+        return stats
+
+    async def optimize(self, vacuum_pages: int = VACUUM_CHUNK_PAGES) -> Dict:
+        def vacuum_chunk(conn: sqlite3.Connection) -> int:
+            # execute() only steps the pragma once (one page); executescript runs it to completion.
+            conn.executescript(f"PRAGMA incremental_vacuum({int(vacuum_pages)})")
+            return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+        start = time.perf_counter()
+        free_pages = await self.run(lambda conn: conn.execute("PRAGMA freelist_count").fetchone()[0])
+        reclaimed = free_pages
+        while free_pages:
+            remaining = await self.run(vacuum_chunk)
+            if remaining >= free_pages:
+                break
+            free_pages = remaining
+            await asyncio.sleep(PURGE_CHUNK_PAUSE)
+        await self.run(lambda conn: conn.execute("PRAGMA optimize"))
+
+        return {'pages_reclaimed': reclaimed - free_pages, 'elapsed': time.perf_counter() - start}
+
+    @staticmethod
+    def _fold_events(events: Iterable[sqlite3.Row], stats: Dict[Tuple[int, int], Dict[str, int]]):
+        # Applies journal events in id order the way the live write paths bump player_stats,
+        # into stats keyed by (guild_id, player_id). Callers pass every event of the scrims they
+        # cover, so rosters can be rebuilt from the events alone.
+        rosters: Dict[int, Set[int]] = {}
+
+        def bump(guild_id: int, player_id: int, created_at: int, **deltas: int):
+            row = stats.setdefault((guild_id, player_id), dict.fromkeys(PLAYER_STATS_COLUMNS, 0))
+            for column, delta in deltas.items():
+                row[column] += delta
+            row['last_active'] = max(row.get('last_active') or 0, created_at)
+
+        for event in events:
+            scrim_id, guild_id = event['scrim_id'], event['guild_id']
+            player_id, created_at = event['player_id'], event['created_at']
+            if event['event'] == 'joined':
+                rosters.setdefault(scrim_id, set()).add(player_id)
+                bump(guild_id, player_id, created_at, scrims_joined=1)
+            elif event['event'] == 'left':
+                rosters.get(scrim_id, set()).discard(player_id)
+                bump(guild_id, player_id, created_at, scrims_joined=-1)
+            elif event['event'] == 'team_assigned' and event['team'] in (1, 2):
+                bump(guild_id, player_id, created_at, scrims_played=1, **{f"team{event['team']}_count": 1})
+            elif event['event'] in ('ended', 'cancelled'):
+                column = 'scrims_completed' if event['event'] == 'ended' else 'scrims_cancelled'
+                for roster_player_id in rosters.pop(scrim_id, ()):
+                    bump(guild_id, roster_player_id, created_at, **{column: 1})
 
-        delete_count = count_result[0]['count'] if count_result else 0
+    @classmethod
+    def _archive_events(cls, conn: sqlite3.Connection, scrim_ids: List[int]):
+        # Must run inside the purge transaction, before the scrims (and by cascade their journal
+        # rows) are deleted: adds what those rows contribute to player_stats to the archive.
+        stats: Dict[Tuple[int, int], Dict[str, int]] = {}
+        cls._fold_events(conn.execute(f"""
+            SELECT scrim_id, guild_id, event, player_id, team, created_at FROM scrim_events
+            WHERE scrim_id IN ({", ".join("?" * len(scrim_ids))}) ORDER BY id
+            """, scrim_ids), stats)
+        conn.executemany("INSERT OR IGNORE INTO player_stats_archive (guild_id, player_id) VALUES (?, ?)",
+                         list(stats))
+        conn.executemany(f"""
+            UPDATE player_stats_archive
+            SET {", ".join(f"{column} = {column} + ?" for column in PLAYER_STATS_COLUMNS)},
+                last_active = MAX(COALESCE(last_active, 0), ?)
+            WHERE guild_id = ? AND player_id = ?
+            """, [(*(row[column] for column in PLAYER_STATS_COLUMNS), row['last_active'], *key)
+                  for key, row in stats.items()])
 
-        self.execute_insert("""
-                    DELETE FROM scrims
-                    WHERE datetime(created_at) < datetime('now', '-30 days')
-                    """)
+    @classmethod
+    def _replay_player_stats(cls, conn: sqlite3.Connection, guild_id: int) -> int:
+        # Starts from the totals archived when old scrims were purged, applies the guild's
+        # journal on top, then swaps the result in. Runs inside one write transaction, so no
+        # event can land between the scan and the swap.
+        columns = (*PLAYER_STATS_COLUMNS, 'last_active')
+        stats = {(guild_id, row['player_id']): {column: row[column] for column in columns}
+                 for row in conn.execute(f"""
+                     SELECT player_id, {", ".join(columns)} FROM player_stats_archive WHERE guild_id = ?
+                     """, (guild_id,))}
+        cls._fold_events(conn.execute("""
+            SELECT scrim_id, guild_id, event, player_id, team, created_at FROM scrim_events
+            WHERE guild_id = ? ORDER BY id
+            """, (guild_id,)), stats)
 
-        self.execute_insert("""
+        conn.execute("DELETE FROM player_stats WHERE guild_id = ?", (guild_id,))
+        conn.executemany(f"""
+            INSERT INTO player_stats (guild_id, player_id, {", ".join(columns)})
+            VALUES (?, ?, {", ".join("?" * len(columns))})
+            """, [(*key, *(row[column] for column in columns)) for key, row in stats.items()])
+        return len(stats)
+
+    async def replay_player_stats(self, guild_id: int) -> int:
+        # Rebuilds a guild's player_stats from scrim_events; returns how many players it wrote.
+        return await self.write(self._replay_player_stats, guild_id)
+
+    # ATOMIC ROSTER CHANGES
+    # Each runs through write() - its own savepoint inside a group-committed transaction - and
+    # is journalled next to the roster change. Returns a dict with a 'result' key
+    # ('joined', 'left', 'not_found', 'closed', 'already_joined', 'not_joined' or 'full')
+    # alongside the scrim's player_count, max_players and status after the change.
+    # A scrim belonging to another guild is reported as 'not_found'.
+    @classmethod
+    def _join_scrim(cls, conn: sqlite3.Connection, scrim_id: int, player_id: int, player_name: str,
+                    guild_id: Optional[int]) -> Dict:
+        row = conn.execute("""
+            SELECT guild_id, status, player_count, max_players FROM scrims WHERE id = ?
+            """, (scrim_id,)).fetchone()
+        if not cls._in_guild(row and row['guild_id'], guild_id):
+            return {'result': 'not_found'}
+
+        outcome = dict(row)
+        if row['status'] in ('completed', 'active', 'cancelled'):
+            outcome['result'] = 'closed'
+            return outcome
+        if conn.execute("""
+            SELECT 1 FROM scrim_players WHERE (scrim_id = ?) AND (player_id = ?)
+            """, (scrim_id, player_id)).fetchone():
+            outcome['result'] = 'already_joined'
+            return outcome
+        if row['status'] == 'full' or row['player_count'] >= row['max_players']:
+            outcome['result'] = 'full'
+            return outcome
+
+        conn.execute("""
+            INSERT INTO scrim_players (scrim_id, player_id, player_name)
+            VALUES (?, ?, ?)
+            """, (scrim_id, player_id, player_name))
+        player_count = row['player_count'] + 1
+        status = 'full' if player_count >= row['max_players'] else row['status']
+        conn.execute("""
+            UPDATE scrims
+            SET player_count = ?,
+                status = ?
+            WHERE id = ?
+            """, (player_count, status, scrim_id))
+        cls._record_player_stats(conn, row['guild_id'], [player_id], scrims_joined=1)
+        cls._append_events(conn, scrim_id, row['guild_id'], 'joined', [(player_id, None)])
+
+        outcome.update(result='joined', player_count=player_count, status=status)
+        return outcome
+
+    @classmethod
+    def _leave_scrim(cls, conn: sqlite3.Connection, scrim_id: int, player_id: int, guild_id: Optional[int]) -> Dict:
+        row = conn.execute("""
+            SELECT guild_id, status, player_count, max_players FROM scrims WHERE id = ?
+            """, (scrim_id,)).fetchone()
+        if not cls._in_guild(row and row['guild_id'], guild_id):
+            return {'result': 'not_found'}
+
+        outcome = dict(row)
+        # Started and finished rosters back results, ratings and history, so they're frozen.
+        if row['status'] not in ('open', 'full'):
+            outcome['result'] = 'closed'
+            return outcome
+        if not conn.execute("""
             DELETE FROM scrim_players
-            WHERE scrim_id NOT IN (SELECT id FROM scrims)
-            """)
+            WHERE scrim_id = ? AND player_id = ?
+            """, (scrim_id, player_id)).rowcount:
+            outcome['result'] = 'not_joined'
+            return outcome
 
-        return delete_count
+        player_count = row['player_count'] - 1
+        status = 'open' if row['status'] == 'full' else row['status']
+        conn.execute("""
+            UPDATE scrims
+            SET player_count = ?,
+                status = ?
+            WHERE id = ?
+            """, (player_count, status, scrim_id))
+        cls._record_player_stats(conn, row['guild_id'], [player_id], scrims_joined=-1)
+        cls._append_events(conn, scrim_id, row['guild_id'], 'left', [(player_id, None)])
+
+        outcome.update(result='left', player_count=player_count, status=status)
+        return outcome
+
+    async def join_scrim_atomic(self, scrim_id: int, player: discord.User, guild_id: Optional[int] = None) -> Dict:
+        outcome = await self.write(self._join_scrim, scrim_id, player.id, player.name, guild_id)
+        if outcome['result'] == 'joined':
+            self.cache.update_scrim(scrim_id, player_count=outcome['player_count'], status=outcome['status'])
+            self.search.update(scrim_id, player_count=outcome['player_count'], status=outcome['status'])
+            self.cache.add_player(scrim_id, ScrimPlayer(scrim_id, player.id, player.name, None, int(time.time())))
+        return outcome
+
+    async def leave_scrim_atomic(self, scrim_id: int, player_id: int, guild_id: Optional[int] = None) -> Dict:
+        outcome = await self.write(self._leave_scrim, scrim_id, player_id, guild_id)
+        if outcome['result'] == 'left':
+            self.cache.update_scrim(scrim_id, player_count=outcome['player_count'], status=outcome['status'])
+            self.search.update(scrim_id, player_count=outcome['player_count'], status=outcome['status'])
+            self.cache.remove_player(scrim_id, player_id)
+        return outcome
 
     # GETTERS
-    def get_scrim_by_id(self, scrim_id: int) -> Optional[Dict]:
-        result = self.execute_query("SELECT * FROM scrims WHERE id = ?", (scrim_id,))
+    # get_scrim_by_id, get_scrim_players and is_user_in_scrim are served from self.cache
+    # for active scrims; only misses reach SQLite.
+    @staticmethod
+    def _load_scrim(conn: sqlite3.Connection, scrim_id: int, with_players: bool):
+        scrim = conn.execute(f"SELECT {SCRIM_COLUMNS} FROM scrims WHERE id = ?", (scrim_id,)).fetchone()
+        if scrim is None:
+            return None, []
+        if not with_players:
+            return Scrim.from_row(scrim), None
+        players = conn.execute(f"""
+            SELECT {SCRIM_PLAYER_COLUMNS} FROM scrim_players WHERE (scrim_id = ?)
+            """, (scrim_id,)).fetchall()
+        return Scrim.from_row(scrim), [ScrimPlayer.from_row(player) for player in players]
+
+    async def get_scrim_by_id(self, scrim_id: int, guild_id: Optional[int] = None) -> Optional[Scrim]:
+        scrim = self.cache.get_scrim(scrim_id)
+        if scrim is None:
+            scrim, _ = await self.run(self._load_scrim, scrim_id, False)
+            if scrim is not None:
+                self.cache.put_scrim(scrim)
+        return scrim if self._in_guild(scrim and scrim.guild_id, guild_id) else None
+
+    async def get_active_scrims(self, guild_id: int) -> List[Scrim]:
+        return await self.execute_query(f"""
+            SELECT {SCRIM_COLUMNS} FROM scrims WHERE guild_id = ? AND status IN ('open', 'full', 'active')
+            """, (guild_id,), Scrim.from_row)
+
+    def iter_scrims(self, guild_id: int) -> AsyncIterator[Scrim]:
+        # Every scrim of a guild, oldest first, streamed for exports.
+        return self.iter_query(f"SELECT {SCRIM_COLUMNS} FROM scrims WHERE guild_id = ? ORDER BY id",
+                               (guild_id,), Scrim.from_row)
+
+    async def get_active_scrims_page(self,
+                                     guild_id: int,
+                                     after_id: int = 0,
+                                     before_id: Optional[int] = None,
+                                     limit: int = SCRIMS_PER_PAGE
+                                     ) -> Tuple[List[Scrim], bool]:
+        # Keyset pagination over idx_scrims_active: returns up to `limit` active scrims in id order
+        # after `after_id` (or before `before_id`), plus whether more exist in that direction.
+        key = (guild_id, after_id, before_id, limit)
+        page = self.pages.get(key)
+        if page is not None:
+            return page
+
+        if before_id is None:
+            rows = await self.execute_query(f"""
+                SELECT {SCRIM_COLUMNS} FROM scrims INDEXED BY idx_scrims_active
+                WHERE guild_id = ? AND status IN ('open', 'full', 'active') AND id > ?
+                ORDER BY id LIMIT ?
+                """, (guild_id, after_id, limit + 1), Scrim.from_row)
+        else:
+            rows = await self.execute_query(f"""
+                SELECT {SCRIM_COLUMNS} FROM scrims INDEXED BY idx_scrims_active
+                WHERE guild_id = ? AND status IN ('open', 'full', 'active') AND id < ?
+                ORDER BY id DESC LIMIT ?
+                """, (guild_id, before_id, limit + 1), Scrim.from_row)
+            rows.reverse()
+
+        has_more = len(rows) > limit
+        if has_more:
+            rows = rows[:limit] if before_id is None else rows[1:]
+
+        page = (rows, has_more)
+        self.pages.put(key, page)
+        return page
+
+    async def get_scrim_players(self, scrim_id: int) -> List[ScrimPlayer]:
+        players = self.cache.get_roster(scrim_id)
+        if players is None:
+            scrim, players = await self.run(self._load_scrim, scrim_id, True)
+            if scrim is not None:
+                self.cache.put_scrim(scrim, players)
+        return players
+
+    async def get_player_stats(self, guild_id: int, player_id: int) -> Optional[Dict]:
+        result = await self.execute_query("SELECT * FROM player_stats WHERE guild_id = ? AND player_id = ?",
+                                          (guild_id, player_id))
         return result[0] if result else None
 
-    def get_scrim_player_count(self, scrim_id: int) -> int:
-        return self.get_scrim_by_id(scrim_id)['player_count']
+    async def get_player_history(self,
+                                 guild_id: int,
+                                 player_id: int,
+                                 before_scrim_id: Optional[int] = None,
+                                 limit: int = HISTORY_PAGE_SIZE
+                                 ) -> List[Dict]:
+        # Newest first, keyset-paginated on scrim id via idx_scrim_players_player_id.
+        return await self.execute_query("""
+            SELECT sp.scrim_id, sp.team, sp.joined_at, s.title, s.game_mode, s.status, s.scheduled_time
+            FROM scrim_players sp
+            JOIN scrims s ON s.id = sp.scrim_id
+            WHERE sp.player_id = ? AND sp.scrim_id < ? AND s.guild_id = ?
+            ORDER BY sp.scrim_id DESC
+            LIMIT ?
+            """, (player_id, before_scrim_id if before_scrim_id is not None else 2 ** 63 - 1, guild_id, limit))
 
-    def get_active_scrims(self) -> List[Dict]:
-        return self.execute_query("""
-            SELECT * FROM scrims WHERE status IN ('open', 'full', 'active')
-            """)
+    async def get_player_ratings(self, guild_id: int, player_ids: List[int]) -> Dict[int, float]:
+        ratings = dict.fromkeys(player_ids, DEFAULT_RATING)
+        if player_ids:
+            rows = await self.execute_query(f"""
+                SELECT player_id, rating FROM player_ratings
+                WHERE guild_id = ? AND player_id IN ({", ".join("?" * len(player_ids))})
+                """, (guild_id, *player_ids))
+            ratings.update((row['player_id'], row['rating']) for row in rows)
+        return ratings
+
+    async def _ensure_rank_index(self, guild_id: int) -> RankIndex:
+        ranks = self.ranks.setdefault(guild_id, RankIndex())
+        if not ranks.loaded:
+            rows = await self.execute_query("SELECT player_id, rating FROM player_ratings WHERE guild_id = ?",
+                                            (guild_id,))
+            if not ranks.loaded:
+                ranks.load((row['player_id'], row['rating']) for row in rows)
+        return ranks
+
+    async def get_leaderboard(self, guild_id: int, limit: int = LEADERBOARD_SIZE,
+                              offset: int = 0) -> List[Tuple[int, float]]:
+        return (await self._ensure_rank_index(guild_id)).top(limit, offset)
+
+    async def get_player_rank(self, guild_id: int, player_id: int) -> Optional[Tuple[int, float]]:
+        ranks = await self._ensure_rank_index(guild_id)
+        rank = ranks.rank(player_id)
+        return (rank, ranks.rating(player_id)) if rank else None
+
+    async def search_scrims(self,
+                            guild_id: int,
+                            text: str,
+                            predicate: Callable[[Scrim], bool] = lambda scrim: True,
+                            limit: int = AUTOCOMPLETE_LIMIT
+                            ) -> List[Scrim]:
+        # Autocomplete lookups: only the first call after startup (or a purge) touches SQLite.
+        if not self.search.loaded:
+            search = self.search
+
+            # Loaded on the DB thread so no write can land between the snapshot and the load.
+            def load(conn: sqlite3.Connection):
+                if not search.loaded:
+                    search.load(Scrim.from_row(row) for row in conn.execute(f"""
+                        SELECT {SCRIM_COLUMNS} FROM scrims WHERE status IN ('open', 'full', 'active')
+                        """).fetchall())
 
-    def get_scrim_players(self, scrim_id: int) -> List[Dict]:
-        return self.execute_query("""
-                SELECT * FROM scrim_players WHERE (scrim_id = ?)
-                """, (scrim_id,))
+            await self.run(load)
+        return self.search.search(guild_id, text, predicate, limit)
 
-    def get_scrims_by_user(self, user_id: int) -> List[Dict]:
-        return self.execute_query("""
-            SELECT * FROM scrim_players WHERE player_id = ?
-            """, (user_id,))
+    async def get_guild_config(self, guild_id: int) -> Dict:
+        # One small row per guild, read on nearly every admin command, so it is cached for the
+        # process lifetime; set_guild_config is the only writer and keeps the cache current.
+        config = self.guild_configs.get(guild_id)
+        if config is None:
+            rows = await self.execute_query("SELECT * FROM guild_config WHERE guild_id = ?", (guild_id,))
+            config = rows[0] if rows else {'guild_id': guild_id, 'waiting_room_vc_id': None, 'admin_role_id': None}
+            self.guild_configs[guild_id] = config
+        return dict(config)
+
+    async def get_state(self, key: str) -> Optional[str]:
+        rows = await self.execute_query("SELECT value FROM bot_state WHERE key = ?", (key,))
+        return rows[0]['value'] if rows else None
+
+    async def get_upcoming_scrims(self, after: int) -> List[Dict]:
+        return await self.execute_query("""
+            SELECT id, guild_id, scheduled_time FROM scrims
+            WHERE scheduled_time > ? AND status IN ('open', 'full')
+            """, (after,))
+
+    async def get_joinable_rosters(self) -> List[Dict]:
+        return await self.execute_query("""
+            SELECT sp.scrim_id, s.guild_id, sp.player_id
+            FROM scrims s
+            JOIN scrim_players sp ON sp.scrim_id = s.id
+            WHERE s.status IN ('open', 'full')
+            """)
+
+    async def get_channel_scrims(self) -> List[Scrim]:
+        return await self.execute_query(f"""
+            SELECT {SCRIM_COLUMNS} FROM scrims
+            WHERE category_id IS NOT NULL OR team1_vc_id IS NOT NULL OR team2_vc_id IS NOT NULL
+            """, (), Scrim.from_row)
 
     # VALIDATORS
-    def is_user_in_scrim(self, scrim_id: int, user_id: int) -> bool:
-        return bool(self.execute_query("""
+    async def is_user_in_scrim(self, scrim_id: int, user_id: int) -> bool:
+        players = self.cache.get_roster(scrim_id)
+        if players is not None:
+            return any(player.player_id == user_id for player in players)
+        return bool(await self.execute_query("""
         SELECT * FROM scrim_players WHERE (scrim_id = ?) AND (player_id = ?)
         """, (scrim_id, user_id)))
+
@@ -0,0 +1,90 @@
+"""Streams scrim history (scrims joined with their rosters) to CSV or NDJSON.
+
+Usage: python -m database.export [--db scrim_bot.db] [--guild ID] [--format csv|ndjson] [--gzip] OUTPUT
+"""
+import argparse
+import csv
+import gzip
+import json
+import sqlite3
+import sys
+import time
+from typing import Dict, Optional
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_BATCH_SIZE = 1000
+# zlib's own default; gzip.open's level 9 is about twice as slow for a few percent smaller files.
+EXPORT_GZIP_LEVEL = 6
+# json.dumps() with any keyword argument builds a new encoder on every call.
+_encode_json = json.JSONEncoder(ensure_ascii=False).encode
+# One row per scrim player; scrims nobody joined still get a row with empty player columns.
+# Scans scrims in rowid order and probes the roster by (scrim_id, player_id), so rows stream
+# straight off the b-trees with no sort, whatever the table size.
+EXPORT_QUERY = """
+    SELECT s.id AS scrim_id, s.guild_id, s.title, s.game_mode, s.status, s.max_players, s.scheduled_time,
+           s.creator_id, s.created_at, sp.player_id, sp.player_name, sp.team, sp.joined_at
+    FROM scrims s
+    LEFT JOIN scrim_players sp ON sp.scrim_id = s.id
+    {where}
+    ORDER BY s.id
+    """
+
+
+def export_extension(fmt: str, compress: bool) -> str:
+    return f".{fmt}.gz" if compress else f".{fmt}"
+
+
+def stream_history(db_path: str, path: str, guild_id: Optional[int] = None, fmt: str = 'csv',
+                   compress: bool = False, batch_size: int = EXPORT_BATCH_SIZE) -> Dict:
+    # Blocking: call it from a worker thread (Database.export_history) or the CLI. Reads through
+    # its own read-only connection, so the export sees one WAL snapshot, never queues behind the
+    # bot's DB thread, and holds at most one batch of rows in memory.
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    query = EXPORT_QUERY.format(where="WHERE s.guild_id = ?" if guild_id is not None else "")
+    params = (guild_id,) if guild_id is not None else ()
+
+    start = time.perf_counter()
+    rows = 0
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        if compress:
+            out = gzip.open(path, 'wt', compresslevel=EXPORT_GZIP_LEVEL, encoding='utf-8', newline='')
+        else:
+            out = open(path, 'w', encoding='utf-8', newline='')
+        with out:
+            cursor = conn.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            if fmt == 'csv':
+                writer = csv.writer(out)
+                writer.writerow(columns)
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                if fmt == 'csv':
+                    writer.writerows(batch)
+                else:
+                    out.write("".join(_encode_json(dict(zip(columns, row))) + "\n" for row in batch))
+                rows += len(batch)
+    finally:
+        conn.close()
+    return {'rows': rows, 'elapsed': time.perf_counter() - start}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m database.export", description=__doc__.splitlines()[0])
+    parser.add_argument("output", help="file to write; '.gz' is not added automatically")
+    parser.add_argument("--db", default="scrim_bot.db", help="database file (default: scrim_bot.db)")
+    parser.add_argument("--guild", type=int, help="only export this guild's scrims")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default='csv')
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the output")
+    args = parser.parse_args(argv)
+
+    stats = stream_history(args.db, args.output, args.guild, args.format, args.gzip)
+    print(f"Exported {stats['rows']} rows to {args.output} in {stats['elapsed']:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
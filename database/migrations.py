@@ -0,0 +1,314 @@
+import sqlite3
+from typing import List, Tuple
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Each entry upgrades the schema by one version; PRAGMA user_version records how many
+# have been applied. Only ever append here - never edit a migration that has shipped.
+MIGRATIONS: List[Tuple[str, ...]] = [
+    # 1: original schema
+    (
+        """
+        CREATE TABLE IF NOT EXISTS scrims (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            game_mode TEXT NOT NULL,
+            max_players INTEGER NOT NULL,
+            scheduled_time TEXT NOT NULL,
+            creator_id INTEGER NOT NULL,
+            player_count INTEGER DEFAULT 0,
+            team1_vc_id INTEGER,
+            team2_vc_id INTEGER,
+            category_id INTEGER,
+            status TEXT DEFAULT 'open',
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS scrim_players (
+            scrim_id INTEGER,
+            player_id INTEGER,
+            player_name TEXT,
+            team INTEGER,
+            joined_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (scrim_id, player_id)
+        )
+        """,
+    ),
+    # 2: integer epoch timestamps, cascading roster deletes and indexes for the hot queries
+    (
+        """
+        CREATE TABLE scrims_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            game_mode TEXT NOT NULL,
+            max_players INTEGER NOT NULL,
+            scheduled_time INTEGER NOT NULL,
+            creator_id INTEGER NOT NULL,
+            player_count INTEGER DEFAULT 0,
+            team1_vc_id INTEGER,
+            team2_vc_id INTEGER,
+            category_id INTEGER,
+            status TEXT DEFAULT 'open',
+            created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+        """,
+        # scheduled_time was stored as the creator's local wall-clock time, created_at as UTC.
+        """
+        INSERT INTO scrims_new (id, title, game_mode, max_players, scheduled_time, creator_id, player_count,
+                                team1_vc_id, team2_vc_id, category_id, status, created_at)
+        SELECT id, title, game_mode, max_players,
+               CAST(strftime('%s', scheduled_time, 'utc') AS INTEGER),
+               creator_id, player_count, team1_vc_id, team2_vc_id, category_id, status,
+               COALESCE(CAST(strftime('%s', created_at) AS INTEGER), CAST(strftime('%s', 'now') AS INTEGER))
+        FROM scrims
+        """,
+        """
+        UPDATE sqlite_sequence
+        SET seq = MAX(seq, COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'scrims'), 0))
+        WHERE name = 'scrims_new'
+        """,
+        "DROP TABLE scrims",
+        "ALTER TABLE scrims_new RENAME TO scrims",
+        """
+        CREATE TABLE scrim_players_new (
+            scrim_id INTEGER NOT NULL REFERENCES scrims (id) ON DELETE CASCADE,
+            player_id INTEGER NOT NULL,
+            player_name TEXT,
+            team INTEGER,
+            joined_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            PRIMARY KEY (scrim_id, player_id)
+        )
+        """,
+        """
+        INSERT INTO scrim_players_new (scrim_id, player_id, player_name, team, joined_at)
+        SELECT scrim_id, player_id, player_name, team,
+               COALESCE(CAST(strftime('%s', joined_at) AS INTEGER), CAST(strftime('%s', 'now') AS INTEGER))
+        FROM scrim_players
+        WHERE scrim_id IN (SELECT id FROM scrims)
+        """,
+        "DROP TABLE scrim_players",
+        "ALTER TABLE scrim_players_new RENAME TO scrim_players",
+        "CREATE INDEX idx_scrim_players_player_id ON scrim_players (player_id)",
+        "CREATE INDEX idx_scrims_status ON scrims (status)",
+        "CREATE INDEX idx_scrims_created_at ON scrims (created_at)",
+        "CREATE INDEX idx_scrims_scheduled_time ON scrims (scheduled_time)",
+    ),
+    # 3: lets the channel reconciler find scrims that still own Discord channels without a scan
+    (
+        """
+        CREATE INDEX idx_scrims_channels ON scrims (status)
+        WHERE category_id IS NOT NULL OR team1_vc_id IS NOT NULL OR team2_vc_id IS NOT NULL
+        """,
+    ),
+    # 4: id-ordered index over active scrims only, for keyset pagination in /list_scrims
+    (
+        "CREATE INDEX idx_scrims_active ON scrims (id) WHERE status IN ('open', 'full', 'active')",
+    ),
+    # 5: per-player aggregates maintained on every roster change, backfilled from existing rows,
+    #    and a (player_id, scrim_id) index so history pages come straight off the index
+    (
+        """
+        CREATE TABLE player_stats (
+            player_id INTEGER PRIMARY KEY,
+            scrims_joined INTEGER NOT NULL DEFAULT 0,
+            scrims_played INTEGER NOT NULL DEFAULT 0,
+            scrims_completed INTEGER NOT NULL DEFAULT 0,
+            scrims_cancelled INTEGER NOT NULL DEFAULT 0,
+            team1_count INTEGER NOT NULL DEFAULT 0,
+            team2_count INTEGER NOT NULL DEFAULT 0,
+            last_active INTEGER
+        )
+        """,
+        """
+        INSERT INTO player_stats (player_id, scrims_joined, scrims_played, scrims_completed, scrims_cancelled,
+                                  team1_count, team2_count, last_active)
+        SELECT sp.player_id, COUNT(*), SUM(sp.team IS NOT NULL), SUM(s.status = 'completed'),
+               SUM(s.status = 'cancelled'), SUM(sp.team IS 1), SUM(sp.team IS 2), MAX(sp.joined_at)
+        FROM scrim_players sp
+        JOIN scrims s ON s.id = sp.scrim_id
+        GROUP BY sp.player_id
+        """,
+        "DROP INDEX idx_scrim_players_player_id",
+        "CREATE INDEX idx_scrim_players_player_id ON scrim_players (player_id, scrim_id)",
+    ),
+    # 6: skill ratings used to balance teams
+    (
+        """
+        CREATE TABLE player_ratings (
+            player_id INTEGER PRIMARY KEY,
+            rating REAL NOT NULL DEFAULT 1000,
+            rated_games INTEGER NOT NULL DEFAULT 0,
+            updated_at INTEGER
+        )
+        """,
+    ),
+    # 7: recorded match results; the rating index keeps the leaderboard load an ordered read
+    (
+        """
+        CREATE TABLE scrim_results (
+            scrim_id INTEGER PRIMARY KEY REFERENCES scrims (id) ON DELETE CASCADE,
+            winning_team INTEGER NOT NULL,
+            team1_score INTEGER,
+            team2_score INTEGER,
+            recorded_by INTEGER NOT NULL,
+            recorded_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+        """,
+        "CREATE INDEX idx_player_ratings_rating ON player_ratings (rating DESC)",
+    ),
+    # 8: multi-guild - every scrim, stat and rating belongs to a guild, plus per-guild config.
+    #    Rows that predate this get guild 0 until Database.adopt_unscoped_rows claims them.
+    (
+        "ALTER TABLE scrims ADD COLUMN guild_id INTEGER NOT NULL DEFAULT 0",
+        "DROP INDEX idx_scrims_active",
+        "CREATE INDEX idx_scrims_active ON scrims (guild_id, id) WHERE status IN ('open', 'full', 'active')",
+        """
+        CREATE TABLE player_stats_new (
+            guild_id INTEGER NOT NULL DEFAULT 0,
+            player_id INTEGER NOT NULL,
+            scrims_joined INTEGER NOT NULL DEFAULT 0,
+            scrims_played INTEGER NOT NULL DEFAULT 0,
+            scrims_completed INTEGER NOT NULL DEFAULT 0,
+            scrims_cancelled INTEGER NOT NULL DEFAULT 0,
+            team1_count INTEGER NOT NULL DEFAULT 0,
+            team2_count INTEGER NOT NULL DEFAULT 0,
+            last_active INTEGER,
+            PRIMARY KEY (guild_id, player_id)
+        )
+        """,
+        """
+        INSERT INTO player_stats_new (player_id, scrims_joined, scrims_played, scrims_completed, scrims_cancelled,
+                                      team1_count, team2_count, last_active)
+        SELECT player_id, scrims_joined, scrims_played, scrims_completed, scrims_cancelled,
+               team1_count, team2_count, last_active
+        FROM player_stats
+        """,
+        "DROP TABLE player_stats",
+        "ALTER TABLE player_stats_new RENAME TO player_stats",
+        """
+        CREATE TABLE player_ratings_new (
+            guild_id INTEGER NOT NULL DEFAULT 0,
+            player_id INTEGER NOT NULL,
+            rating REAL NOT NULL DEFAULT 1000,
+            rated_games INTEGER NOT NULL DEFAULT 0,
+            updated_at INTEGER,
+            PRIMARY KEY (guild_id, player_id)
+        )
+        """,
+        """
+        INSERT INTO player_ratings_new (player_id, rating, rated_games, updated_at)
+        SELECT player_id, rating, rated_games, updated_at FROM player_ratings
+        """,
+        "DROP TABLE player_ratings",
+        "ALTER TABLE player_ratings_new RENAME TO player_ratings",
+        "CREATE INDEX idx_player_ratings_rating ON player_ratings (guild_id, rating DESC)",
+        """
+        CREATE TABLE guild_config (
+            guild_id INTEGER PRIMARY KEY,
+            waiting_room_vc_id INTEGER,
+            admin_role_id INTEGER,
+            updated_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+        """,
+    ),
+    # 9: small key/value store for process state that must survive restarts (e.g. the command tree hash)
+    (
+        """
+        CREATE TABLE bot_state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+        """,
+    ),
+    # 10: append-only journal of roster and lifecycle events (joined, left, team_assigned,
+    #     started, ended, cancelled), backfilled from the rosters and statuses already stored,
+    #     plus per-player totals of the journal rows the retention job purges with their
+    #     scrims, so replay_player_stats can start from them and still rebuild lifetime stats
+    (
+        """
+        CREATE TABLE scrim_events (
+            id INTEGER PRIMARY KEY,
+            scrim_id INTEGER NOT NULL REFERENCES scrims (id) ON DELETE CASCADE,
+            guild_id INTEGER NOT NULL,
+            event TEXT NOT NULL,
+            player_id INTEGER,
+            team INTEGER,
+            created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+        """,
+        "CREATE INDEX idx_scrim_events_scrim ON scrim_events (scrim_id, id)",
+        "CREATE INDEX idx_scrim_events_guild ON scrim_events (guild_id, id)",
+        """
+        INSERT INTO scrim_events (scrim_id, guild_id, event, player_id, created_at)
+        SELECT sp.scrim_id, s.guild_id, 'joined', sp.player_id, sp.joined_at
+        FROM scrim_players sp JOIN scrims s ON s.id = sp.scrim_id
+        ORDER BY sp.joined_at, sp.scrim_id
+        """,
+        """
+        INSERT INTO scrim_events (scrim_id, guild_id, event, player_id, team, created_at)
+        SELECT sp.scrim_id, s.guild_id, 'team_assigned', sp.player_id, sp.team, sp.joined_at
+        FROM scrim_players sp JOIN scrims s ON s.id = sp.scrim_id
+        WHERE sp.team IS NOT NULL
+        ORDER BY sp.scrim_id
+        """,
+        """
+        INSERT INTO scrim_events (scrim_id, guild_id, event, created_at)
+        SELECT s.id, s.guild_id,
+               CASE s.status WHEN 'active' THEN 'started' WHEN 'completed' THEN 'ended' ELSE 'cancelled' END,
+               COALESCE((SELECT MAX(joined_at) FROM scrim_players WHERE scrim_id = s.id), s.created_at)
+        FROM scrims s
+        WHERE s.status IN ('active', 'completed', 'cancelled')
+        ORDER BY s.id
+        """,
+        """
+        CREATE TABLE player_stats_archive (
+            guild_id INTEGER NOT NULL,
+            player_id INTEGER NOT NULL,
+            scrims_joined INTEGER NOT NULL DEFAULT 0,
+            scrims_played INTEGER NOT NULL DEFAULT 0,
+            scrims_completed INTEGER NOT NULL DEFAULT 0,
+            scrims_cancelled INTEGER NOT NULL DEFAULT 0,
+            team1_count INTEGER NOT NULL DEFAULT 0,
+            team2_count INTEGER NOT NULL DEFAULT 0,
+            last_active INTEGER,
+            PRIMARY KEY (guild_id, player_id)
+        )
+        """,
+    ),
+]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    # Incremental auto-vacuum lets the retention job hand free pages back in small steps.
+    # Switching an existing file over needs a one-off VACUUM, which can't run in a transaction.
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= len(MIGRATIONS):
+        return version
+
+    # Table rebuilds must not trip foreign keys half way through; the constraint is
+    # re-checked before each version commits instead. This pragma is a no-op inside a transaction.
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for version, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for statement in statements:
+                    conn.execute(statement)
+                if conn.execute("PRAGMA foreign_key_check").fetchone():
+                    raise sqlite3.IntegrityError(f"Migration {version} left foreign key violations")
+                conn.execute(f"PRAGMA user_version = {version}")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            print(f"Database migrated to schema version {version}")
+    finally:
+        conn.execute("PRAGMA foreign_keys = ON")
+
+    return version
@@ -0,0 +1,54 @@
+import sqlite3
+from dataclasses import dataclass, fields
+from operator import attrgetter
+from typing import Optional
+
+
+# Typed rows for the two tables the cogs read most. Slotted, so each record is one small
+# fixed-size object instead of a per-row dict, and fields are attributes (scrim.status) rather
+# than string keys. Queries select SCRIM_COLUMNS or SCRIM_PLAYER_COLUMNS, which list the
+# fields in declaration order, so a row maps onto the constructor positionally. Everything else
+# (stats, config, joined projections) still comes back as plain dicts.
+class Record:
+    __slots__ = ()
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row):
+        return cls(*row)
+
+    def copy(self):
+        # Several times faster than copy.copy(), which goes through __reduce_ex__ for slotted classes.
+        return self.__class__(*self._values(self))
+
+
+@dataclass(slots=True)
+class Scrim(Record):
+    id: int
+    guild_id: int
+    title: str
+    game_mode: str
+    max_players: int
+    scheduled_time: int
+    creator_id: int
+    player_count: int
+    status: str
+    category_id: Optional[int]
+    team1_vc_id: Optional[int]
+    team2_vc_id: Optional[int]
+    created_at: int
+
+
+@dataclass(slots=True)
+class ScrimPlayer(Record):
+    scrim_id: int
+    player_id: int
+    player_name: str
+    team: Optional[int]
+    joined_at: int
+
+
+for _record in (Scrim, ScrimPlayer):
+    _record._values = attrgetter(*(field.name for field in fields(_record)))
+
+SCRIM_COLUMNS = ", ".join(field.name for field in fields(Scrim))
+SCRIM_PLAYER_COLUMNS = ", ".join(field.name for field in fields(ScrimPlayer))
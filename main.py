@@ -1,35 +1,97 @@
+import asyncio
 import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
 
 import discord
 import dotenv
 from discord.ext import commands
 
 from database.database import Database
+from utils.command_tree import command_tree_hash
+from utils.metrics import MetricsCommandTree
+from utils.names import NameResolver
+from utils.presence import PresenceIndex
 
 dotenv.load_dotenv()
 
-WAITING_ROOM_VC_ID = 1162960960907137038
+EXTENSIONS = (
+    'cogs.scrim_commands',
+    'cogs.admin_commands',
+    'cogs.stats_commands',
+    'cogs.maintenance_commands',
+    'cogs.scheduler_commands',
+    'cogs.metrics_commands',
+    'cogs.presence_commands',
+    'cogs.queue_commands',
+)
+COMMAND_TREE_HASH_KEY = "command_tree_hash"
+FORCE_COMMAND_SYNC = os.getenv("SCRIM_FORCE_COMMAND_SYNC", "false").lower() in ("1", "true", "yes")
 
 
-class ScrimBot(commands.Bot):
+# AutoShardedBot picks the shard count Discord recommends, so the bot can join any number of
+# guilds; per-guild settings (waiting room, admin role) live in the guild_config table.
+class ScrimBot(commands.AutoShardedBot):
     def __init__(self):
+        self.started_at = time.perf_counter()
         intents = discord.Intents.all()
 
-        super().__init__(command_prefix='.', intents=intents)
+        super().__init__(command_prefix='.', intents=intents, tree_cls=MetricsCommandTree)
+        self.startup_timings: Dict[str, float] = {}
         self.db = Database()
+        self.presence = PresenceIndex()
+        self.names = NameResolver(self)
 
-        self.waiting_room_vc_id = WAITING_ROOM_VC_ID
+    @asynccontextmanager
+    async def startup_phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.startup_timings[name] = time.perf_counter() - start
+            print(f"Startup: {name} took {self.startup_timings[name] * 1000:.0f}ms")
+
+    async def open_database(self):
+        async with self.startup_phase("database"):
+            await self.db.open()
+
+    async def load_extensions(self):
+        async with self.startup_phase("extensions"):
+            await asyncio.gather(*(self.load_extension(extension) for extension in EXTENSIONS))
+
+    async def sync_commands(self) -> bool:
+        # tree.sync() is slow and tightly rate limited, so only push when the command payloads
+        # actually changed since the last successful sync (or SCRIM_FORCE_COMMAND_SYNC is set).
+        async with self.startup_phase("command sync"):
+            tree_hash = command_tree_hash(self.tree)
+            if not FORCE_COMMAND_SYNC and await self.db.get_state(COMMAND_TREE_HASH_KEY) == tree_hash:
+                print("Command tree unchanged - skipping sync")
+                return False
+            await self.tree.sync()
+            await self.db.set_state(COMMAND_TREE_HASH_KEY, tree_hash)
+            return True
 
     async def setup_hook(self) -> None:
         try:
-            await self.load_extension('cogs.scrim_commands')
-            await self.load_extension('cogs.admin_commands')
-            await self.load_extension('cogs.stats_commands')
-            await self.tree.sync()
+            # Migrations run on the DB thread while extensions import; cog_load queries queue
+            # behind the open on that same thread.
+            await asyncio.gather(self.open_database(), self.load_extensions())
+            await self.sync_commands()
         except Exception as e:
             print(f"Setup failed: {e}")
             raise
 
+    async def on_ready(self):
+        if 'ready' not in self.startup_timings:
+            self.startup_timings['ready'] = time.perf_counter() - self.started_at
+            print(f"Startup: ready after {self.startup_timings['ready']:.2f}s "
+                  f"({self.shard_count} shards, {len(self.guilds)} guilds)")
+
+    async def close(self) -> None:
+        await super().close()
+        await self.db.close()
+
 
 if __name__ == "__main__":
     bot = ScrimBot()
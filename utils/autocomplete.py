@@ -0,0 +1,52 @@
+from typing import Callable, List, Tuple
+
+import discord
+from discord import app_commands
+
+from database.cache import ACTIVE_STATUSES
+from database.records import Scrim
+
+# Discord rejects choice names longer than 100 characters.
+CHOICE_NAME_LENGTH = 100
+
+
+async def is_scrim_admin(interaction: discord.Interaction) -> bool:
+    if interaction.user.guild_permissions.manage_guild:
+        return True
+    config = await interaction.client.db.get_guild_config(interaction.guild_id)
+    return bool(config['admin_role_id'] and discord.utils.get(interaction.user.roles, id=config['admin_role_id']))
+
+
+def choice_name(scrim: Scrim) -> str:
+    name = f"#{scrim.id} {scrim.title} ({scrim.player_count}/{scrim.max_players}, {scrim.status})"
+    return name if len(name) <= CHOICE_NAME_LENGTH else name[:CHOICE_NAME_LENGTH - 1] + "…"
+
+
+# Builds an autocomplete callback for a scrim_id parameter. Suggestions come from
+# db.search_scrims (in memory, no SQLite after the first load) and are narrowed to the scrims
+# the command can act on. scope: 'any', 'joined' (user is on the roster), 'owned' (user
+# created it) or 'managed' (owned, or the user is a scrim admin and may act on any of them).
+def scrim_autocomplete(statuses: Tuple[str, ...] = ACTIVE_STATUSES,
+                       scope: str = 'any') -> Callable:
+    async def autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[int]]:
+        if interaction.guild_id is None:
+            return []
+        user_id = interaction.user.id
+
+        if scope == 'joined':
+            joined = interaction.client.presence.scrims_of(user_id)
+            owner_only = None
+        elif scope == 'owned' or (scope == 'managed' and not await is_scrim_admin(interaction)):
+            joined, owner_only = None, user_id
+        else:
+            joined = owner_only = None
+
+        def predicate(scrim: Scrim) -> bool:
+            return (scrim.status in statuses
+                    and (joined is None or scrim.id in joined)
+                    and (owner_only is None or scrim.creator_id == owner_only))
+
+        scrims = await interaction.client.db.search_scrims(interaction.guild_id, current, predicate)
+        return [app_commands.Choice(name=choice_name(scrim), value=scrim.id) for scrim in scrims]
+
+    return autocomplete
@@ -0,0 +1,75 @@
+import asyncio
+import random
+import time
+from typing import Dict, Iterable, Optional
+
+import discord
+
+from utils.metrics import metrics
+
+BROADCAST_CONCURRENCY = 10
+MAX_ATTEMPTS = 4
+BASE_BACKOFF = 0.5
+
+
+class BroadcastResult:
+    def __init__(self):
+        # recipient id -> 'sent', 'forbidden' or 'failed'
+        self.outcomes: Dict[int, str] = {}
+        self.retries = 0
+        self.elapsed = 0.0
+
+    @property
+    def sent(self) -> int:
+        return sum(1 for outcome in self.outcomes.values() if outcome == 'sent')
+
+    @property
+    def failed(self) -> int:
+        return len(self.outcomes) - self.sent
+
+    def summary(self) -> str:
+        return (f"Delivered {self.sent}/{len(self.outcomes)} DMs in {self.elapsed:.1f}s"
+                f" ({self.failed} failed, {self.retries} retries).")
+
+
+def _retry_after(error: Exception, attempt: int) -> Optional[float]:
+    if isinstance(error, discord.RateLimited):
+        return error.retry_after
+    if isinstance(error, discord.HTTPException):
+        if error.status == 429:
+            header = getattr(error.response, 'headers', {}).get('Retry-After')
+            return float(header) if header else BASE_BACKOFF * 2 ** attempt
+        if error.status >= 500:
+            return BASE_BACKOFF * 2 ** attempt + random.uniform(0, BASE_BACKOFF)
+    return None
+
+
+async def broadcast(recipients: Iterable[discord.abc.Messageable],
+                    concurrency: int = BROADCAST_CONCURRENCY,
+                    **message) -> BroadcastResult:
+    result = BroadcastResult()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def deliver(recipient: discord.abc.Messageable):
+        async with semaphore:
+            for attempt in range(MAX_ATTEMPTS):
+                try:
+                    with metrics.timer('api', 'send'):
+                        await recipient.send(**message)
+                    result.outcomes[recipient.id] = 'sent'
+                    return
+                except discord.Forbidden:
+                    result.outcomes[recipient.id] = 'forbidden'
+                    return
+                except (discord.RateLimited, discord.HTTPException) as e:
+                    delay = _retry_after(e, attempt)
+                    if delay is None or attempt == MAX_ATTEMPTS - 1:
+                        break
+                    result.retries += 1
+                    await asyncio.sleep(delay)
+            result.outcomes[recipient.id] = 'failed'
+
+    start = time.perf_counter()
+    await asyncio.gather(*(deliver(recipient) for recipient in recipients))
+    result.elapsed = time.perf_counter() - start
+    return result
@@ -0,0 +1,40 @@
+import asyncio
+from typing import Iterable, List, Optional, Union
+
+import discord
+
+from database.records import Scrim
+from utils.metrics import metrics
+
+CHANNEL_DELETE_CONCURRENCY = 4
+
+
+def scrim_channels(source: Union[discord.Guild, discord.Client], scrim: Scrim) -> List[discord.abc.GuildChannel]:
+    channels = [source.get_channel(channel_id) for channel_id in (scrim.team1_vc_id, scrim.team2_vc_id, scrim.category_id)
+                if channel_id]
+    channels = [channel for channel in channels if channel]
+    # Sweep anything else that ended up inside the scrim category as well.
+    for channel in list(channels):
+        if isinstance(channel, discord.CategoryChannel):
+            channels.extend(channel.channels)
+    return channels
+
+
+async def delete_channels(channels: Iterable[Optional[discord.abc.GuildChannel]],
+                          concurrency: int = CHANNEL_DELETE_CONCURRENCY) -> int:
+    semaphore = asyncio.Semaphore(concurrency)
+    unique = {channel.id: channel for channel in channels if channel is not None}
+
+    async def delete(channel: discord.abc.GuildChannel) -> bool:
+        async with semaphore:
+            try:
+                with metrics.timer('api', 'delete_channel'):
+                    await channel.delete()
+            except discord.NotFound:
+                return False
+            except (discord.Forbidden, discord.HTTPException) as e:
+                print(f"Failed to delete channel {channel.id}: {e}")
+                return False
+            return True
+
+    return sum(await asyncio.gather(*(delete(channel) for channel in unique.values())))
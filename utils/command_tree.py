@@ -0,0 +1,13 @@
+import hashlib
+import json
+
+from discord import app_commands
+
+
+def command_tree_hash(tree: app_commands.CommandTree) -> str:
+    # Stable digest of the global command payloads Discord would receive from tree.sync():
+    # keys and commands are sorted so load order and dict ordering don't change the hash.
+    payloads = sorted((command.to_dict(tree) for command in tree.get_commands()),
+                      key=lambda payload: (payload.get('type', 1), payload['name']))
+    encoded = json.dumps(payloads, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
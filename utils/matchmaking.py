@@ -0,0 +1,130 @@
+import os
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Widest rating spread allowed inside one lobby; unset means queues match purely first come,
+# first served. The band widens by BAND_GROWTH rating points for every second the lobby's
+# longest-waiting player has been queued, so outliers still get a match eventually.
+RATING_BAND = float(os.environ["SCRIM_QUEUE_RATING_BAND"]) if os.getenv("SCRIM_QUEUE_RATING_BAND") else None
+BAND_GROWTH = float(os.getenv("SCRIM_QUEUE_BAND_GROWTH", 5.0))
+
+# (guild_id, game_mode, lobby size)
+QueueKey = Tuple[int, str, int]
+
+
+@dataclass(slots=True)
+class QueueEntry:
+    player_id: int
+    player_name: str
+    rating: float
+    enqueued_at: float
+
+
+@dataclass(slots=True)
+class Lobby:
+    key: QueueKey
+    players: List[QueueEntry] = field(default_factory=list)
+
+
+# In-memory matchmaking queues, one per guild, game mode and lobby size. A player sits in at
+# most one queue per guild. match() is a pure CPU pass with no I/O - the caller persists the
+# lobbies it returns and hands them back through requeue() if that fails.
+class MatchQueue:
+    def __init__(self, band: Optional[float] = RATING_BAND, band_growth: float = BAND_GROWTH):
+        self.band = band
+        self.band_growth = band_growth
+        self.matched = 0
+        # Dicts keep insertion order, which is queue order for first-come matching.
+        self._queues: Dict[QueueKey, Dict[int, QueueEntry]] = {}
+        self._player_queues: Dict[Tuple[int, int], QueueKey] = {}
+
+    def __len__(self) -> int:
+        return len(self._player_queues)
+
+    def enqueue(self, key: QueueKey, entry: QueueEntry) -> Optional[QueueKey]:
+        # Returns the queue the player was already in (and leaves them there), else None.
+        current = self._player_queues.get((key[0], entry.player_id))
+        if current is not None:
+            return current
+        self._queues.setdefault(key, {})[entry.player_id] = entry
+        self._player_queues[(key[0], entry.player_id)] = key
+        return None
+
+    def dequeue(self, guild_id: int, player_id: int) -> Optional[QueueKey]:
+        key = self._player_queues.pop((guild_id, player_id), None)
+        if key is not None:
+            queue = self._queues[key]
+            del queue[player_id]
+            if not queue:
+                del self._queues[key]
+        return key
+
+    def requeue(self, lobby: Lobby):
+        # Puts a lobby that couldn't be created back, keeping each player's original wait.
+        for entry in lobby.players:
+            self.enqueue(lobby.key, entry)
+
+    def position(self, guild_id: int, player_id: int) -> Optional[Tuple[QueueKey, int, int]]:
+        # (queue, 1-based place in line, players in that queue)
+        key = self._player_queues.get((guild_id, player_id))
+        if key is None:
+            return None
+        queue = self._queues[key]
+        return key, list(queue).index(player_id) + 1, len(queue)
+
+    def sizes(self, guild_id: int) -> Dict[QueueKey, int]:
+        return {key: len(queue) for key, queue in self._queues.items() if key[0] == guild_id}
+
+    def ready(self) -> bool:
+        return any(len(queue) >= key[2] for key, queue in self._queues.items())
+
+    def match(self, now: float) -> List[Lobby]:
+        # One pass over every queue that could fill a lobby. Matched players leave the queue.
+        lobbies = []
+        for key, queue in list(self._queues.items()):
+            if len(queue) < key[2]:
+                continue
+            entries = list(queue.values())
+            if self.band is None:
+                groups = [entries[i:i + key[2]] for i in range(0, len(entries) - key[2] + 1, key[2])]
+            else:
+                groups = self._band_groups(entries, key[2], now)
+            if not groups:
+                continue
+            # Drop the matched players in one pass rather than dequeue()ing them one at a time.
+            matched = {entry.player_id for players in groups for entry in players}
+            for player_id in matched:
+                del self._player_queues[(key[0], player_id)]
+            remaining = {player_id: entry for player_id, entry in queue.items() if player_id not in matched}
+            if remaining:
+                self._queues[key] = remaining
+            else:
+                del self._queues[key]
+            lobbies.extend(Lobby(key, players) for players in groups)
+        self.matched += sum(len(lobby.players) for lobby in lobbies)
+        return lobbies
+
+    def _band_groups(self, entries: List[QueueEntry], size: int, now: float) -> List[List[QueueEntry]]:
+        # Slides a size-wide window over the players sorted by rating and takes it whenever its
+        # spread fits the band, widened by the longest wait inside it (a monotonic deque tracks
+        # that minimum enqueued_at), so a tick is one sort plus a linear scan.
+        entries = sorted(entries, key=lambda entry: entry.rating)
+        groups = []
+        oldest = deque()
+        start = 0
+        for i, entry in enumerate(entries):
+            while oldest and entries[oldest[-1]].enqueued_at >= entry.enqueued_at:
+                oldest.pop()
+            oldest.append(i)
+            first = i - size + 1
+            if first < start:
+                continue
+            while oldest[0] < first:
+                oldest.popleft()
+            waited = now - entries[oldest[0]].enqueued_at
+            if entry.rating - entries[first].rating <= self.band + self.band_growth * waited:
+                groups.append(entries[first:i + 1])
+                start = i + 1
+                oldest.clear()
+        return groups
@@ -0,0 +1,186 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+import discord
+from discord import app_commands
+
+# Upper bounds in seconds; the last bucket (+Inf) is implicit.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_QUERY_THRESHOLD = float(os.getenv("SCRIM_SLOW_QUERY_MS", 100)) / 1000
+
+# Histogram families exposed as scrim_<family>_duration_seconds, and the label naming each series.
+FAMILIES = {'command': 'command', 'query': 'query', 'api': 'call'}
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: "Histogram", sign: int = 1):
+        # Adds (or with sign=-1, removes) other's observations; both must share buckets.
+        self.counts = [count + sign * extra for count, extra in zip(self.counts, other.counts)]
+        self.count += sign * other.count
+        self.sum += sign * other.sum
+
+    def since(self, earlier: "Histogram") -> "Histogram":
+        # Observations made after `earlier` was copied from the same series.
+        window = Histogram(self.buckets)
+        window.merge(self)
+        window.merge(earlier, sign=-1)
+        return window
+
+    def quantile(self, q: float) -> float:
+        # Linear interpolation inside the bucket holding the q-th observation, as Prometheus'
+        # histogram_quantile does; observations past the last bound report that bound.
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= target:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (target - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+# Process-wide latency histograms and failure / rate-limit counters. Observations can come
+# from the DB thread as well as the event loop, so updates take a lock.
+class Metrics:
+    def __init__(self):
+        self.started_at = time.time()
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.failures: Dict[Tuple[str, str], int] = {}
+        self.rate_limits: Dict[str, int] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, family: str, name: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get((family, name))
+            if histogram is None:
+                histogram = self.histograms[(family, name)] = Histogram()
+            histogram.observe(seconds)
+
+    def failure(self, family: str, name: str):
+        with self._lock:
+            self.failures[(family, name)] = self.failures.get((family, name), 0) + 1
+
+    def rate_limited(self, source: str):
+        with self._lock:
+            self.rate_limits[source] = self.rate_limits.get(source, 0) + 1
+
+    @contextmanager
+    def timer(self, family: str, name: str):
+        # Works around awaits too: `with metrics.timer('api', 'move_to'): await member.move_to(...)`.
+        start = time.perf_counter()
+        try:
+            yield
+        except discord.RateLimited:
+            self.rate_limited(name)
+            self.failure(family, name)
+            raise
+        except discord.HTTPException as e:
+            if e.status == 429:
+                self.rate_limited(name)
+            self.failure(family, name)
+            raise
+        except Exception:
+            self.failure(family, name)
+            raise
+        finally:
+            self.observe(family, name, time.perf_counter() - start)
+
+    def merged(self, family: str) -> Histogram:
+        # Every series in the family folded into one new histogram, e.g. to compare two moments.
+        merged = Histogram()
+        with self._lock:
+            for (kind, _), histogram in self.histograms.items():
+                if kind == family:
+                    merged.merge(histogram)
+        return merged
+
+    def summary(self, family: str) -> List[Tuple[str, int, float, float]]:
+        # (name, count, p50, p99) per series in the family, busiest first.
+        with self._lock:
+            rows = [(name, histogram.count, histogram.quantile(0.5), histogram.quantile(0.99))
+                    for (kind, name), histogram in self.histograms.items() if kind == family]
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    def render(self) -> str:
+        # Prometheus text exposition format (version 0.0.4).
+        lines = []
+        with self._lock:
+            for family, label in FAMILIES.items():
+                metric = f"scrim_{family}_duration_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for (kind, name), histogram in sorted(self.histograms.items()):
+                    if kind != family:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float('inf') else repr(bound)
+                        lines.append(f'{metric}_bucket{{{label}="{name}",le="{le}"}} {cumulative}')
+                    lines.append(f'{metric}_sum{{{label}="{name}"}} {histogram.sum}')
+                    lines.append(f'{metric}_count{{{label}="{name}"}} {histogram.count}')
+
+            lines.append("# TYPE scrim_failures_total counter")
+            for (family, name), count in sorted(self.failures.items()):
+                lines.append(f'scrim_failures_total{{kind="{family}",name="{name}"}} {count}')
+            lines.append("# TYPE scrim_rate_limits_total counter")
+            for source, count in sorted(self.rate_limits.items()):
+                lines.append(f'scrim_rate_limits_total{{source="{source}"}} {count}')
+            gauges = list(self.gauges.items())
+
+        for name, read in gauges:
+            lines.append(f"# TYPE scrim_{name} gauge")
+            lines.append(f"scrim_{name} {read()}")
+        lines.append("# TYPE scrim_uptime_seconds gauge")
+        lines.append(f"scrim_uptime_seconds {time.time() - self.started_at}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+# discord.py retries 429s inside its HTTP client and only logs them, so count them from the log.
+class RateLimitLogHandler(logging.Handler):
+    def __init__(self, registry: Metrics = metrics):
+        super().__init__(level=logging.WARNING)
+        self.registry = registry
+
+    def emit(self, record: logging.LogRecord):
+        if "rate limited" in record.getMessage():
+            self.registry.rate_limited("http")
+
+
+# Stamps each interaction on arrival so command latency covers checks, handler and responses;
+# the completion side is observed by MetricsCommands.on_app_command_completion.
+class MetricsCommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        interaction.extras['started_at'] = time.perf_counter()
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        name = interaction.command.qualified_name if interaction.command else "unknown"
+        started_at: Optional[float] = interaction.extras.get('started_at')
+        if started_at is not None:
+            metrics.observe('command', name, time.perf_counter() - started_at)
+        metrics.failure('command', name)
+        await super().on_error(interaction, error)
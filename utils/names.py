@@ -0,0 +1,106 @@
+import asyncio
+import os
+from typing import Dict, Iterable, List, Optional, Set
+
+import discord
+
+from database.cache import TTLCache
+from database.records import ScrimPlayer
+from utils.metrics import metrics
+
+NAME_CACHE_TTL = float(os.getenv("SCRIM_NAME_CACHE_TTL", 6 * 60 * 60))
+NAME_CACHE_SIZE = 5000
+NAME_FETCH_CONCURRENCY = 4
+# Where each lookup was answered, cheapest first.
+SOURCES = ('member', 'user', 'cache', 'rest')
+
+
+def fallback_name(user_id: int) -> str:
+    return f"User {user_id}"
+
+
+# Display names for user ids with as few REST calls as possible: the guild's member cache,
+# then the client's user cache, then a bounded TTL/LRU of names fetched earlier, and only then
+# fetch_user. Concurrent fetches of one id share a request, and users that no longer exist are
+# remembered under the fallback name so they aren't fetched again until the entry expires.
+class NameResolver:
+    def __init__(self, client: discord.Client, ttl: float = NAME_CACHE_TTL, max_size: int = NAME_CACHE_SIZE):
+        self.client = client
+        self.cache = TTLCache(ttl=ttl, max_size=max_size)
+        self.lookups = dict.fromkeys(SOURCES, 0)
+        self._fetch_slots = asyncio.Semaphore(NAME_FETCH_CONCURRENCY)
+        self._fetching: Dict[int, asyncio.Future] = {}
+        self._refreshes: Set[asyncio.Task] = set()
+
+    def stats(self) -> Dict:
+        total = sum(self.lookups.values())
+        return {**self.lookups, 'total': total, 'hit_rate': 1 - self.lookups['rest'] / total if total else 0.0}
+
+    def _local_name(self, guild: Optional[discord.Guild], user_id: int) -> Optional[str]:
+        member = guild.get_member(user_id) if guild is not None else None
+        if member is not None:
+            self.lookups['member'] += 1
+            return member.display_name
+        user = self.client.get_user(user_id)
+        if user is not None:
+            self.lookups['user'] += 1
+            return user.display_name
+        name = self.cache.get(user_id)
+        if name is not None:
+            self.lookups['cache'] += 1
+        return name
+
+    async def _fetch_name(self, user_id: int) -> str:
+        async with self._fetch_slots:
+            self.lookups['rest'] += 1
+            try:
+                with metrics.timer('api', 'fetch_user'):
+                    user = await self.client.fetch_user(user_id)
+                name = user.display_name
+            except discord.NotFound:
+                name = fallback_name(user_id)
+            except discord.HTTPException:
+                # Transient - don't cache, so the next view tries again.
+                return fallback_name(user_id)
+        self.cache.put(user_id, name)
+        return name
+
+    async def _fetch(self, user_id: int) -> str:
+        future = self._fetching.get(user_id)
+        if future is None:
+            future = self._fetching[user_id] = asyncio.ensure_future(self._fetch_name(user_id))
+            future.add_done_callback(lambda _: self._fetching.pop(user_id, None))
+        return await asyncio.shield(future)
+
+    async def resolve(self, guild: Optional[discord.Guild], user_ids: Iterable[int]) -> Dict[int, str]:
+        # Everything one embed needs in one call; only the ids no cache knows go to REST, in parallel.
+        names, missing = {}, []
+        for user_id in dict.fromkeys(user_ids):
+            name = self._local_name(guild, user_id)
+            if name is None:
+                missing.append(user_id)
+            else:
+                names[user_id] = name
+        if missing:
+            names.update(zip(missing, await asyncio.gather(*(self._fetch(user_id) for user_id in missing))))
+        return names
+
+    async def resolve_one(self, guild: Optional[discord.Guild], user_id: int) -> str:
+        return (await self.resolve(guild, [user_id]))[user_id]
+
+    async def resolve_players(self, guild: Optional[discord.Guild], players: List[ScrimPlayer]) -> Dict[int, str]:
+        # Like resolve() for one roster, except that players nobody can look up any more keep the
+        # name stored when they joined, and any stored player_name found to be out of date is
+        # rewritten in the background so rosters read straight from the database catch up.
+        names = await self.resolve(guild, [player.player_id for player in players])
+        for player in players:
+            if player.player_name and names[player.player_id] == fallback_name(player.player_id):
+                names[player.player_id] = player.player_name
+        stale = {player.player_id: names[player.player_id] for player in players
+                 if names[player.player_id] != player.player_name
+                 and names[player.player_id] != fallback_name(player.player_id)}
+        if stale:
+            task = asyncio.create_task(self.client.db.update_player_names(stale, players[0].scrim_id))
+            self._refreshes.add(task)
+            task.add_done_callback(self._refreshes.discard)
+        return names
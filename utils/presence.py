@@ -0,0 +1,82 @@
+from typing import Dict, Iterable, Set, Tuple
+
+
+# Live view of who is sitting in each guild's waiting room, joined against the rosters of
+# joinable (open/full) scrims, so ready counts and start checks never scan channels or SQLite.
+# Fed by voice state updates and roster events; rebuilt from scratch on every on_ready.
+class PresenceIndex:
+    def __init__(self):
+        self.loaded = False
+        self._waiting: Dict[int, Set[int]] = {}
+        self._rosters: Dict[int, Set[int]] = {}
+        self._scrim_guilds: Dict[int, int] = {}
+        self._player_scrims: Dict[int, Set[int]] = {}
+        self._ready: Dict[int, Set[int]] = {}
+
+    def load(self, waiting: Dict[int, Iterable[int]], rosters: Iterable[Tuple[int, int, int]]):
+        # waiting: guild id -> member ids in its waiting room; rosters: (scrim_id, guild_id, player_id).
+        self._waiting = {guild_id: set(members) for guild_id, members in waiting.items()}
+        self._rosters, self._scrim_guilds, self._player_scrims, self._ready = {}, {}, {}, {}
+        for scrim_id, guild_id, player_id in rosters:
+            self.add_player(scrim_id, guild_id, player_id)
+        self.loaded = True
+
+    # WAITING ROOM
+    def enter(self, guild_id: int, member_id: int):
+        self._waiting.setdefault(guild_id, set()).add(member_id)
+        for scrim_id in self._player_scrims.get(member_id, ()):
+            if self._scrim_guilds[scrim_id] == guild_id:
+                self._ready[scrim_id].add(member_id)
+
+    def leave(self, guild_id: int, member_id: int):
+        self._waiting.get(guild_id, set()).discard(member_id)
+        for scrim_id in self._player_scrims.get(member_id, ()):
+            if self._scrim_guilds[scrim_id] == guild_id:
+                self._ready[scrim_id].discard(member_id)
+
+    def set_waiting(self, guild_id: int, member_ids: Iterable[int]):
+        # Resyncs one guild, e.g. after its waiting room channel was changed.
+        member_ids = set(member_ids)
+        for member_id in self._waiting.get(guild_id, set()) - member_ids:
+            self.leave(guild_id, member_id)
+        for member_id in member_ids:
+            self.enter(guild_id, member_id)
+
+    def is_waiting(self, guild_id: int, member_id: int) -> bool:
+        return member_id in self._waiting.get(guild_id, ())
+
+    # ROSTERS
+    def add_player(self, scrim_id: int, guild_id: int, player_id: int):
+        self._scrim_guilds[scrim_id] = guild_id
+        self._rosters.setdefault(scrim_id, set()).add(player_id)
+        self._player_scrims.setdefault(player_id, set()).add(scrim_id)
+        ready = self._ready.setdefault(scrim_id, set())
+        if player_id in self._waiting.get(guild_id, ()):
+            ready.add(player_id)
+
+    def remove_player(self, scrim_id: int, player_id: int):
+        self._rosters.get(scrim_id, set()).discard(player_id)
+        self._ready.get(scrim_id, set()).discard(player_id)
+        scrims = self._player_scrims.get(player_id)
+        if scrims is not None:
+            scrims.discard(scrim_id)
+            if not scrims:
+                del self._player_scrims[player_id]
+
+    def drop_scrim(self, scrim_id: int):
+        for player_id in list(self._rosters.get(scrim_id, ())):
+            self.remove_player(scrim_id, player_id)
+        self._rosters.pop(scrim_id, None)
+        self._ready.pop(scrim_id, None)
+        self._scrim_guilds.pop(scrim_id, None)
+
+    # LOOKUPS
+    def ready(self, scrim_id: int) -> Set[int]:
+        return set(self._ready.get(scrim_id, ()))
+
+    def ready_count(self, scrim_id: int) -> int:
+        return len(self._ready.get(scrim_id, ()))
+
+    def scrims_of(self, player_id: int) -> Set[int]:
+        # Open/full scrims the player is on.
+        return set(self._player_scrims.get(player_id, ()))
@@ -0,0 +1,99 @@
+import asyncio
+import heapq
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Seconds before the scheduled time at which events fire; 0 is the start itself.
+EVENT_OFFSETS = (15 * 60, 5 * 60, 0)
+
+
+# Min-heap of upcoming scrim events driven by a single sleeping task: nothing polls the
+# database and an idle scheduler costs nothing until the next deadline or a new schedule().
+# Unscheduling is lazy - stale heap entries are dropped when they reach the top.
+# clock/sleep are injectable so the scheduler can be driven by a fake clock.
+class ScrimScheduler:
+    def __init__(self,
+                 handler: Callable[[int, int], Awaitable[None]],
+                 offsets: Tuple[int, ...] = EVENT_OFFSETS,
+                 clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        self.handler = handler
+        self.offsets = offsets
+        self.clock = clock
+        self.sleep = sleep
+        self.fired = 0
+        self._heap: List[Tuple[float, int, int, float]] = []
+        self._scheduled: Dict[int, float] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._handlers = set()
+
+    def __len__(self) -> int:
+        return len(self._scheduled)
+
+    def schedule(self, scrim_id: int, scheduled_time: float):
+        if self._scheduled.get(scrim_id) == scheduled_time:
+            return
+        self._scheduled[scrim_id] = scheduled_time
+        now = self.clock()
+        for offset in self.offsets:
+            if scheduled_time - offset >= now:
+                heapq.heappush(self._heap, (scheduled_time - offset, scrim_id, offset, scheduled_time))
+        self._wakeup.set()
+
+    def unschedule(self, scrim_id: int):
+        self._scheduled.pop(scrim_id, None)
+        # Rebuild once stale entries dominate so cancelled scrims can't grow the heap unbounded.
+        if len(self._heap) > 2 * len(self.offsets) * (len(self._scheduled) + 1):
+            self._heap = [entry for entry in self._heap if self._scheduled.get(entry[1]) == entry[3]]
+            heapq.heapify(self._heap)
+
+    def clear(self):
+        self._scheduled.clear()
+        self._heap.clear()
+        self._wakeup.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _pop_stale(self):
+        while self._heap and self._scheduled.get(self._heap[0][1]) != self._heap[0][3]:
+            heapq.heappop(self._heap)
+
+    async def _fire(self, scrim_id: int, offset: int):
+        try:
+            await self.handler(scrim_id, offset)
+        except Exception as e:
+            print(f"Scheduled event for scrim {scrim_id} (T-{offset}s) failed: {e}")
+
+    async def _run(self):
+        while True:
+            self._pop_stale()
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            fire_at, scrim_id, offset, _ = self._heap[0]
+            delay = fire_at - self.clock()
+            if delay > 0:
+                sleeper = asyncio.ensure_future(self.sleep(delay))
+                waker = asyncio.ensure_future(self._wakeup.wait())
+                await asyncio.wait((sleeper, waker), return_when=asyncio.FIRST_COMPLETED)
+                sleeper.cancel()
+                waker.cancel()
+                continue
+
+            heapq.heappop(self._heap)
+            if offset == min(self.offsets):
+                self._scheduled.pop(scrim_id, None)
+            self.fired += 1
+            task = asyncio.create_task(self._fire(scrim_id, offset))
+            self._handlers.add(task)
+            task.add_done_callback(self._handlers.discard)
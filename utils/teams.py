@@ -0,0 +1,90 @@
+import bisect
+from itertools import combinations
+from typing import Dict, Hashable, List, Tuple
+
+DEFAULT_RATING = 1000.0
+ELO_K_FACTOR = 32.0
+# Up to this many players every equal split is tried (C(13, 6) = 1716 candidates);
+# larger lobbies use a greedy split refined by best-swap passes.
+EXACT_SPLIT_LIMIT = 14
+MAX_SWAP_PASSES = 50
+
+
+def _exact_split(players: List[Tuple[Hashable, float]]) -> Tuple[List, List]:
+    size = len(players) // 2
+    total = sum(rating for _, rating in players)
+    best_diff, best_team = None, None
+    # Pinning the first player to team 1 skips the mirror image of every split.
+    for rest in combinations(range(1, len(players)), size - 1):
+        team = (0,) + rest
+        diff = abs(total - 2 * sum(players[i][1] for i in team))
+        if best_diff is None or diff < best_diff:
+            best_diff, best_team = diff, team
+            if diff == 0:
+                break
+    chosen = set(best_team)
+    return ([players[i] for i in range(len(players)) if i in chosen],
+            [players[i] for i in range(len(players)) if i not in chosen])
+
+
+def _greedy_split(players: List[Tuple[Hashable, float]]) -> Tuple[List, List]:
+    size = len(players) // 2
+    team1, team2 = [], []
+    sum1 = sum2 = 0.0
+    for player in sorted(players, key=lambda p: p[1], reverse=True):
+        if len(team2) >= len(players) - size or (len(team1) < size and sum1 <= sum2):
+            team1.append(player)
+            sum1 += player[1]
+        else:
+            team2.append(player)
+            sum2 += player[1]
+
+    # Each pass makes the single swap that brings the difference closest to zero: swapping
+    # a (team 1) with b (team 2) changes sum1 - sum2 by 2 * (b - a), so look for b nearest to a - diff / 2.
+    for _ in range(MAX_SWAP_PASSES):
+        diff = sum1 - sum2
+        team2.sort(key=lambda p: p[1])
+        ratings2 = [p[1] for p in team2]
+        best = (abs(diff), None, None)
+        for i, (_, a) in enumerate(team1):
+            target = a - diff / 2
+            k = bisect.bisect_left(ratings2, target)
+            for j in (k - 1, k):
+                if 0 <= j < len(team2):
+                    new_diff = abs(diff - 2 * (a - ratings2[j]))
+                    if new_diff < best[0]:
+                        best = (new_diff, i, j)
+        if best[1] is None:
+            break
+        _, i, j = best
+        team1[i], team2[j] = team2[j], team1[i]
+        sum1 += team1[i][1] - team2[j][1]
+        sum2 += team2[j][1] - team1[i][1]
+
+    return team1, team2
+
+
+def balance_teams(ratings: Dict[Hashable, float]) -> Tuple[List, List]:
+    # Splits players into two teams whose sizes differ by at most one, minimising the gap
+    # between the teams' rating totals. Returns the player keys of each team.
+    players = list(ratings.items())
+    if len(players) < 2:
+        return [key for key, _ in players], []
+    split = _exact_split if len(players) <= EXACT_SPLIT_LIMIT else _greedy_split
+    team1, team2 = split(players)
+    return [key for key, _ in team1], [key for key, _ in team2]
+
+
+def elo_deltas(team1: Dict[Hashable, float], team2: Dict[Hashable, float], winning_team: int,
+               k_factor: float = ELO_K_FACTOR) -> Dict[Hashable, float]:
+    # Team Elo: each side plays as its average rating and every member moves by the same amount.
+    # winning_team 0 records a draw.
+    average1 = sum(team1.values()) / len(team1)
+    average2 = sum(team2.values()) / len(team2)
+    expected1 = 1 / (1 + 10 ** ((average2 - average1) / 400))
+    score1 = {1: 1.0, 2: 0.0}.get(winning_team, 0.5)
+    change = k_factor * (score1 - expected1)
+
+    deltas = {player: change for player in team1}
+    deltas.update({player: -change for player in team2})
+    return deltas
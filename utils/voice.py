@@ -0,0 +1,27 @@
+import asyncio
+from typing import Iterable, List, Tuple
+
+import discord
+
+from utils.metrics import metrics
+
+# Voice moves share a per-guild rate limit bucket; a handful in flight keeps a lobby move
+# fast without tripping 429s (discord.py still retries any that slip through).
+MOVE_CONCURRENCY = 5
+
+
+async def move_members(moves: Iterable[Tuple[discord.Member, discord.VoiceChannel]],
+                       concurrency: int = MOVE_CONCURRENCY) -> List[discord.Member]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def move(member: discord.Member, channel: discord.VoiceChannel):
+        async with semaphore:
+            try:
+                with metrics.timer('api', 'move_to'):
+                    await member.move_to(channel)
+            except (discord.Forbidden, discord.HTTPException):
+                return member
+            return None
+
+    results = await asyncio.gather(*(move(member, channel) for member, channel in moves))
+    return [member for member in results if member is not None]